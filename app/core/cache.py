@@ -0,0 +1,186 @@
+"""
+Utilidades de caché: caché LRU en memoria y backends intercambiables
+(en proceso o compartido en PostgreSQL) detrás de una interfaz pequeña.
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.database import engine
+from app.core.models.cache_entry import CacheEntry
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Caché LRU en memoria con expiración por entrada, segura entre hilos.
+    Es local a cada proceso: cada worker mantiene su propia copia.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Obtener un valor si existe y no ha expirado"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Guardar un valor; descarta el menos usado si se supera maxsize"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        """Eliminar una entrada (no falla si no existe)"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Eliminar todas las entradas cuya clave (str) empieza por prefix"""
+        with self._lock:
+            keys = [key for key in self._data if isinstance(key, str) and key.startswith(prefix)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self):
+        """Vaciar la caché"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class CacheBackend(ABC):
+    """Interfaz mínima de caché clave/valor (valores str) con TTL"""
+    name = "base"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Valor vigente de la clave, o None"""
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: float):
+        """Guardar un valor que expira en ttl segundos"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Eliminar una clave (no falla si no existe)"""
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str):
+        """Eliminar todas las claves que empiezan por prefix"""
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Varios valores a la vez (los backends remotos lo hacen en una sola consulta)"""
+        return {key: self.get(key) for key in keys}
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Caché local al proceso; cada worker tiene la suya"""
+    name = "memory"
+
+    def __init__(self, maxsize: int = 10000):
+        self._cache = TTLCache(maxsize=maxsize)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, value: str, ttl: float):
+        self._cache.set(key, value, ttl)
+
+    def delete(self, key: str):
+        self._cache.delete(key)
+
+    def delete_prefix(self, prefix: str):
+        self._cache.delete_prefix(prefix)
+
+
+class PostgresCacheBackend(CacheBackend):
+    """
+    Caché compartida entre workers y nodos en la tabla UNLOGGED cache_entry.
+    Usa conexiones propias para no mezclarse con la transacción de la petición.
+    """
+    name = "postgres"
+
+    def get(self, key: str) -> Optional[str]:
+        with engine.connect() as connection:
+            return connection.execute(
+                select(CacheEntry.value).where(
+                    CacheEntry.key == key,
+                    CacheEntry.expires_at > datetime.now(timezone.utc)
+                )
+            ).scalar()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        keys = list(keys)
+        with engine.connect() as connection:
+            found = dict(connection.execute(
+                select(CacheEntry.key, CacheEntry.value).where(
+                    CacheEntry.key.in_(keys),
+                    CacheEntry.expires_at > datetime.now(timezone.utc)
+                )
+            ).all())
+        return {key: found.get(key) for key in keys}
+
+    def set(self, key: str, value: str, ttl: float):
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        with engine.begin() as connection:
+            connection.execute(
+                insert(CacheEntry).values(key=key, value=value, expires_at=expires_at).on_conflict_do_update(
+                    index_elements=[CacheEntry.key],
+                    set_={"value": value, "expires_at": expires_at}
+                )
+            )
+
+    def delete(self, key: str):
+        with engine.begin() as connection:
+            connection.execute(delete(CacheEntry).where(CacheEntry.key == key))
+
+    def delete_prefix(self, prefix: str):
+        with engine.begin() as connection:
+            connection.execute(delete(CacheEntry).where(CacheEntry.key.startswith(prefix, autoescape=True)))
+
+
+_cache_backend: Optional[CacheBackend] = None
+
+
+def get_cache_backend() -> CacheBackend:
+    """Backend configurado con CACHE_BACKEND (memory | postgres)"""
+    global _cache_backend
+    if _cache_backend is None:
+        choice = os.getenv("CACHE_BACKEND", "memory").lower()
+        _cache_backend = PostgresCacheBackend() if choice == "postgres" else InMemoryCacheBackend()
+        print(f"🗄️ CACHE: Usando backend '{_cache_backend.name}'")
+    return _cache_backend
+
+
+def set_cache_backend(backend: CacheBackend):
+    """Reemplazar el backend (p. ej. en pruebas)"""
+    global _cache_backend
+    _cache_backend = backend
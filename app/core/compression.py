@@ -0,0 +1,229 @@
+"""
+Compresión transparente de columnas de texto largas (zstd con diccionario entrenado).
+
+CompressedText es un TypeDecorator: los servicios y los DTOs siguen viendo str.
+Es opcional (TEXT_COMPRESSION=zstd); desactivado, la columna es Text como siempre.
+Activado, la columna es bytea y cada valor lleva una cabecera versionada:
+
+    magic (2 bytes: C7 5A) | versión (1) | códec (1) | id de diccionario (4, big-endian) | datos
+
+    códec 0 = UTF-8 sin comprimir (valores cortos o sin zstandard instalado)
+    códec 1 = zstd
+    códec 2 = zstd con el diccionario indicado
+
+Los valores sin cabecera se leen como UTF-8 plano: son los que quedan tras convertir la
+columna a bytea y antes del backfill (C7 5A nunca inicia un texto UTF-8 válido).
+
+Activación (ver python -m app.scripts.compress_clinical_text --help):
+    1. migrate  -> columnas a bytea (los valores quedan como UTF-8 plano)
+    2. TEXT_COMPRESSION=zstd en todos los procesos
+    3. train    -> diccionario a partir de una muestra
+    4. backfill -> comprimir las filas existentes por lotes
+"""
+import os
+import struct
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import LargeBinary, Text, select, text
+from sqlalchemy.types import TypeDecorator
+
+from app.core.metrics import metrics
+
+try:
+    import zstandard
+except ImportError:  # zstandard es opcional: sin él los valores se guardan sin comprimir
+    zstandard = None
+
+TEXT_COMPRESSION = os.getenv("TEXT_COMPRESSION", "off").lower()
+COMPRESSION_ENABLED = TEXT_COMPRESSION == "zstd"
+COMPRESSION_LEVEL = int(os.getenv("TEXT_COMPRESSION_LEVEL", "3"))
+# Por debajo de este tamaño la cabecera y el marco de zstd no compensan
+COMPRESSION_MIN_BYTES = int(os.getenv("TEXT_COMPRESSION_MIN_BYTES", "128"))
+DICTIONARY_NAME = "clinical_text"
+DICTIONARY_SIZE = int(os.getenv("TEXT_COMPRESSION_DICT_SIZE", str(64 * 1024)))
+
+MAGIC = b"\xc7\x5a"
+FORMAT_VERSION = 1
+CODEC_RAW = 0
+CODEC_ZSTD = 1
+CODEC_ZSTD_DICT = 2
+_HEADER = struct.Struct(">2sBBI")
+HEADER_SIZE = _HEADER.size
+
+
+class CompressionError(RuntimeError):
+    """Un valor comprimido no se puede leer en este proceso"""
+
+
+class DictionaryRegistry:
+    """Diccionarios zstd por id, con compresores por hilo (los de zstandard no son thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dictionaries: Dict[int, "zstandard.ZstdCompressionDict"] = {}
+        self._active_id: Optional[int] = None
+        self._local = threading.local()
+
+    @property
+    def active_id(self) -> Optional[int]:
+        return self._active_id
+
+    def register(self, dictionary_id: int, data: bytes, active: bool = False):
+        with self._lock:
+            self._dictionaries[dictionary_id] = zstandard.ZstdCompressionDict(data)
+            if active or self._active_id is None or dictionary_id > self._active_id:
+                self._active_id = dictionary_id
+
+    def load(self, connection, name: str = DICTIONARY_NAME):
+        """Cargar todos los diccionarios del nombre indicado; el de mayor id queda activo para comprimir"""
+        if zstandard is None:
+            return
+        from app.core.models.compression_dictionary import CompressionDictionary
+        rows = connection.execute(
+            select(CompressionDictionary.id, CompressionDictionary.data)
+            .where(CompressionDictionary.name == name)
+            .order_by(CompressionDictionary.id)
+        ).all()
+        for dictionary_id, data in rows:
+            self.register(dictionary_id, bytes(data))
+
+    def _load_one(self, dictionary_id: int):
+        # Diccionario creado después del arranque (p. ej. por otro proceso): se carga a demanda
+        from app.core.database import engine
+        from app.core.models.compression_dictionary import CompressionDictionary
+        with engine.connect() as connection:
+            data = connection.scalar(select(CompressionDictionary.data).where(CompressionDictionary.id == dictionary_id))
+        if data is None:
+            raise CompressionError(f"Diccionario de compresión {dictionary_id} no encontrado")
+        self.register(dictionary_id, bytes(data), active=False)
+
+    def compressor(self, dictionary_id: Optional[int]):
+        key = f"c{dictionary_id}"
+        compressor = getattr(self._local, key, None)
+        if compressor is None:
+            dict_data = self._dictionaries[dictionary_id] if dictionary_id is not None else None
+            compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=dict_data, write_content_size=True)
+            setattr(self._local, key, compressor)
+        return compressor
+
+    def decompressor(self, dictionary_id: Optional[int]):
+        if dictionary_id is not None and dictionary_id not in self._dictionaries:
+            self._load_one(dictionary_id)
+        key = f"d{dictionary_id}"
+        decompressor = getattr(self._local, key, None)
+        if decompressor is None:
+            dict_data = self._dictionaries[dictionary_id] if dictionary_id is not None else None
+            decompressor = zstandard.ZstdDecompressor(dict_data=dict_data)
+            setattr(self._local, key, decompressor)
+        return decompressor
+
+
+dictionaries = DictionaryRegistry()
+
+
+def compress_text(value: str, use_dictionary: bool = True) -> bytes:
+    """str -> valor con cabecera (comprimido si vale la pena)"""
+    raw = value.encode("utf-8")
+    if zstandard is None or len(raw) < COMPRESSION_MIN_BYTES:
+        return _HEADER.pack(MAGIC, FORMAT_VERSION, CODEC_RAW, 0) + raw
+
+    dictionary_id = dictionaries.active_id if use_dictionary else None
+    codec = CODEC_ZSTD_DICT if dictionary_id is not None else CODEC_ZSTD
+    compressed = dictionaries.compressor(dictionary_id).compress(raw)
+    if len(compressed) >= len(raw):
+        return _HEADER.pack(MAGIC, FORMAT_VERSION, CODEC_RAW, 0) + raw
+    metrics.increment("text_compression_bytes_in_total", len(raw))
+    metrics.increment("text_compression_bytes_out_total", len(compressed))
+    return _HEADER.pack(MAGIC, FORMAT_VERSION, codec, dictionary_id or 0) + compressed
+
+
+def train_dictionary(samples: Iterable[str], dict_size: int = DICTIONARY_SIZE) -> bytes:
+    """Entrenar un diccionario zstd con textos de muestra (conviene tener varios miles)"""
+    if zstandard is None:
+        raise CompressionError("zstandard no está instalado")
+    encoded = [sample.encode("utf-8") for sample in samples if sample]
+    return zstandard.train_dictionary(dict_size, encoded).as_bytes()
+
+
+def parse_header(value: bytes) -> Optional[Tuple[int, int, int]]:
+    """(versión, códec, id de diccionario) o None si el valor no tiene cabecera"""
+    if len(value) < HEADER_SIZE or value[:2] != MAGIC:
+        return None
+    _, version, codec, dictionary_id = _HEADER.unpack_from(value)
+    return version, codec, dictionary_id
+
+
+def decompress_text(value: bytes) -> str:
+    """Valor guardado -> str (acepta valores sin cabecera como UTF-8 plano)"""
+    header = parse_header(value)
+    if header is None:
+        return value.decode("utf-8")
+    version, codec, dictionary_id = header
+    if version != FORMAT_VERSION:
+        raise CompressionError(f"Versión de formato de compresión no soportada: {version}")
+    payload = value[HEADER_SIZE:]
+    if codec == CODEC_RAW:
+        return payload.decode("utf-8")
+    if zstandard is None:
+        raise CompressionError("El valor está comprimido con zstd pero zstandard no está instalado")
+    if codec == CODEC_ZSTD:
+        return dictionaries.decompressor(None).decompress(payload).decode("utf-8")
+    if codec == CODEC_ZSTD_DICT:
+        return dictionaries.decompressor(dictionary_id).decompress(payload).decode("utf-8")
+    raise CompressionError(f"Códec de compresión desconocido: {codec}")
+
+
+class CompressedText(TypeDecorator):
+    """
+    Texto comprimido de forma transparente. Con TEXT_COMPRESSION distinto de zstd se
+    comporta exactamente como Text (mismo tipo de columna, sin cabecera).
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        return dialect.type_descriptor(LargeBinary() if COMPRESSION_ENABLED else Text())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or not COMPRESSION_ENABLED:
+            return value
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        return decompress_text(bytes(value))
+
+
+def compressed_columns_mismatch(connection, table: str, columns) -> Optional[str]:
+    """Mensaje de error si el tipo de las columnas en la base no coincide con TEXT_COMPRESSION"""
+    rows = connection.execute(text(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_name = :table AND column_name = ANY(:columns)"
+    ), {"table": table, "columns": list(columns)}).all()
+    expected = "bytea" if COMPRESSION_ENABLED else "text"
+    wrong = [f"{column} ({data_type})" for column, data_type in rows if data_type != expected]
+    if wrong:
+        return (f"{table}: se esperaba {expected} para {', '.join(wrong)} con TEXT_COMPRESSION={TEXT_COMPRESSION}; "
+                f"ejecutar python -m app.scripts.compress_clinical_text")
+    return None
+
+
+def init_text_compression(checks=()):
+    """
+    Arranque: cargar los diccionarios y avisar si alguna tabla de checks [(tabla, columnas)]
+    no coincide con TEXT_COMPRESSION (con la configuración equivocada las lecturas fallan).
+    """
+    from app.core.database import engine
+    with engine.connect() as connection:
+        if COMPRESSION_ENABLED:
+            if zstandard is None:
+                print("⚠️ TEXT_COMPRESSION: zstandard no está instalado; los textos se guardarán sin comprimir")
+            else:
+                dictionaries.load(connection)
+                print(f"🗜️ TEXT_COMPRESSION: zstd nivel {COMPRESSION_LEVEL}, diccionario activo: {dictionaries.active_id}")
+        for table, columns in checks:
+            problem = compressed_columns_mismatch(connection, table, columns)
+            if problem:
+                print(f"⚠️ TEXT_COMPRESSION: {problem}")
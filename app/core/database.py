@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
@@ -14,23 +14,69 @@ if not DATABASE_URL:
     # Fallback para desarrollo local
     DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL)
+# Cada worker de gunicorn tiene su propio pool: workers x (pool_size + max_overflow)
+# debe caber en max_connections de PostgreSQL
+engine = create_engine(
+    DATABASE_URL,
+    pool_size=int(os.environ.get("DB_POOL_SIZE", "5")),
+    max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", "10")),
+    pool_pre_ping=True
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-def create_tables():
-    """Crear todas las tablas en la base de datos"""
+# create_all no modifica tablas existentes: las columnas e índices añadidos a modelos
+# ya desplegados se aplican aquí con sentencias idempotentes
+SCHEMA_PATCHES = [
+    "ALTER TABLE appointment ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()",
+    "CREATE INDEX IF NOT EXISTS ix_appointment_doctor_updated ON appointment (doctor_id, updated_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_appointment_doctor_date_active ON appointment (doctor_id, appointment_date) WHERE deleted_at IS NULL",
+    # Misma expresión que MedicalHistory.search_vector (reescribe la tabla la primera vez)
+    "ALTER TABLE medical_history ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('spanish'::regconfig, coalesce(diagnosis, '')), 'A') || "
+    "setweight(to_tsvector('spanish'::regconfig, coalesce(symptoms, '')), 'B') || "
+    "setweight(to_tsvector('spanish'::regconfig, coalesce(medication, '')), 'C')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_medical_history_search ON medical_history USING gin (search_vector) WHERE deleted_at IS NULL",
+    "CREATE INDEX IF NOT EXISTS ix_appointment_patient_date_active ON appointment (patient_id, appointment_date, id) WHERE deleted_at IS NULL",
+    "CREATE INDEX IF NOT EXISTS ix_medical_history_appointment_active ON medical_history (id_appointment) WHERE deleted_at IS NULL",
+]
+
+def apply_schema_patches():
+    """Aplicar los cambios de esquema pendientes sobre tablas existentes"""
+    with engine.begin() as connection:
+        for statement in SCHEMA_PATCHES:
+            connection.execute(text(statement))
+    print(f"✅ {len(SCHEMA_PATCHES)} parches de esquema verificados")
+
+def import_models():
+    """
+    Importar todos los modelos para registrar sus mappers. Las relaciones se declaran por
+    nombre ("Credentials", "UserRole", ...): todo proceso que use el ORM debe llamarla,
+    aunque no cree las tablas.
+    """
     from app.modules.auth.models.user import User
     from app.modules.auth.models.role import Role
     from app.modules.auth.models.user_role import UserRole
     from app.modules.auth.models.credentials import Credentials
     from app.modules.citas.models.cita import Appointment
+    from app.modules.citas.models.appointment_reminder import AppointmentReminder
     from app.modules.schedules.models.doctor_schedule import DoctorSchedule
     from app.modules.schedules.models.doctor_availability_exception import DoctorAvailabilityException
     from app.modules.schedules.models.doctor_settings import DoctorSettings
     from app.modules.medical_history.models.medical_history import MedicalHistory
+    from app.core.models.idempotency_key import IdempotencyKey
+    from app.core.models.cache_entry import CacheEntry
+    from app.core.models.background_job import BackgroundJob
+    from app.core.models.outbox_event import OutboxEvent
+    from app.core.models.deletion_audit import DeletionAudit
+    from app.core.models.compression_dictionary import CompressionDictionary
+    from app.modules.reports.models.report_job import ReportJob
 
+def create_tables():
+    """Crear todas las tablas en la base de datos"""
+    import_models()
     print("Creando tablas...")
     print(f"Tablas a crear: {list(Base.metadata.tables.keys())}")
     Base.metadata.create_all(bind=engine)
+    apply_schema_patches()
     print("✅ Tablas creadas exitosamente")
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""
+GET condicional (ETag / Last-Modified) para endpoints de lectura.
+
+Cada endpoint calcula un ETag débil a partir de una versión barata de los datos
+(updated_at, contadores o campos estables) antes de cargar y serializar la respuesta
+completa. Si el cliente ya tiene esa versión (If-None-Match / If-Modified-Since)
+se responde 304 sin cuerpo.
+
+Uso en un endpoint (response es el Response inyectado por FastAPI):
+
+    etag = make_etag("settings", settings.id, settings.updated_at)
+    not_modified = conditional_response(request, response, etag, cache_control=PRIVATE_REVALIDATE)
+    if not_modified:
+        return not_modified
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+from app.core.metrics import metrics
+
+# Políticas de Cache-Control por ruta: siempre se revalida, pero el cliente puede guardar la copia
+PUBLIC_REVALIDATE = "public, max-age=0, must-revalidate"
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """ETag débil a partir de los valores que definen la versión del recurso"""
+    version = "|".join("" if part is None else (part.isoformat() if isinstance(part, datetime) else str(part))
+                       for part in parts)
+    return f'W/"{hashlib.sha1(version.encode()).hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil de If-None-Match (admite lista y '*')"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return "*" in candidates or any(
+        (candidate[2:] if candidate.startswith("W/") else candidate) == opaque for candidate in candidates
+    )
+
+
+def http_date(value: datetime) -> str:
+    """Fecha en formato HTTP (RFC 7231), sin microsegundos"""
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _not_modified_since(if_modified_since: Optional[str], last_modified: Optional[datetime]) -> bool:
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.astimezone()
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = PRIVATE_REVALIDATE
+) -> Optional[Response]:
+    """
+    Añadir ETag/Last-Modified/Cache-Control a la respuesta y devolver un 304 si el
+    cliente ya tiene esta versión; devuelve None si hay que generar el cuerpo.
+    If-None-Match tiene prioridad sobre If-Modified-Since (RFC 7232).
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        not_modified = etag_matches(if_none_match, etag)
+    else:
+        not_modified = _not_modified_since(request.headers.get("if-modified-since"), last_modified)
+
+    route = request.scope.get("route")
+    labels = {"route": getattr(route, "path", request.url.path)}
+    if not_modified:
+        metrics.increment("http_not_modified_total", labels=labels)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    metrics.increment("http_conditional_misses_total", labels=labels)
+    response.headers.update(headers)
+    return None
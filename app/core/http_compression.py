@@ -0,0 +1,185 @@
+"""
+Compresión HTTP de respuestas (gzip, y brotli si está instalado).
+
+Middleware ASGI puro (no BaseHTTPMiddleware, que bufferiza los streams):
+- Solo comprime respuestas de un único mensaje de cuerpo. Las respuestas en streaming
+  (SSE de la agenda del día, exportaciones CSV/NDJSON, FileResponse) y los WebSocket pasan
+  sin tocar: comprimirlas retiene eventos en el buffer del compresor.
+- Cada prefijo de ruta tiene su regla (tamaño mínimo y nivel); EXCLUDED_PREFIXES no se comprime.
+  Los listados grandes usan un nivel medio; las rutas pequeñas y frecuentes no se comprimen.
+- Los cuerpos de más de HTTP_COMPRESSION_THREADPOOL_BYTES se comprimen en el threadpool de
+  anyio para no bloquear el event loop; los chicos se comprimen en línea (es más barato
+  que el salto de hilo).
+- Métricas por regla y codificación: http_compression_bytes_in_total / _out_total,
+  http_compression_seconds y http_compression_skipped_total por motivo.
+"""
+import gzip
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se ofrece gzip
+    brotli = None
+
+HTTP_COMPRESSION_ENABLED = os.getenv("HTTP_COMPRESSION", "true").lower() == "true"
+HTTP_COMPRESSION_THREADPOOL_BYTES = int(os.getenv("HTTP_COMPRESSION_THREADPOOL_BYTES", str(64 * 1024)))
+
+# Tipos de contenido que vale la pena comprimir (xlsx, imágenes, etc. ya están comprimidos)
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/xml", "application/javascript", "application/x-ndjson")
+
+
+@dataclass(frozen=True)
+class CompressionRule:
+    prefix: str
+    min_size: int = 1400  # por debajo de un paquete TCP comprimir no ahorra viajes
+    gzip_level: int = 5
+    brotli_quality: int = 4
+
+
+# Se aplica la regla con el prefijo más largo que coincida
+COMPRESSION_RULES = [
+    CompressionRule("/appointments", min_size=1024, gzip_level=5, brotli_quality=4),
+    CompressionRule("/citas", min_size=1024, gzip_level=5, brotli_quality=4),
+    CompressionRule("/users", min_size=1024, gzip_level=5, brotli_quality=4),
+    # Textos clínicos largos y repetitivos: un nivel más alto compensa
+    CompressionRule("/medical-history", min_size=512, gzip_level=6, brotli_quality=5),
+    CompressionRule("/patients", min_size=512, gzip_level=6, brotli_quality=5),
+    # Respuestas generadas por el asistente: se generan una vez y se leen completas
+    CompressionRule("/assistantAI", min_size=512, gzip_level=6, brotli_quality=5),
+    CompressionRule("/reports", min_size=1024, gzip_level=5, brotli_quality=4),
+]
+DEFAULT_RULE = CompressionRule("")
+# Rutas que nunca se comprimen (además de todo lo que llegue en streaming)
+EXCLUDED_PREFIXES = ("/health", "/appointments/today/stream", "/citas/today/stream")
+
+
+def find_rule(path: str) -> Optional[CompressionRule]:
+    if any(path.startswith(prefix) for prefix in EXCLUDED_PREFIXES):
+        return None
+    matches = [rule for rule in COMPRESSION_RULES if path.startswith(rule.prefix)]
+    return max(matches, key=lambda rule: len(rule.prefix)) if matches else DEFAULT_RULE
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """br o gzip según Accept-Encoding (respeta q=0); None si el cliente no acepta ninguna"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        parts = [part.strip() for part in item.split(";")]
+        if not parts[0]:
+            continue
+        quality = 1.0
+        for parameter in parts[1:]:
+            if parameter.startswith("q="):
+                try:
+                    quality = float(parameter[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[parts[0].lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    options = ["br", "gzip"] if brotli is not None else ["gzip"]
+    candidates = [(accepted.get(encoding, wildcard), encoding) for encoding in options]
+    candidates = [candidate for candidate in candidates if candidate[0] > 0]
+    # A igual calidad se prefiere br (orden de options)
+    return max(candidates, key=lambda candidate: candidate[0])[1] if candidates else None
+
+
+def compress_body(body: bytes, encoding: str, rule: CompressionRule) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=rule.brotli_quality)
+    return gzip.compress(body, compresslevel=rule.gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rule = find_rule(scope["path"])
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", "")) if rule else None
+        if rule is None or encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponse(rule, encoding, send).run(self.app, scope, receive)
+
+
+class _CompressedResponse:
+    """Estado de una respuesta: retiene http.response.start hasta ver el primer cuerpo"""
+
+    def __init__(self, rule: CompressionRule, encoding: str, send):
+        self.rule = rule
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.passthrough = False
+
+    async def run(self, app, scope, receive):
+        await app(scope, receive, self.send_wrapper)
+
+    def _skip(self, reason: str):
+        self.passthrough = True
+        metrics.increment("http_compression_skipped_total", labels={"reason": reason})
+
+    async def send_wrapper(self, message):
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            if "content-encoding" in headers:
+                self._skip("already_encoded")
+            elif message["status"] < 200 or message["status"] in (204, 304):
+                self._skip("no_body")
+            elif not content_type.startswith(COMPRESSIBLE_TYPES) or content_type.startswith("text/event-stream"):
+                self._skip("content_type")
+            if self.passthrough:
+                await self.send(self.start_message)
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        if message.get("more_body", False):
+            # Streaming: se envía tal cual, sin esperar el cuerpo completo
+            self._skip("streaming")
+            await self.send(self.start_message)
+            await self.send(message)
+            return
+        if len(body) < self.rule.min_size:
+            self._skip("too_small")
+            await self.send(self.start_message)
+            await self.send(message)
+            return
+
+        started = time.perf_counter()
+        if len(body) >= HTTP_COMPRESSION_THREADPOOL_BYTES:
+            compressed = await anyio.to_thread.run_sync(compress_body, body, self.encoding, self.rule)
+        else:
+            compressed = compress_body(body, self.encoding, self.rule)
+        labels = {"route": self.rule.prefix or "default", "encoding": self.encoding}
+        metrics.observe("http_compression_seconds", time.perf_counter() - started, labels)
+        metrics.increment("http_compression_bytes_in_total", len(body), labels)
+        metrics.increment("http_compression_bytes_out_total", len(compressed), labels)
+
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+        self.passthrough = True
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": False})
@@ -0,0 +1,229 @@
+"""
+Soporte para el header Idempotency-Key en operaciones de escritura.
+
+La primera petición con una clave la reserva en la tabla idempotency_key; cuando
+termina se guarda su respuesta y los reintentos con la misma clave y el mismo
+cuerpo reciben esa respuesta sin volver a ejecutar la operación. La reserva usa
+INSERT ... ON CONFLICT en su propia transacción, así que es segura entre workers
+y entre nodos que compartan la base de datos.
+"""
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from fastapi import Header, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.core.job_queue import task
+from app.core.models.idempotency_key import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_TTL = timedelta(hours=int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")))
+# Tiempo tras el cual una reserva "in_progress" se considera abandonada (worker caído)
+IDEMPOTENCY_LOCK_TIMEOUT = timedelta(seconds=int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", "120")))
+MAX_KEY_LENGTH = 255
+
+
+def get_idempotency_key(
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+) -> Optional[str]:
+    """Dependencia para leer el header Idempotency-Key (opcional)"""
+    if idempotency_key is None:
+        return None
+    idempotency_key = idempotency_key.strip()
+    if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{IDEMPOTENCY_HEADER} debe tener entre 1 y {MAX_KEY_LENGTH} caracteres"
+        )
+    return idempotency_key
+
+
+def request_fingerprint(payload: Any) -> str:
+    """Huella sha256 estable del cuerpo de la petición"""
+    encoded = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def purge_expired_idempotency_keys(db: Session) -> int:
+    """Eliminar claves expiradas; devuelve cuántas se borraron"""
+    result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < datetime.now(timezone.utc)))
+    db.commit()
+    print(f"🧹 IDEMPOTENCY: {result.rowcount} claves expiradas eliminadas")
+    return result.rowcount
+
+
+@task("idempotency.purge", priority=500, max_attempts=3, every_seconds=3600)
+def purge_expired_idempotency_keys_task(db: Session, payload: dict):
+    """Tarea periódica de la cola: limpieza de claves expiradas"""
+    purge_expired_idempotency_keys(db)
+
+
+class IdempotencyService:
+    """
+    Ciclo de vida de una clave: begin() antes de la operación, y complete() o abort() al terminar.
+    Si la petición no trae clave, todos los métodos son no-op.
+    """
+
+    def __init__(self, key: Optional[str], scope: str, payload: Any):
+        self.key = key
+        self.scope = scope
+        self.fingerprint = request_fingerprint(payload) if key else None
+
+    def begin(self) -> Optional[JSONResponse]:
+        """
+        Reservar la clave
+
+        Returns:
+            Optional[JSONResponse]: Respuesta guardada si la petición ya se completó, o None
+            si esta petición debe ejecutar la operación
+
+        Raises:
+            HTTPException: 422 si la clave se reutiliza con otro cuerpo, 409 si la petición
+            original sigue en curso
+        """
+        if not self.key:
+            return None
+
+        now = datetime.now(timezone.utc)
+        with engine.begin() as connection:
+            reserved = connection.execute(
+                insert(IdempotencyKey).values(
+                    key=self.key,
+                    scope=self.scope,
+                    fingerprint=self.fingerprint,
+                    status="in_progress",
+                    locked_at=now,
+                    expires_at=now + IDEMPOTENCY_TTL
+                ).on_conflict_do_nothing().returning(IdempotencyKey.key)
+            ).first()
+            if reserved:
+                return None
+
+            existing = connection.execute(
+                select(IdempotencyKey).where(
+                    IdempotencyKey.key == self.key,
+                    IdempotencyKey.scope == self.scope
+                ).with_for_update()
+            ).first()
+
+            # La reserva expiró o quedó abandonada: esta petición la toma
+            if existing is None or existing.expires_at <= now or (
+                existing.status == "in_progress" and existing.locked_at <= now - IDEMPOTENCY_LOCK_TIMEOUT
+            ):
+                connection.execute(
+                    insert(IdempotencyKey).values(
+                        key=self.key,
+                        scope=self.scope,
+                        fingerprint=self.fingerprint,
+                        status="in_progress",
+                        locked_at=now,
+                        expires_at=now + IDEMPOTENCY_TTL
+                    ).on_conflict_do_update(
+                        index_elements=[IdempotencyKey.key, IdempotencyKey.scope],
+                        set_={
+                            "fingerprint": self.fingerprint,
+                            "status": "in_progress",
+                            "response_status": None,
+                            "response_body": None,
+                            "locked_at": now,
+                            "expires_at": now + IDEMPOTENCY_TTL
+                        }
+                    )
+                )
+                return None
+
+        if existing.fingerprint != self.fingerprint:
+            print(f"❌ IDEMPOTENCY: Clave {self.key} reutilizada con otro cuerpo ({self.scope})")
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"{IDEMPOTENCY_HEADER} ya fue usada con una petición diferente"
+            )
+
+        if existing.status != "completed":
+            print(f"⏳ IDEMPOTENCY: Petición con clave {self.key} todavía en curso ({self.scope})")
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Una petición con la misma Idempotency-Key está en curso",
+                headers={"Retry-After": "1"}
+            )
+
+        print(f"🔁 IDEMPOTENCY: Repitiendo respuesta guardada para la clave {self.key} ({self.scope})")
+        return JSONResponse(
+            status_code=existing.response_status,
+            content=json.loads(existing.response_body),
+            headers={"Idempotent-Replayed": "true"}
+        )
+
+    def complete(self, status_code: int, body: Any):
+        """Guardar la respuesta final para repetirla en los reintentos"""
+        if not self.key:
+            return
+        with engine.begin() as connection:
+            connection.execute(
+                update(IdempotencyKey).where(
+                    IdempotencyKey.key == self.key,
+                    IdempotencyKey.scope == self.scope
+                ).values(
+                    status="completed",
+                    response_status=status_code,
+                    response_body=json.dumps(jsonable_encoder(body)),
+                    expires_at=datetime.now(timezone.utc) + IDEMPOTENCY_TTL
+                )
+            )
+
+    def complete_committed(self, status_code: int, body: Any, attempts: int = 3) -> bool:
+        """
+        Guardar la respuesta de una operación que ya se confirmó en la base de datos.
+        Nunca lanza ni libera la clave: si se liberara, el reintento del cliente repetiría
+        la operación. Si no se puede guardar, los reintentos reciben 409 hasta que la
+        reserva expire (IDEMPOTENCY_LOCK_TIMEOUT).
+        """
+        for attempt in range(1, attempts + 1):
+            try:
+                self.complete(status_code, body)
+                return True
+            except Exception as e:
+                print(f"⚠️ IDEMPOTENCY: Error guardando la respuesta de la clave {self.key} "
+                      f"(intento {attempt}/{attempts}): {e}")
+                if attempt < attempts:
+                    time.sleep(0.1 * attempt)
+        print(f"❌ IDEMPOTENCY: No se pudo guardar la respuesta de la clave {self.key} ({self.scope})")
+        return False
+
+    def complete_or_abort(self, status_code: int, body: Any) -> bool:
+        """
+        Guardar la respuesta de un error de validación (nada se confirmó). Nunca lanza: si
+        no se puede guardar se libera la clave, y el reintento vuelve a ejecutar la operación.
+        """
+        try:
+            self.complete(status_code, body)
+            return True
+        except Exception as e:
+            print(f"⚠️ IDEMPOTENCY: Error guardando la respuesta de la clave {self.key}; se libera: {e}")
+        try:
+            self.abort()
+        except Exception as e:
+            print(f"❌ IDEMPOTENCY: No se pudo liberar la clave {self.key} ({self.scope}): {e}")
+        return False
+
+    def abort(self):
+        """Liberar la reserva tras un error inesperado para que el cliente pueda reintentar"""
+        if not self.key:
+            return
+        with engine.begin() as connection:
+            connection.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.key == self.key,
+                    IdempotencyKey.scope == self.scope,
+                    IdempotencyKey.status == "in_progress"
+                )
+            )
@@ -0,0 +1,297 @@
+"""
+Cola de trabajos en segundo plano sobre PostgreSQL.
+
+- Las tareas se registran con el decorador @task("nombre") y reciben (db, payload).
+- enqueue() agrega el trabajo a la sesión del llamador, así se confirma en la misma
+  transacción que el cambio que lo origina (si la petición falla, no queda trabajo huérfano).
+- Los workers reclaman trabajos con SELECT ... FOR UPDATE SKIP LOCKED ordenados por
+  prioridad y run_at, con un lease: si un worker muere, el trabajo vuelve a estar
+  disponible cuando vence locked_until.
+- Los fallos se reintentan con backoff exponencial (con jitter) hasta max_attempts.
+
+Worker:
+    python -m app.worker
+"""
+import importlib
+import json
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, func, or_, select, text, update
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, engine
+from app.core.metrics import metrics
+from app.core.models.background_job import BackgroundJob
+
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "10"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "3600"))
+PERIODIC_CHECK_SECONDS = 60
+DEFAULT_PRIORITY = 100
+
+# Módulos que registran tareas con @task; se importan en la API y en el worker
+TASK_MODULES = [
+    "app.core.idempotency",
+    "app.core.outbox",
+    "app.core.retention",
+    "app.modules.reports.services.report_service",
+    "app.modules.schedules.services.schedule_tasks",
+    "app.modules.citas.services.reminder_service",
+    "app.modules.citas.services.appointment_partitions",
+]
+
+
+@dataclass
+class TaskDefinition:
+    name: str
+    handler: Callable[[Session, Dict[str, Any]], Any]
+    priority: int = DEFAULT_PRIORITY
+    max_attempts: int = 5
+    lease_seconds: int = JOB_LEASE_SECONDS
+    every_seconds: Optional[float] = None  # tareas periódicas: los workers las reprograman solas
+
+
+TASKS: Dict[str, TaskDefinition] = {}
+
+
+def task(
+    name: str,
+    priority: int = DEFAULT_PRIORITY,
+    max_attempts: int = 5,
+    lease_seconds: int = JOB_LEASE_SECONDS,
+    every_seconds: Optional[float] = None
+):
+    """Registrar una función como tarea de la cola: handler(db, payload)"""
+    def decorator(handler: Callable[[Session, Dict[str, Any]], Any]):
+        TASKS[name] = TaskDefinition(name, handler, priority, max_attempts, lease_seconds, every_seconds)
+        return handler
+    return decorator
+
+
+def load_task_modules():
+    """Importar los módulos de tareas para llenar el registro TASKS"""
+    for module in TASK_MODULES:
+        importlib.import_module(module)
+
+
+def enqueue(
+    db: Session,
+    task_name: str,
+    payload: Optional[Dict[str, Any]] = None,
+    priority: Optional[int] = None,
+    delay_seconds: float = 0,
+    run_at: Optional[datetime] = None,
+    max_attempts: Optional[int] = None
+) -> BackgroundJob:
+    """
+    Agregar un trabajo a la sesión (se guarda con el próximo commit del llamador).
+    Los valores por defecto de prioridad e intentos salen de la definición de la tarea.
+    """
+    definition = TASKS.get(task_name)
+    if run_at is None and delay_seconds:
+        run_at = datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)
+
+    job = BackgroundJob(
+        task_name=task_name,
+        payload=json.dumps(payload or {}, default=str),
+        priority=priority if priority is not None else (definition.priority if definition else DEFAULT_PRIORITY),
+        max_attempts=max_attempts or (definition.max_attempts if definition else 5),
+        status="queued",
+        attempts=0
+    )
+    if run_at is not None:
+        job.run_at = run_at
+    db.add(job)
+    metrics.increment("job_queue_enqueued_total", labels={"task": task_name})
+    return job
+
+
+def retry_delay(attempts: int) -> float:
+    """Backoff exponencial con jitter: base * 2^(intentos-1), con tope"""
+    delay = min(JOB_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), JOB_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class JobWorker:
+    """Worker que reclama y ejecuta trabajos de la cola hasta que se le pide parar"""
+
+    def __init__(self, worker_id: Optional[str] = None, batch_size: int = 1, tasks: Optional[List[str]] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.batch_size = batch_size
+        self.tasks = tasks
+        self._stop = threading.Event()
+        self._next_periodic_check = 0.0
+
+    def stop(self):
+        self._stop.set()
+
+    def claim(self) -> List[BackgroundJob]:
+        """Reclamar trabajos disponibles (o con lease vencido) sin bloquear a otros workers"""
+        now = datetime.now(timezone.utc)
+        available = or_(
+            and_(BackgroundJob.status == "queued", BackgroundJob.run_at <= now),
+            and_(BackgroundJob.status == "running", BackgroundJob.locked_until < now)
+        )
+        candidates = select(BackgroundJob.id).where(available)
+        if self.tasks:
+            candidates = candidates.where(BackgroundJob.task_name.in_(self.tasks))
+        candidates = candidates.order_by(
+            BackgroundJob.priority, BackgroundJob.run_at
+        ).limit(self.batch_size).with_for_update(skip_locked=True)
+
+        with SessionLocal() as db:
+            jobs = db.scalars(
+                update(BackgroundJob)
+                .where(BackgroundJob.id.in_(candidates.scalar_subquery()))
+                .values(
+                    status="running",
+                    attempts=BackgroundJob.attempts + 1,
+                    locked_by=self.worker_id,
+                    locked_until=now + timedelta(seconds=JOB_LEASE_SECONDS)
+                )
+                .returning(BackgroundJob)
+                .execution_options(synchronize_session=False)
+            ).all()
+            db.commit()
+            for job in jobs:
+                db.expunge(job)
+        return jobs
+
+    def _finish(self, job: BackgroundJob, values: Dict[str, Any]):
+        # Solo el dueño actual del lease puede cerrar el trabajo
+        with engine.begin() as connection:
+            connection.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.id == job.id, BackgroundJob.locked_by == self.worker_id)
+                .values(locked_by=None, locked_until=None, **values)
+            )
+
+    def run_job(self, job: BackgroundJob):
+        """Ejecutar un trabajo reclamado y registrar el resultado"""
+        labels = {"task": job.task_name}
+        started = time.monotonic()
+        run_at = job.run_at if job.run_at.tzinfo else job.run_at.replace(tzinfo=timezone.utc)
+        metrics.observe("job_queue_lag_seconds", (datetime.now(timezone.utc) - run_at).total_seconds(), labels)
+
+        definition = TASKS.get(job.task_name)
+        try:
+            if definition is None:
+                raise LookupError(f"Tarea no registrada: {job.task_name}")
+            if definition.lease_seconds != JOB_LEASE_SECONDS:
+                self._extend_lease(job, definition.lease_seconds)
+
+            with SessionLocal() as db:
+                definition.handler(db, json.loads(job.payload or "{}"))
+
+            self._finish(job, {"status": "completed", "finished_at": datetime.now(timezone.utc), "last_error": None})
+            metrics.increment("job_queue_completed_total", labels=labels)
+            print(f"✅ JOB_QUEUE: Trabajo {job.id} ({job.task_name}) completado")
+        except Exception as e:
+            error = f"{e}\n{traceback.format_exc(limit=5)}"
+            if job.attempts >= job.max_attempts:
+                self._finish(job, {"status": "failed", "finished_at": datetime.now(timezone.utc), "last_error": error})
+                metrics.increment("job_queue_failed_total", labels=labels)
+                print(f"❌ JOB_QUEUE: Trabajo {job.id} ({job.task_name}) falló definitivamente: {e}")
+            else:
+                delay = retry_delay(job.attempts)
+                self._finish(job, {
+                    "status": "queued",
+                    "run_at": datetime.now(timezone.utc) + timedelta(seconds=delay),
+                    "last_error": error
+                })
+                metrics.increment("job_queue_retried_total", labels=labels)
+                print(f"⚠️ JOB_QUEUE: Trabajo {job.id} ({job.task_name}) falló (intento {job.attempts}), reintento en {delay:.0f}s: {e}")
+        finally:
+            metrics.observe("job_queue_duration_seconds", time.monotonic() - started, labels)
+
+    def _extend_lease(self, job: BackgroundJob, lease_seconds: int):
+        with engine.begin() as connection:
+            connection.execute(
+                update(BackgroundJob)
+                .where(BackgroundJob.id == job.id, BackgroundJob.locked_by == self.worker_id)
+                .values(locked_until=datetime.now(timezone.utc) + timedelta(seconds=lease_seconds))
+            )
+
+    def run_once(self) -> int:
+        """Reclamar y ejecutar un lote; devuelve cuántos trabajos se procesaron"""
+        jobs = self.claim()
+        for job in jobs:
+            self.run_job(job)
+        return len(jobs)
+
+    def schedule_periodic(self):
+        """Encolar la próxima ejecución de cada tarea periódica que no tenga una pendiente"""
+        for definition in TASKS.values():
+            if not definition.every_seconds or (self.tasks and definition.name not in self.tasks):
+                continue
+            with SessionLocal() as db:
+                # Serializa la comprobación entre workers para no duplicar la tarea
+                db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": f"periodic:{definition.name}"})
+                pending = db.scalar(select(func.count(BackgroundJob.id)).where(
+                    BackgroundJob.task_name == definition.name,
+                    BackgroundJob.status.in_(["queued", "running"])
+                ))
+                if not pending:
+                    last_run = db.scalar(select(func.max(BackgroundJob.finished_at)).where(
+                        BackgroundJob.task_name == definition.name
+                    ))
+                    run_at = last_run + timedelta(seconds=definition.every_seconds) if last_run else None
+                    enqueue(db, definition.name, {}, run_at=run_at)
+                db.commit()
+
+    def run_forever(self, poll_interval: float = JOB_POLL_INTERVAL_SECONDS):
+        print(f"👷 JOB_QUEUE: Worker {self.worker_id} iniciado (tareas: {self.tasks or sorted(TASKS)})")
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() >= self._next_periodic_check:
+                    self.schedule_periodic()
+                    self._next_periodic_check = time.monotonic() + PERIODIC_CHECK_SECONDS
+                processed = self.run_once()
+            except Exception as e:
+                print(f"❌ JOB_QUEUE: Error reclamando trabajos: {e}")
+                processed = 0
+            if not processed:
+                self._stop.wait(poll_interval)
+        print(f"👋 JOB_QUEUE: Worker {self.worker_id} detenido")
+
+
+def queue_depth(db: Session) -> Dict[str, int]:
+    """Trabajos por estado (para monitoreo)"""
+    rows = db.execute(
+        select(BackgroundJob.status, func.count(BackgroundJob.id)).group_by(BackgroundJob.status)
+    ).all()
+    return {status: count for status, count in rows}
+
+
+_in_process_worker: Optional[JobWorker] = None
+
+
+def start_in_process_worker(poll_interval: float = JOB_POLL_INTERVAL_SECONDS) -> JobWorker:
+    """
+    Ejecutar un worker en un hilo del proceso de la API (despliegues de un solo servicio).
+    Con un servicio de worker dedicado (python -m app.worker) no es necesario.
+    """
+    global _in_process_worker
+    if _in_process_worker is None:
+        _in_process_worker = JobWorker()
+        threading.Thread(
+            target=_in_process_worker.run_forever, args=(poll_interval,), name="job-worker", daemon=True
+        ).start()
+    return _in_process_worker
+
+
+def stop_in_process_worker():
+    global _in_process_worker
+    if _in_process_worker is not None:
+        _in_process_worker.stop()
+        _in_process_worker = None
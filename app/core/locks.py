@@ -0,0 +1,147 @@
+"""
+Locks de reserva por (doctor, fecha).
+
+Serializan la sección crítica "validar disponibilidad + insertar cita" para que dos
+peticiones concurrentes no reserven el mismo slot, aunque lleguen a procesos o nodos
+distintos. El backend por defecto usa advisory locks de PostgreSQL a nivel de
+transacción; el backend en memoria sirve para pruebas y despliegues de un solo proceso.
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.database import engine
+from app.core.metrics import metrics
+
+BookingKey = Tuple[int, date]
+
+BOOKING_LOCK_TIMEOUT_MS = int(os.getenv("BOOKING_LOCK_TIMEOUT_MS", "5000"))
+
+
+# Segundos que se sugieren al cliente (Retry-After) cuando el lock no llega a tiempo
+BOOKING_LOCK_RETRY_AFTER_SECONDS = max(1, -(-BOOKING_LOCK_TIMEOUT_MS // 1000))
+
+
+class BookingLockTimeout(Exception):
+    """
+    No se pudo obtener el lock de reserva a tiempo. No es un error de validación: la misma
+    petición puede funcionar al reintentar, así que no hereda de ValueError.
+    """
+
+
+def _sorted_keys(keys: Iterable[BookingKey]) -> List[BookingKey]:
+    # Orden global fijo para evitar deadlocks cuando se bloquean varias fechas
+    return sorted(set(keys))
+
+
+def _record_wait(backend: str, started: float, contended: bool):
+    metrics.observe("booking_lock_wait_seconds", time.monotonic() - started, {"backend": backend})
+    metrics.increment("booking_lock_acquired_total", labels={"backend": backend})
+    if contended:
+        metrics.increment("booking_lock_contended_total", labels={"backend": backend})
+
+
+class BookingLockBackend(ABC):
+    name = "base"
+
+    @abstractmethod
+    def hold(self, db: Session, keys: Iterable[BookingKey]):
+        """Context manager: mantener el lock de todas las claves mientras dura el bloque"""
+
+
+class PostgresAdvisoryLockBackend(BookingLockBackend):
+    """
+    Usa pg_advisory_xact_lock(doctor_id, día) en la transacción de la sesión.
+    El lock se libera automáticamente con el commit o rollback de esa transacción,
+    por lo que la sección crítica debe terminar con db.commit().
+    """
+    name = "postgres"
+
+    @contextmanager
+    def hold(self, db: Session, keys: Iterable[BookingKey]):
+        try:
+            for doctor_id, target_date in _sorted_keys(keys):
+                params = {"doctor_id": doctor_id, "day": target_date.toordinal()}
+                started = time.monotonic()
+                acquired = db.execute(text("SELECT pg_try_advisory_xact_lock(:doctor_id, :day)"), params).scalar()
+                if not acquired:
+                    db.execute(text(f"SET LOCAL lock_timeout = '{BOOKING_LOCK_TIMEOUT_MS}ms'"))
+                    try:
+                        db.execute(text("SELECT pg_advisory_xact_lock(:doctor_id, :day)"), params)
+                    except OperationalError:
+                        metrics.increment("booking_lock_timeouts_total", labels={"backend": self.name})
+                        raise BookingLockTimeout("El horario está siendo reservado por otra solicitud. Intente de nuevo.")
+                _record_wait(self.name, started, contended=not acquired)
+            yield
+        except Exception:
+            # Liberar los locks ya tomados si la sección crítica falla antes del commit
+            db.rollback()
+            raise
+
+
+class InMemoryLockBackend(BookingLockBackend):
+    """Locks por proceso; solo válidos con un único worker o en pruebas"""
+    name = "memory"
+
+    def __init__(self):
+        self._locks: Dict[BookingKey, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _lock_for(self, key: BookingKey) -> threading.Lock:
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    @contextmanager
+    def hold(self, db: Session, keys: Iterable[BookingKey]):
+        held = []
+        try:
+            for key in _sorted_keys(keys):
+                lock = self._lock_for(key)
+                started = time.monotonic()
+                acquired = lock.acquire(blocking=False)
+                contended = not acquired
+                if not acquired and not lock.acquire(timeout=BOOKING_LOCK_TIMEOUT_MS / 1000):
+                    metrics.increment("booking_lock_timeouts_total", labels={"backend": self.name})
+                    raise BookingLockTimeout("El horario está siendo reservado por otra solicitud. Intente de nuevo.")
+                held.append(lock)
+                _record_wait(self.name, started, contended)
+            yield
+        finally:
+            for lock in reversed(held):
+                lock.release()
+
+
+_backend: Optional[BookingLockBackend] = None
+
+
+def get_booking_lock_backend() -> BookingLockBackend:
+    """Backend configurado con BOOKING_LOCK_BACKEND (postgres | memory)"""
+    global _backend
+    if _backend is None:
+        default = "postgres" if engine.dialect.name == "postgresql" else "memory"
+        choice = os.getenv("BOOKING_LOCK_BACKEND", default).lower()
+        _backend = InMemoryLockBackend() if choice == "memory" else PostgresAdvisoryLockBackend()
+        print(f"🔒 BOOKING_LOCK: Usando backend '{_backend.name}'")
+    return _backend
+
+
+def set_booking_lock_backend(backend: BookingLockBackend):
+    """Reemplazar el backend (p. ej. InMemoryLockBackend en pruebas)"""
+    global _backend
+    _backend = backend
+
+
+def booking_lock(db: Session, keys: Iterable[BookingKey]):
+    """Context manager que bloquea las combinaciones (doctor_id, fecha) indicadas"""
+    return get_booking_lock_backend().hold(db, keys)
@@ -0,0 +1,71 @@
+"""
+Métricas simples en memoria (contadores, medidas y gauges).
+
+Cada proceso mantiene su propio registro; se exponen en GET /health/metrics.
+"""
+import threading
+from typing import Dict, Optional
+
+
+def _metric_key(name: str, labels: Optional[Dict[str, object]]) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f"{label}={value}" for label, value in sorted(labels.items()))
+    return f"{name}{{{rendered}}}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._summaries: Dict[str, Dict[str, float]] = {}
+
+    def increment(self, name: str, value: float = 1, labels: Optional[Dict[str, object]] = None):
+        """Sumar a un contador"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, object]] = None):
+        """Fijar el valor actual de un gauge"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, object]] = None):
+        """Registrar una medida (p. ej. una duración) acumulando count, sum y max"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = {"count": 0, "sum": 0.0, "max": value}
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["max"] = max(summary["max"], value)
+
+    def get_counter(self, name: str, labels: Optional[Dict[str, object]] = None) -> float:
+        with self._lock:
+            return self._counters.get(_metric_key(name, labels), 0)
+
+    def snapshot(self) -> dict:
+        """Copia de todas las métricas, con el promedio calculado para cada medida"""
+        with self._lock:
+            summaries = {
+                key: {**summary, "avg": summary["sum"] / summary["count"] if summary["count"] else 0.0}
+                for key, summary in self._summaries.items()
+            }
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": summaries,
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+
+metrics = MetricsRegistry()
@@ -1,5 +1,6 @@
 from fastapi.middleware.cors import CORSMiddleware
 import os
+from app.core.http_compression import HTTP_COMPRESSION_ENABLED, CompressionMiddleware, brotli
 
 def configure_middleware(app):
     origins = [
@@ -26,3 +27,8 @@ def configure_middleware(app):
         allow_methods=["*"],
         allow_headers=["*"],
     )
+
+    # Compresión gzip/brotli por ruta (ver app/core/http_compression.py); queda por fuera de CORS
+    if HTTP_COMPRESSION_ENABLED:
+        app.add_middleware(CompressionMiddleware)
+        print(f"🗜️ Compresión HTTP activa (gzip{', br' if brotli is not None else ''})")
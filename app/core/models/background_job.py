@@ -0,0 +1,29 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Text, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class BackgroundJob(Base):
+    __tablename__ = "background_job"
+
+    id = Column(BigInteger, primary_key=True)
+    task_name = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False, default="{}")  # JSON con los argumentos de la tarea
+    priority = Column(Integer, nullable=False, default=100)  # menor valor = se ejecuta antes
+    status = Column(String(20), nullable=False, default="queued")  # queued | running | completed | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_by = Column(String(100), nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)  # fin del lease del worker
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Orden de reclamo: solo las filas pendientes o en ejecución entran en el índice
+        Index("ix_background_job_claim", "priority", "run_at",
+              postgresql_where=status.in_(["queued", "running"])),
+    )
+
+    def __repr__(self):
+        return f"<BackgroundJob(id={self.id}, task={self.task_name}, status={self.status}, attempts={self.attempts})>"
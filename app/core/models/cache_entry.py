@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, DateTime, Text
+from app.core.database import Base
+
+class CacheEntry(Base):
+    __tablename__ = "cache_entry"
+    # UNLOGGED: no genera WAL; si la base se reinicia la caché simplemente se vacía
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    key = Column(String(255), primary_key=True)
+    value = Column(Text, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<CacheEntry(key={self.key}, expires_at={self.expires_at})>"
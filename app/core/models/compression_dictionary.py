@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class CompressionDictionary(Base):
+    """Diccionarios zstd entrenados; el id se guarda en la cabecera de cada valor comprimido"""
+    __tablename__ = "compression_dictionary"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False, index=True)  # p. ej. clinical_text
+    data = Column(LargeBinary, nullable=False)
+    sample_count = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<CompressionDictionary(id={self.id}, name={self.name}, size={len(self.data or b'')})>"
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Text, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class DeletionAudit(Base):
+    """Registro mínimo de cada fila borrada definitivamente por la retención (sin contenido clínico)"""
+    __tablename__ = "deletion_audit"
+
+    id = Column(BigInteger, primary_key=True)
+    table_name = Column(String(100), nullable=False)
+    record_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)  # borrado lógico original
+    purged_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    details = Column(Text, nullable=True)  # JSON con las referencias de la fila (paciente, doctor, cita)
+
+    __table_args__ = (
+        Index("ix_deletion_audit_record", "table_name", "record_id"),
+    )
+
+    def __repr__(self):
+        return f"<DeletionAudit(table={self.table_name}, record_id={self.record_id}, purged_at={self.purged_at})>"
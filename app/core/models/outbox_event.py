@@ -0,0 +1,24 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Text, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_event"
+
+    id = Column(BigInteger, primary_key=True)  # orden de publicación
+    aggregate_type = Column(String(50), nullable=False)  # appointment | medical_history
+    aggregate_id = Column(Integer, nullable=False)
+    event_type = Column(String(100), nullable=False)  # p. ej. appointment.created
+    payload = Column(Text, nullable=False, default="{}")  # JSON con el estado relevante al momento del cambio
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    published_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # El relay solo recorre los eventos pendientes
+        Index("ix_outbox_event_pending", "id", postgresql_where=published_at.is_(None)),
+    )
+
+    def __repr__(self):
+        return f"<OutboxEvent(id={self.id}, type={self.event_type}, aggregate={self.aggregate_type}:{self.aggregate_id})>"
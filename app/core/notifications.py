@@ -0,0 +1,74 @@
+"""
+Envío de notificaciones detrás de una interfaz intercambiable.
+
+El notificador por defecto solo escribe en el log; InMemoryNotifier guarda los
+mensajes para pruebas. Un proveedor real (correo, SMS, push) implementa send().
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class Notification:
+    recipient_id: int
+    subject: str
+    body: str
+    kind: str
+    data: Dict[str, Any] = field(default_factory=dict)
+    created_at: datetime = field(default_factory=datetime.now)
+
+
+class Notifier(ABC):
+    name = "base"
+
+    @abstractmethod
+    def send(self, notification: Notification):
+        """Enviar una notificación; debe lanzar una excepción si falla"""
+
+
+class LogNotifier(Notifier):
+    """Solo registra la notificación en el log (desarrollo)"""
+    name = "log"
+
+    def send(self, notification: Notification):
+        print(f"📨 NOTIFIER: [{notification.kind}] usuario {notification.recipient_id}: {notification.subject}")
+
+
+class InMemoryNotifier(Notifier):
+    """Guarda las notificaciones enviadas en memoria (pruebas)"""
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sent: List[Notification] = []
+
+    def send(self, notification: Notification):
+        with self._lock:
+            self.sent.append(notification)
+
+    def clear(self):
+        with self._lock:
+            self.sent.clear()
+
+
+_notifier: Optional[Notifier] = None
+
+
+def get_notifier() -> Notifier:
+    """Notificador configurado con NOTIFIER_BACKEND (log | memory)"""
+    global _notifier
+    if _notifier is None:
+        choice = os.getenv("NOTIFIER_BACKEND", "log").lower()
+        _notifier = InMemoryNotifier() if choice == "memory" else LogNotifier()
+        print(f"📨 NOTIFIER: Usando backend '{_notifier.name}'")
+    return _notifier
+
+
+def set_notifier(notifier: Notifier):
+    """Reemplazar el notificador (p. ej. InMemoryNotifier en pruebas o un proveedor real)"""
+    global _notifier
+    _notifier = notifier
@@ -0,0 +1,222 @@
+"""
+Outbox transaccional de eventos de dominio.
+
+- record_event() inserta el evento en la transacción del cambio que lo origina: si el
+  commit falla no queda evento, y si se confirma el evento no se pierde.
+- El relay lee los eventos pendientes en orden de id (FOR UPDATE SKIP LOCKED, así varios
+  relays no se pisan), los entrega por lotes a los suscriptores registrados con
+  @outbox_handler("prefijo.") y los marca como publicados.
+- Entrega al menos una vez: si un suscriptor falla, el lote se reintenta, así que los
+  suscriptores deben ser idempotentes y no deben hacer commit de la sesión que reciben.
+
+Relay:
+    python -m app.outbox_relay
+"""
+import importlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.core.job_queue import task
+from app.core.metrics import metrics
+from app.core.models.outbox_event import OutboxEvent
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "1"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_RETENTION_HOURS = int(os.getenv("OUTBOX_RETENTION_HOURS", "72"))
+OUTBOX_PURGE_BATCH_SIZE = 5000
+
+# Módulos que registran suscriptores con @outbox_handler; se importan en la API y en el relay
+OUTBOX_HANDLER_MODULES = [
+    "app.modules.citas.services.appointment_events",
+]
+
+
+@dataclass
+class OutboxHandler:
+    name: str
+    prefix: str
+    handler: Callable[[Session, List[OutboxEvent]], Any]
+
+
+HANDLERS: List[OutboxHandler] = []
+
+
+def outbox_handler(prefix: str, name: Optional[str] = None):
+    """Registrar un suscriptor para los eventos cuyo tipo empieza por prefix: handler(db, events)"""
+    def decorator(handler: Callable[[Session, List[OutboxEvent]], Any]):
+        HANDLERS.append(OutboxHandler(name or handler.__name__, prefix, handler))
+        return handler
+    return decorator
+
+
+def load_outbox_handlers():
+    """Importar los módulos de suscriptores para llenar el registro HANDLERS"""
+    for module in OUTBOX_HANDLER_MODULES:
+        importlib.import_module(module)
+
+
+def record_events(db: Session, aggregate_type: str, events: Iterable[Tuple[int, str, Dict[str, Any]]]) -> int:
+    """
+    Agregar eventos (aggregate_id, event_type, payload) a la transacción actual con un solo INSERT.
+    Se publican cuando el relay los lee, después del commit del llamador.
+    """
+    rows = [{
+        "aggregate_type": aggregate_type,
+        "aggregate_id": aggregate_id,
+        "event_type": event_type,
+        "payload": json.dumps(payload, default=str),
+        "attempts": 0
+    } for aggregate_id, event_type, payload in events]
+    if rows:
+        db.execute(insert(OutboxEvent), rows)
+        # Despierta al relay de este proceso cuando el commit termine
+        db.info["outbox_pending"] = True
+        metrics.increment("outbox_recorded_total", len(rows))
+    return len(rows)
+
+
+def record_event(db: Session, aggregate_type: str, aggregate_id: int, event_type: str, payload: Dict[str, Any]) -> int:
+    return record_events(db, aggregate_type, [(aggregate_id, event_type, payload)])
+
+
+_relay_wakeup = threading.Event()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_relay_after_commit(session: Session):
+    if session.info.pop("outbox_pending", False):
+        _relay_wakeup.set()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_after_rollback(session: Session):
+    session.info.pop("outbox_pending", None)
+
+
+class OutboxRelay:
+    """Publica los eventos pendientes del outbox a los suscriptores registrados"""
+
+    def __init__(self, batch_size: int = OUTBOX_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+        _relay_wakeup.set()
+
+    def relay_batch(self) -> int:
+        """Publicar un lote de eventos pendientes; devuelve cuántos se procesaron"""
+        with SessionLocal() as db:
+            events = db.scalars(
+                select(OutboxEvent)
+                .where(OutboxEvent.published_at.is_(None))
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not events:
+                return 0
+
+            errors = []
+            for definition in HANDLERS:
+                batch = [outbox_event for outbox_event in events if outbox_event.event_type.startswith(definition.prefix)]
+                if not batch:
+                    continue
+                try:
+                    definition.handler(db, batch)
+                except Exception as e:
+                    errors.append(f"{definition.name}: {e}")
+                    metrics.increment("outbox_handler_errors_total", labels={"handler": definition.name})
+                    print(f"❌ OUTBOX: Error en el suscriptor {definition.name}: {e}")
+
+            now = datetime.now(timezone.utc)
+            for outbox_event in events:
+                if not errors:
+                    outbox_event.published_at = now
+                    continue
+                outbox_event.attempts += 1
+                outbox_event.last_error = "\n".join(errors)
+                if outbox_event.attempts >= OUTBOX_MAX_ATTEMPTS:
+                    # Se descarta para no bloquear los eventos siguientes; queda last_error para revisar
+                    outbox_event.published_at = now
+                    metrics.increment("outbox_dead_total")
+
+            oldest = events[0].created_at
+            db.commit()
+
+        if not errors:
+            metrics.increment("outbox_published_total", len(events))
+            if oldest is not None:
+                metrics.observe("outbox_lag_seconds", (now - oldest).total_seconds())
+        return len(events)
+
+    def run_forever(self, poll_interval: float = OUTBOX_POLL_INTERVAL_SECONDS):
+        print(f"📤 OUTBOX: Relay iniciado (suscriptores: {[definition.name for definition in HANDLERS]})")
+        while not self._stop.is_set():
+            try:
+                processed = self.relay_batch()
+            except Exception as e:
+                print(f"❌ OUTBOX: Error leyendo eventos pendientes: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                # Espera al siguiente commit con eventos de este proceso o al intervalo de sondeo
+                _relay_wakeup.wait(poll_interval)
+                _relay_wakeup.clear()
+        print("👋 OUTBOX: Relay detenido")
+
+
+def outbox_backlog(db: Session) -> Dict[str, Any]:
+    """Eventos pendientes y antigüedad del más viejo (para monitoreo)"""
+    pending, oldest = db.execute(
+        select(func.count(OutboxEvent.id), func.min(OutboxEvent.created_at)).where(OutboxEvent.published_at.is_(None))
+    ).one()
+    return {
+        "pending": pending,
+        "oldest_pending_seconds": (datetime.now(timezone.utc) - oldest).total_seconds() if oldest else 0
+    }
+
+
+@task("outbox.purge", priority=500, max_attempts=3, every_seconds=3600)
+def purge_published_events(db: Session, payload: dict):
+    """Tarea periódica de la cola: borrar por lotes los eventos publicados hace más de OUTBOX_RETENTION_HOURS"""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=OUTBOX_RETENTION_HOURS)
+    total = 0
+    while True:
+        batch = select(OutboxEvent.id).where(
+            OutboxEvent.published_at < cutoff
+        ).limit(OUTBOX_PURGE_BATCH_SIZE).scalar_subquery()
+        deleted = db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(batch))).rowcount
+        db.commit()
+        total += deleted
+        if deleted < OUTBOX_PURGE_BATCH_SIZE:
+            break
+    if total:
+        print(f"🧹 OUTBOX: {total} eventos publicados eliminados")
+
+
+_in_process_relay: Optional[OutboxRelay] = None
+
+
+def start_in_process_relay() -> OutboxRelay:
+    """Ejecutar el relay en un hilo del proceso de la API (despliegues de un solo servicio)"""
+    global _in_process_relay
+    if _in_process_relay is None:
+        _in_process_relay = OutboxRelay()
+        threading.Thread(target=_in_process_relay.run_forever, name="outbox-relay", daemon=True).start()
+    return _in_process_relay
+
+
+def stop_in_process_relay():
+    global _in_process_relay
+    if _in_process_relay is not None:
+        _in_process_relay.stop()
+        _in_process_relay = None
@@ -0,0 +1,165 @@
+"""
+Broker de eventos en tiempo real (WebSocket / SSE).
+
+Cada conexión se suscribe a un canal y recibe los eventos en una asyncio.Queue propia.
+publish() se puede llamar desde cualquier hilo (los endpoints síncronos corren en el
+threadpool): la entrega se hace con loop.call_soon_threadsafe en el loop de cada suscriptor.
+
+Con varios workers, REALTIME_PG_BRIDGE=true envía cada evento con pg_notify y un hilo
+por proceso escucha el canal con LISTEN y lo reparte a sus suscriptores locales, así
+todos los workers ven todos los eventos.
+"""
+import asyncio
+import json
+import os
+import select
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import text
+
+from app.core.database import engine
+from app.core.metrics import metrics
+
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "100"))
+REALTIME_PG_BRIDGE = os.getenv("REALTIME_PG_BRIDGE", "false").lower() == "true"
+PG_NOTIFY_CHANNEL = "realtime_events"
+
+# Evento que recibe un suscriptor lento cuando se descartan eventos: debe pedir un snapshot nuevo
+RESYNC_EVENT = {"type": "resync"}
+
+
+class Subscription:
+    def __init__(self, channel: str, loop: asyncio.AbstractEventLoop):
+        self.channel = channel
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=REALTIME_QUEUE_SIZE)
+        self.overflowed = False
+
+    def _deliver(self, event: Dict[str, Any]):
+        # Se ejecuta en el loop del suscriptor
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            if not self.overflowed:
+                self.overflowed = True
+                metrics.increment("realtime_overflows_total")
+                # Vaciar y pedir al cliente que se resincronice
+                while not self.queue.empty():
+                    self.queue.get_nowait()
+                self.queue.put_nowait(RESYNC_EVENT)
+
+    async def get(self) -> Dict[str, Any]:
+        event = await self.queue.get()
+        if event is RESYNC_EVENT:
+            self.overflowed = False
+        return event
+
+
+class RealtimeBroker:
+    """Reparte eventos a los suscriptores locales de este proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(channel, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        metrics.increment("realtime_subscriptions_total")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.channel]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscriptions.values())
+
+    def deliver_local(self, channels: List[str], event: Dict[str, Any]):
+        """Entregar un evento a los suscriptores de este proceso (seguro desde cualquier hilo)"""
+        with self._lock:
+            targets = [subscription for channel in channels for subscription in self._subscriptions.get(channel, ())]
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # El loop del suscriptor ya se cerró
+                self.unsubscribe(subscription)
+        metrics.increment("realtime_events_delivered_total", len(targets))
+
+    def publish(self, channels: List[str], event: Dict[str, Any]):
+        """Publicar un evento (a todos los workers si el puente de PostgreSQL está activo)"""
+        metrics.increment("realtime_events_published_total")
+        if REALTIME_PG_BRIDGE:
+            payload = json.dumps({"channels": channels, "event": event}, default=str)
+            with engine.begin() as connection:
+                connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": PG_NOTIFY_CHANNEL, "payload": payload})
+        else:
+            self.deliver_local(channels, event)
+
+
+class PostgresNotifyBridge:
+    """Hilo que escucha LISTEN realtime_events y reenvía los eventos al broker local"""
+
+    def __init__(self, broker: RealtimeBroker):
+        self.broker = broker
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="realtime-pg-bridge", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            connection = None
+            try:
+                connection = engine.raw_connection()
+                connection.driver_connection.autocommit = True
+                cursor = connection.cursor()
+                cursor.execute(f"LISTEN {PG_NOTIFY_CHANNEL}")
+                print(f"📡 REALTIME: Escuchando {PG_NOTIFY_CHANNEL}")
+                pg_connection = connection.driver_connection
+                while not self._stop.is_set():
+                    if select.select([pg_connection], [], [], 5) == ([], [], []):
+                        continue
+                    pg_connection.poll()
+                    while pg_connection.notifies:
+                        notify = pg_connection.notifies.pop(0)
+                        message = json.loads(notify.payload)
+                        self.broker.deliver_local(message["channels"], message["event"])
+            except Exception as e:
+                print(f"❌ REALTIME: Error en el puente LISTEN/NOTIFY: {e}")
+                self._stop.wait(5)
+            finally:
+                if connection is not None:
+                    connection.invalidate()
+
+
+broker = RealtimeBroker()
+_bridge: Optional[PostgresNotifyBridge] = None
+
+
+def start_realtime_bridge():
+    """Iniciar el puente LISTEN/NOTIFY si está habilitado (una vez por proceso)"""
+    global _bridge
+    if REALTIME_PG_BRIDGE and _bridge is None:
+        _bridge = PostgresNotifyBridge(broker)
+        _bridge.start()
+
+
+def stop_realtime_bridge():
+    global _bridge
+    if _bridge is not None:
+        _bridge.stop()
+        _bridge = None
@@ -0,0 +1,51 @@
+"""
+Respuesta JSON rápida para listados grandes.
+
+FastJSONResponse serializa con orjson si está instalado (y con json estándar si no).
+Está pensada para contenido ya proyectado a dicts/listas (filas de la base de datos):
+evita la validación por fila con pydantic y el paso por jsonable_encoder.
+Las fechas se emiten en ISO 8601 igual que pydantic (UTC como "Z").
+"""
+import json
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: se usa json estándar como respaldo
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+
+def _default(value: Any):
+    """Tipos no nativos de json estándar, con el mismo formato que orjson"""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None and value.utcoffset().total_seconds() == 0:
+            return value.astimezone(timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+        return value.isoformat()
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serializar a JSON compacto (bytes)"""
+    if HAS_ORJSON:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializada con orjson (o json estándar si no está disponible)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,209 @@
+"""
+Retención de filas con borrado lógico.
+
+Las citas y los historiales médicos borrados (deleted_at) se eliminan definitivamente
+cuando pasa su periodo de gracia:
+- Por lotes pequeños (FOR UPDATE SKIP LOCKED), cada uno en su propia transacción, con una
+  pausa entre lotes y un tiempo máximo por ejecución para no competir con la API.
+- Cada fila eliminada deja un registro mínimo en deletion_audit (ids de referencia, sin
+  contenido clínico).
+- Los historiales se purgan antes que las citas: una cita solo se purga cuando ya no
+  tiene ningún historial, ni activo ni pendiente de purga.
+- Al terminar se ejecuta VACUUM (ANALYZE) sobre las tablas purgadas para que el espacio
+  de las filas y de los índices quede disponible, y se informa el espacio recuperado.
+
+Tarea periódica retention.purge (diaria) o manual:
+    python -m app.scripts.purge_soft_deleted --dry-run
+"""
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, engine
+from app.core.job_queue import task
+from app.core.metrics import metrics
+
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+RETENTION_BATCH_PAUSE_SECONDS = float(os.getenv("RETENTION_BATCH_PAUSE_SECONDS", "0.5"))
+RETENTION_MAX_RUN_SECONDS = float(os.getenv("RETENTION_MAX_RUN_SECONDS", "600"))
+RETENTION_VACUUM = os.getenv("RETENTION_VACUUM", "true").lower() == "true"
+
+
+@dataclass
+class RetentionPolicy:
+    table: str
+    id_column: str
+    grace_days: int
+    details_sql: str  # json_build_object(...) con las referencias que se guardan en la auditoría
+    extra_condition: str = "TRUE"
+    cleanup_sql: Optional[str] = None  # se ejecuta con :ids en la misma transacción del lote
+
+
+# En orden de ejecución: los historiales antes que las citas
+POLICIES = [
+    RetentionPolicy(
+        table="medical_history",
+        id_column="id_medical_history",
+        grace_days=int(os.getenv("MEDICAL_HISTORY_RETENTION_DAYS", "180")),
+        details_sql="json_build_object('patient_id', t.id_patient, 'doctor_id', t.id_doctor, 'appointment_id', t.id_appointment)"
+    ),
+    RetentionPolicy(
+        table="appointment",
+        id_column="id",
+        grace_days=int(os.getenv("APPOINTMENT_RETENTION_DAYS", "90")),
+        details_sql="json_build_object('patient_id', t.patient_id, 'doctor_id', t.doctor_id, "
+                    "'appointment_date', t.appointment_date, 'status', t.status)",
+        extra_condition="NOT EXISTS (SELECT 1 FROM medical_history mh WHERE mh.id_appointment = t.id)",
+        # Sin FK en cascada cuando appointment está particionada
+        cleanup_sql="DELETE FROM appointment_reminder WHERE appointment_id = ANY(:ids)"
+    ),
+]
+
+
+@dataclass
+class RetentionReport:
+    table: str
+    cutoff: datetime
+    eligible: int = 0
+    purged: int = 0
+    batches: int = 0
+    reclaimed_bytes: int = 0  # tamaño de las filas eliminadas (heap), reutilizable tras VACUUM
+    size_before: int = 0
+    size_after: int = 0
+    stopped_early: bool = False
+    errors: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict:
+        return {
+            "table": self.table,
+            "cutoff": self.cutoff.isoformat(),
+            "eligible": self.eligible,
+            "purged": self.purged,
+            "batches": self.batches,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "size_before": self.size_before,
+            "size_after": self.size_after,
+            "stopped_early": self.stopped_early,
+            "errors": self.errors
+        }
+
+
+def _candidates_sql(policy: RetentionPolicy) -> str:
+    return (
+        f"FROM {policy.table} t WHERE t.deleted_at IS NOT NULL AND t.deleted_at < :cutoff "
+        f"AND {policy.extra_condition}"
+    )
+
+
+def _purge_batch_sql(policy: RetentionPolicy) -> str:
+    return f"""
+        WITH batch AS (
+            SELECT t.{policy.id_column} AS record_id {_candidates_sql(policy)}
+            ORDER BY t.deleted_at
+            LIMIT :limit
+            FOR UPDATE OF t SKIP LOCKED
+        ), purged AS (
+            DELETE FROM {policy.table} t USING batch b
+            WHERE t.{policy.id_column} = b.record_id
+            RETURNING t.{policy.id_column} AS record_id, t.deleted_at, ({policy.details_sql})::text AS details,
+                      pg_column_size(t.*) AS row_bytes
+        ), audited AS (
+            INSERT INTO deletion_audit (table_name, record_id, deleted_at, details)
+            SELECT '{policy.table}', record_id, deleted_at, details FROM purged
+        )
+        SELECT count(*), coalesce(sum(row_bytes), 0), coalesce(array_agg(record_id), '{{}}') FROM purged
+    """
+
+
+def _relation_size(table: str) -> int:
+    """Tamaño total (con índices y TOAST); en una tabla particionada, la suma de sus particiones"""
+    with engine.connect() as connection:
+        return connection.scalar(text(
+            "SELECT coalesce(sum(pg_total_relation_size(relid)), 0) FROM pg_partition_tree(to_regclass(:table))"
+        ), {"table": table}) or 0
+
+
+def vacuum_table(table: str):
+    """VACUUM (ANALYZE) fuera de transacción: deja reutilizable el espacio de filas e índices"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f"VACUUM (ANALYZE) {table}"))
+
+
+def count_eligible(db: Session, policy: RetentionPolicy, cutoff: datetime) -> int:
+    return db.scalar(text(f"SELECT count(*) {_candidates_sql(policy)}"), {"cutoff": cutoff}) or 0
+
+
+def purge_policy(
+    policy: RetentionPolicy,
+    batch_size: int = RETENTION_BATCH_SIZE,
+    pause_seconds: float = RETENTION_BATCH_PAUSE_SECONDS,
+    deadline: Optional[float] = None,
+    dry_run: bool = False,
+    vacuum: bool = RETENTION_VACUUM
+) -> RetentionReport:
+    """Purgar por lotes las filas de una política cuyo periodo de gracia ya venció"""
+    report = RetentionReport(table=policy.table, cutoff=datetime.now(timezone.utc) - timedelta(days=policy.grace_days))
+    with SessionLocal() as db:
+        report.eligible = count_eligible(db, policy, report.cutoff)
+    if dry_run or not report.eligible:
+        return report
+
+    report.size_before = _relation_size(policy.table)
+    statement = text(_purge_batch_sql(policy))
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            report.stopped_early = True
+            break
+        try:
+            with SessionLocal() as db:
+                purged, row_bytes, ids = db.execute(statement, {"cutoff": report.cutoff, "limit": batch_size}).one()
+                if purged and policy.cleanup_sql:
+                    db.execute(text(policy.cleanup_sql), {"ids": list(ids)})
+                db.commit()
+        except Exception as e:
+            report.errors.append(str(e))
+            print(f"❌ RETENTION: Error purgando {policy.table}: {e}")
+            break
+
+        report.purged += purged
+        report.reclaimed_bytes += row_bytes
+        report.batches += 1
+        metrics.increment("retention_purged_total", purged, labels={"table": policy.table})
+        if purged < batch_size:
+            break
+        # Pausa entre lotes para no saturar la base de datos ni el WAL
+        time.sleep(pause_seconds)
+
+    if report.purged and vacuum:
+        vacuum_table(policy.table)
+    report.size_after = _relation_size(policy.table)
+    metrics.increment("retention_reclaimed_bytes_total", report.reclaimed_bytes, labels={"table": policy.table})
+    print(f"🧹 RETENTION: {policy.table}: {report.purged}/{report.eligible} filas purgadas en {report.batches} lotes, "
+          f"{report.reclaimed_bytes / 1024:.1f} KB recuperados")
+    return report
+
+
+def run_retention(
+    batch_size: int = RETENTION_BATCH_SIZE,
+    pause_seconds: float = RETENTION_BATCH_PAUSE_SECONDS,
+    max_run_seconds: float = RETENTION_MAX_RUN_SECONDS,
+    dry_run: bool = False,
+    vacuum: bool = RETENTION_VACUUM
+) -> List[RetentionReport]:
+    """Aplicar todas las políticas en orden, dentro del tiempo máximo de la ejecución"""
+    deadline = time.monotonic() + max_run_seconds
+    return [
+        purge_policy(policy, batch_size, pause_seconds, deadline, dry_run, vacuum)
+        for policy in POLICIES
+    ]
+
+
+@task("retention.purge", priority=500, max_attempts=3, lease_seconds=3600, every_seconds=86400)
+def purge_soft_deleted_task(db: Session, payload: dict):
+    """Tarea periódica de la cola: purga de filas con borrado lógico vencido"""
+    run_retention()
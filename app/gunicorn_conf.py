@@ -0,0 +1,122 @@
+"""
+Configuración de gunicorn para producción (python -m app.server).
+
+Un master de gunicorn con UvicornWorker: un proceso por núcleo disponible para el
+contenedor (límite de CPU del cgroup, no los núcleos del host), acotado por la memoria
+del contenedor. Todo se puede sobrescribir con variables de entorno:
+
+    WEB_CONCURRENCY              número de workers (si no, se calcula)
+    WORKER_MEMORY_MB             memoria estimada por worker para acotar (384)
+    GUNICORN_TIMEOUT             segundos sin latido antes de reiniciar un worker (60)
+    GUNICORN_GRACEFUL_TIMEOUT    segundos para terminar las peticiones en curso al reiniciar (30)
+    GUNICORN_KEEPALIVE           segundos de keep-alive (75, mayor que el idle timeout del balanceador)
+    GUNICORN_MAX_REQUESTS        peticiones antes de reciclar un worker (1000; 0 = nunca)
+    GUNICORN_MAX_REQUESTS_JITTER variación aleatoria para no reciclar todos a la vez (100)
+    GUNICORN_PRELOAD             importar la app en el master antes de hacer fork (true)
+"""
+import math
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _read_cgroup(path: str):
+    try:
+        with open(path) as cgroup_file:
+            return cgroup_file.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus() -> int:
+    """Núcleos utilizables: afinidad del proceso acotada por la cuota de CPU del cgroup (v2 o v1)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    cpu_max = _read_cgroup("/sys/fs/cgroup/cpu.max")
+    if cpu_max:
+        limit, period = cpu_max.split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    else:
+        limit, period = _read_cgroup("/sys/fs/cgroup/cpu/cpu.cfs_quota_us"), _read_cgroup("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        if limit and period and int(limit) > 0:
+            quota = int(limit) / int(period)
+    if quota:
+        cpus = min(cpus, max(math.ceil(quota), 1))
+    return max(cpus, 1)
+
+
+def available_memory_bytes():
+    """Límite de memoria del cgroup (None si no hay límite)"""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        value = _read_cgroup(path)
+        # cgroup v1 sin límite informa un número enorme
+        if value and value != "max" and int(value) < 1 << 60:
+            return int(value)
+    return None
+
+
+def worker_count() -> int:
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(int(os.environ["WEB_CONCURRENCY"]), 1)
+    # Workers asíncronos: uno por núcleo alcanza para usar toda la CPU
+    workers = available_cpus()
+    memory = available_memory_bytes()
+    if memory:
+        per_worker = int(os.getenv("WORKER_MEMORY_MB", "384")) * 1024 * 1024
+        workers = min(workers, max(memory // per_worker, 1))
+    return workers
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = worker_count()
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "75"))
+# Reciclar workers acota el crecimiento de memoria (cachés, fragmentación) sin cortar peticiones
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+forwarded_allow_ips = "*"
+
+# Con varios workers los eventos en tiempo real y las invalidaciones de caché deben cruzar
+# procesos: LISTEN/NOTIFY y caché compartida en PostgreSQL
+if workers > 1:
+    os.environ.setdefault("REALTIME_PG_BRIDGE", "true")
+    os.environ.setdefault("CACHE_BACKEND", "postgres")
+    if os.environ["CACHE_BACKEND"].lower() == "memory":
+        # invalidate_availability() solo limpiaría la caché del worker que atendió la escritura
+        raise RuntimeError(f"CACHE_BACKEND=memory no es válido con {workers} workers; usar postgres o WEB_CONCURRENCY=1")
+    # Un relay por worker publicaría los eventos del outbox desordenados: corre uno solo
+    # fuera de los workers (python -m app.server lo lanza junto al worker de la cola)
+    os.environ.setdefault("OUTBOX_RELAY_IN_PROCESS", "false")
+    if os.environ["OUTBOX_RELAY_IN_PROCESS"].lower() == "true":
+        raise RuntimeError(f"OUTBOX_RELAY_IN_PROCESS=true no es válido con {workers} workers; usar el relay aparte o WEB_CONCURRENCY=1")
+
+
+def on_starting(server):
+    # Crear tablas y aplicar parches una sola vez en el master, no en cada worker a la vez
+    # (python -m app.server ya lo hizo antes de lanzar el worker de la cola)
+    if os.environ.get("SCHEMA_SETUP_ON_STARTUP", "true").lower() == "true":
+        from app.core.database import create_tables
+        create_tables()
+        os.environ["SCHEMA_SETUP_ON_STARTUP"] = "false"
+    server.log.info(f"🚀 Iniciando {workers} workers ({available_cpus()} CPU disponibles)")
+
+
+def post_fork(server, worker):
+    # Las conexiones del pool abiertas en el master no se pueden compartir entre procesos
+    from app.core.database import engine
+    engine.dispose(close=False)
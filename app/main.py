@@ -6,7 +6,11 @@ import os
 load_dotenv()
 
 from app.core.middleware import configure_middleware
-from app.core.database import create_tables
+from app.core.database import create_tables, import_models
+from app.core.compression import init_text_compression
+from app.core.job_queue import load_task_modules, start_in_process_worker, stop_in_process_worker
+from app.core.outbox import load_outbox_handlers, start_in_process_relay, stop_in_process_relay
+from app.core.realtime import start_realtime_bridge, stop_realtime_bridge
 from app.modules.citas.routers import health, citas, citas_today
 from app.modules.auth.routers.user_router import router as user_router
 from app.modules.auth.routers.auth_router import router as auth_router
@@ -14,6 +18,9 @@ from app.modules.register.routers.register_router import router as register_rout
 from app.modules.assistantAI.routers.assistantAI_router import router as assistantAI_router
 from app.modules.schedules.routers.schedule_router import router as schedule_router
 from app.modules.medical_history.routers.medical_history_router import router as medical_history_router
+from app.modules.medical_history.models.medical_history import COMPRESSED_FIELDS
+from app.modules.reports.routers.report_router import router as report_router
+from app.modules.patients.routers.patient_timeline_router import router as patient_timeline_router
 
 app = FastAPI(title="Distributed Systems Project - Backend", version="0.1.0")
 
@@ -22,19 +29,41 @@ configure_middleware(app)
 
 @app.on_event("startup")
 async def startup_event():
-    create_tables()
+    import_models()
+    # Con gunicorn el master ya creó las tablas antes del fork (app/gunicorn_conf.py)
+    if os.environ.get("SCHEMA_SETUP_ON_STARTUP", "true").lower() == "true":
+        create_tables()
+    init_text_compression([("medical_history", COMPRESSED_FIELDS)])
+    load_task_modules()
+    # Sin un servicio de worker dedicado (python -m app.worker), procesar la cola en este proceso
+    if os.environ.get("JOB_WORKER_IN_PROCESS", "false").lower() == "true":
+        start_in_process_worker()
+    load_outbox_handlers()
+    # Sin un relay dedicado (python -m app.outbox_relay), publicar el outbox en este proceso
+    if os.environ.get("OUTBOX_RELAY_IN_PROCESS", "true").lower() == "true":
+        start_in_process_relay()
+    start_realtime_bridge()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    stop_in_process_worker()
+    stop_in_process_relay()
+    stop_realtime_bridge()
 
 app.include_router(health.router)
-app.include_router(citas.router)  # Main appointments router
-app.include_router(citas.legacy_router)  # Legacy compatibility router
+# Today routers go first: /appointments/{cita_id} would otherwise capture /appointments/today
 app.include_router(citas_today.router)  # Today appointments router
 app.include_router(citas_today.legacy_router)  # Today appointments legacy router
+app.include_router(citas.router)  # Main appointments router
+app.include_router(citas.legacy_router)  # Legacy compatibility router
 app.include_router(user_router)
 app.include_router(auth_router)
 app.include_router(register_router)
 app.include_router(assistantAI_router)
 app.include_router(schedule_router)
 app.include_router(medical_history_router)
+app.include_router(report_router)
+app.include_router(patient_timeline_router)
 
 @app.get("/")
 @app.head("/")
@@ -51,6 +80,8 @@ def read_root():
             "assistantAI": "/assistantAI/",
             "schedules": "/schedules/",
             "medical-history": "/medical-history/",
+            "reports": "/reports/",
+            "patient-timeline": "/patients/{id}/timeline",
             "test_connection": "/citas/test/connection"
         }
     }
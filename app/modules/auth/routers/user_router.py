@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
+from app.core.http_cache import PRIVATE_REVALIDATE, conditional_response, make_etag
 from app.modules.auth.services.user_service import UserService
 from app.modules.auth.schemas.user.user_response_dto import UserResponseDto
 from app.modules.register.services.register_service import RegisterService
@@ -25,13 +26,20 @@ def get_db():
 
 
 @router.get("/users/{user_id}", response_model=UserResponseDto)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+def get_user(user_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """
-    Obtener un usuario por ID
+    Obtener un usuario por ID (admite GET condicional con ETag)
     """
     try:
         user_service = UserService(db)
         user = user_service.get_user_by_id(user_id)
+
+        # createdAt/updatedAt se generan en cada llamada: el ETag usa solo los campos estables
+        stable_fields = user.dict(exclude={"createdAt", "updatedAt"})
+        etag = make_etag("user", *(stable_fields[key] for key in sorted(stable_fields)))
+        not_modified = conditional_response(request, response, etag, cache_control=PRIVATE_REVALIDATE)
+        if not_modified:
+            return not_modified
         return user
     except ValueError as e:
         raise HTTPException(
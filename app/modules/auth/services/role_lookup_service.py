@@ -0,0 +1,95 @@
+"""
+Servicio para consultar y validar roles de usuarios con pocas consultas
+"""
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, Set
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.modules.auth.models.user import User
+from app.modules.auth.models.user_role import UserRole
+
+PATIENT_ROLE = 1
+DOCTOR_ROLE = 2
+
+# Roles de doctores activos, reservados con frecuencia. Solo se guardan resultados
+# positivos, así que un doctor desactivado deja de validar como máximo tras el TTL.
+# No hay invalidación explícita: la API no cambia roles ni estado de usuarios existentes,
+# y la caché es local a cada worker (borrar en uno no limpiaría los demás).
+_doctor_roles_cache = TTLCache(
+    maxsize=int(os.getenv("ROLE_CACHE_MAX_SIZE", "2048")),
+    ttl=float(os.getenv("ROLE_CACHE_TTL_SECONDS", "60"))
+)
+
+
+class RoleLookupService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_active_roles(self, user_ids: Iterable[int]) -> Dict[int, Set[int]]:
+        """
+        Obtener los roles de los usuarios activos indicados
+
+        Los doctores se resuelven desde la caché cuando es posible; el resto se carga
+        con una sola consulta. Los usuarios inexistentes, inactivos o sin roles no
+        aparecen en el resultado.
+
+        Args:
+            user_ids (Iterable[int]): IDs de usuario
+
+        Returns:
+            Dict[int, Set[int]]: Roles por ID de usuario
+        """
+        roles_by_user: Dict[int, Set[int]] = {}
+        missing = set()
+        for user_id in set(user_ids):
+            cached = _doctor_roles_cache.get(user_id)
+            if cached is not None:
+                roles_by_user[user_id] = set(cached)
+            else:
+                missing.add(user_id)
+
+        if missing:
+            loaded = defaultdict(set)
+            for id_user, id_role in self.db.query(UserRole.id_user, UserRole.id_role).join(
+                User, User.id_user == UserRole.id_user
+            ).filter(
+                User.id_user.in_(missing),
+                User.id_status == True
+            ).all():
+                loaded[id_user].add(id_role)
+
+            for user_id, roles in loaded.items():
+                roles_by_user[user_id] = roles
+                if DOCTOR_ROLE in roles:
+                    _doctor_roles_cache.set(user_id, frozenset(roles))
+
+        return roles_by_user
+
+    def validate_appointment_participants(self, doctor_id: int, patient_id: int):
+        """
+        Verificar en una sola consulta que el doctor y el paciente existen, están activos
+        y tienen el rol correspondiente
+
+        Raises:
+            ValueError: Con el mismo mensaje que devolvía la validación anterior
+        """
+        roles_by_user = self.get_active_roles([doctor_id, patient_id])
+
+        doctor_roles = roles_by_user.get(doctor_id)
+        if not doctor_roles:
+            print(f"❌ ROLE_LOOKUP: Doctor with ID {doctor_id} not found")
+            raise ValueError("Doctor not found")
+        if DOCTOR_ROLE not in doctor_roles:
+            print(f"❌ ROLE_LOOKUP: User {doctor_id} is not a doctor")
+            raise ValueError("The specified user is not a doctor")
+
+        patient_roles = roles_by_user.get(patient_id)
+        if not patient_roles:
+            print(f"❌ ROLE_LOOKUP: Patient with ID {patient_id} not found")
+            raise ValueError("Patient not found")
+        if PATIENT_ROLE not in patient_roles:
+            print(f"❌ ROLE_LOOKUP: User {patient_id} is not a patient")
+            raise ValueError("The specified user is not a patient")
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, ForeignKey, Text, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class AppointmentReminder(Base):
+    __tablename__ = "appointment_reminder"
+
+    id = Column(BigInteger, primary_key=True)
+    appointment_id = Column(Integer, ForeignKey("appointment.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(10), nullable=False)  # 24h | 1h
+    due_at = Column(DateTime, nullable=False)  # misma referencia horaria (sin zona) que appointment_date
+    status = Column(String(20), nullable=False, default="pending")  # pending | sent | cancelled | expired | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("appointment_id", "kind", name="uq_appointment_reminder_kind"),
+        # Índice de vencimiento: solo contiene los recordatorios pendientes
+        Index("ix_appointment_reminder_due", "due_at", postgresql_where=status == "pending"),
+        Index("ix_appointment_reminder_appointment", "appointment_id"),
+    )
+
+    def __repr__(self):
+        return f"<AppointmentReminder(appointment_id={self.appointment_id}, kind={self.kind}, due_at={self.due_at}, status={self.status})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -14,6 +14,18 @@ class Appointment(Base):
     status = Column(String(50), default="scheduled")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     deleted_at = Column(DateTime(timezone=True), nullable=True)
+    # Se actualiza en cada cambio (incluido el borrado lógico); base de la sincronización incremental
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_appointment_doctor_updated", "doctor_id", "updated_at", "id"),
+        # Agenda y disponibilidad por doctor: solo citas activas (las borradas no ocupan el índice)
+        Index("ix_appointment_doctor_date_active", "doctor_id", "appointment_date",
+              postgresql_where=deleted_at.is_(None)),
+        # Línea de tiempo y citas por paciente, en orden cronológico
+        Index("ix_appointment_patient_date_active", "patient_id", "appointment_date", "id",
+              postgresql_where=deleted_at.is_(None)),
+    )
 
     # Relationships
     patient = relationship("User", foreign_keys=[patient_id], back_populates="appointments_as_patient")
@@ -1,17 +1,39 @@
-from fastapi import APIRouter, HTTPException, Depends, status, Request
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from pydantic import ValidationError
-from app.modules.citas.schemas.cita import AppointmentOut, AppointmentCreate, AppointmentUpdate, CitaOut, CitaCreate
+from app.modules.citas.schemas.cita import (
+    AppointmentOut, AppointmentCreate, AppointmentUpdate, CitaOut, CitaCreate,
+    AppointmentBulkCreate, AppointmentBulkResponse, AppointmentSyncResponse
+)
 from pydantic import BaseModel
 from app.modules.citas.services.cita_service import AppointmentService
 from app.core.database import SessionLocal
-from datetime import datetime
+from app.core.idempotency import IdempotencyService, get_idempotency_key
+from app.core.locks import BOOKING_LOCK_RETRY_AFTER_SECONDS, BookingLockTimeout
+from app.modules.citas.services.calendar_feed import InvalidSyncToken
+from app.core.http_cache import conditional_response, make_etag
+from app.core.responses import FastJSONResponse
+from app.core.dependencies import verify_jwt_auth
+from app.modules.citas.services.appointment_export import ExportFormat, MEDIA_TYPES, stream_appointments_export
+from datetime import date, datetime, time, timedelta, timezone
 
 router = APIRouter(prefix="/appointments", tags=["appointments"])
 # Legacy router for backward compatibility
 legacy_router = APIRouter(prefix="/citas", tags=["citas"])
 
+# Opt-in fast path for large lists: rows projected to dicts and serialized with orjson
+FAST_QUERY = Query(False, description="Skip ORM/pydantic and serialize projected rows directly")
+
+def booking_busy_error(e: BookingLockTimeout) -> HTTPException:
+    """409 con Retry-After: otra solicitud está reservando el mismo doctor y día"""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=str(e),
+        headers={"Retry-After": str(BOOKING_LOCK_RETRY_AFTER_SECONDS)}
+    )
+
 class DashboardStats(BaseModel):
     today_appointments: int
     active_patients: int
@@ -34,13 +56,15 @@ def get_db():
         db.close()
 
 @router.get("/", response_model=List[AppointmentOut])
-def get_appointments(db: Session = Depends(get_db)):
+def get_appointments(fast: bool = FAST_QUERY, db: Session = Depends(get_db)):
     """
     Get all appointments from database
     """
     try:
         print("🚀 ENDPOINT: /appointments/ - Getting all appointments")
         appointment_service = AppointmentService(db)
+        if fast:
+            return FastJSONResponse(appointment_service.get_appointment_rows())
         appointments = appointment_service.get_all_appointments()
 
         print(f"✅ ENDPOINT: Returning {len(appointments)} appointments")
@@ -53,13 +77,15 @@ def get_appointments(db: Session = Depends(get_db)):
         )
 
 @legacy_router.get("/", response_model=List[CitaOut])
-def get_citas_legacy(db: Session = Depends(get_db)):
+def get_citas_legacy(fast: bool = FAST_QUERY, db: Session = Depends(get_db)):
     """
     Legacy endpoint - Get all appointments (citas) from database
     """
     try:
         print("🚀 ENDPOINT: /citas/ - Getting all appointments (legacy)")
         appointment_service = AppointmentService(db)
+        if fast:
+            return FastJSONResponse(appointment_service.get_appointment_rows(legacy=True))
         appointments = appointment_service.get_all_appointments()
 
         # Convert to legacy format
@@ -83,6 +109,37 @@ def get_citas_legacy(db: Session = Depends(get_db)):
             detail="Error interno del servidor"
         )
 
+@router.get("/export")
+def export_appointments(
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="ndjson or csv"),
+    start_date: Optional[date] = Query(None, description="First appointment date (inclusive)"),
+    end_date: Optional[date] = Query(None, description="Last appointment date (inclusive)"),
+    doctor_id: Optional[int] = Query(None),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    current_user: dict = Depends(verify_jwt_auth)
+):
+    """
+    Stream appointments as NDJSON or CSV (admins only), with constant memory use
+    """
+    if current_user.get("id_role") != 3:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can export appointments"
+        )
+    if start_date and end_date and end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must be on or after start_date"
+        )
+
+    print(f"🚀 ENDPOINT: /appointments/export - format={format.value}, {start_date}..{end_date}, doctor={doctor_id}, status={status_filter}")
+    filename = f"appointments-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{'csv' if format == ExportFormat.CSV else 'ndjson'}"
+    return StreamingResponse(
+        stream_appointments_export(format, start_date, end_date, doctor_id, status_filter),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @router.get("/{cita_id}", response_model=CitaOut)
 def get_cita(cita_id: int, db: Session = Depends(get_db)):
     """
@@ -118,27 +175,76 @@ def get_cita(cita_id: int, db: Session = Depends(get_db)):
         )
 
 @router.post("/", response_model=AppointmentOut)
-def create_appointment(appointment: AppointmentCreate, db: Session = Depends(get_db)):
+def create_appointment(
+    appointment: AppointmentCreate,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key)
+):
     """
-    Create a new appointment in the database
+    Create a new appointment in the database.
+    Retries sent with the same Idempotency-Key header replay the original response.
     """
+    idempotency = IdempotencyService(idempotency_key, "appointments:create", appointment)
+    replay = idempotency.begin()
+    if replay:
+        return replay
+
     try:
         print("🚀 ENDPOINT: POST /appointments/ - Creating new appointment")
         print(f"📋 Data received: {appointment.dict()}")
 
         appointment_service = AppointmentService(db)
         new_appointment = appointment_service.create_appointment(appointment)
-
         print(f"✅ ENDPOINT: Appointment created successfully with ID {new_appointment.id}")
-        return new_appointment
+    except BookingLockTimeout as e:
+        # Transitorio: no se guarda la respuesta para que el reintento con la misma clave vuelva a intentarlo
+        print(f"⏳ ENDPOINT: Booking lock timeout: {e}")
+        idempotency.abort()
+        raise booking_busy_error(e)
     except ValueError as e:
         print(f"❌ ENDPOINT: Validation error: {e}")
+        idempotency.complete_or_abort(status.HTTP_400_BAD_REQUEST, {"detail": str(e)})
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except Exception as e:
         print(f"❌ ENDPOINT: Error creating appointment: {e}")
+        idempotency.abort()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+    # The appointment is already committed: never release the key from here on
+    idempotency.complete_committed(status.HTTP_200_OK, AppointmentOut.model_validate(new_appointment))
+    return new_appointment
+
+@router.post("/bulk", response_model=AppointmentBulkResponse)
+def create_appointments_bulk(bulk_data: AppointmentBulkCreate, db: Session = Depends(get_db)):
+    """
+    Create many appointments (optionally recurring) in a single transaction.
+    Returns one result per requested appointment.
+    """
+    try:
+        print(f"🚀 ENDPOINT: POST /appointments/bulk - Creating {len(bulk_data.appointments)} appointment items")
+
+        appointment_service = AppointmentService(db)
+        result = appointment_service.create_appointments_bulk(bulk_data)
+
+        print(f"✅ ENDPOINT: Bulk creation - created {result.created}, failed {result.failed}")
+        return result
+    except BookingLockTimeout as e:
+        print(f"⏳ ENDPOINT: Booking lock timeout: {e}")
+        raise booking_busy_error(e)
+    except ValueError as e:
+        print(f"❌ ENDPOINT: Validation error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        print(f"❌ ENDPOINT: Error creating appointments in bulk: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
@@ -175,6 +281,9 @@ def create_cita_legacy(cita: CitaCreate, db: Session = Depends(get_db)):
 
         print(f"✅ ENDPOINT: Appointment created successfully with ID {new_appointment.id} (legacy)")
         return result
+    except BookingLockTimeout as e:
+        print(f"⏳ ENDPOINT: Booking lock timeout: {e}")
+        raise booking_busy_error(e)
     except ValueError as e:
         print(f"❌ ENDPOINT: Validation error: {e}")
         raise HTTPException(
@@ -189,13 +298,15 @@ def create_cita_legacy(cita: CitaCreate, db: Session = Depends(get_db)):
         )
 
 @router.get("/doctor/{doctor_id}", response_model=List[AppointmentOut])
-def get_appointments_by_doctor(doctor_id: int, db: Session = Depends(get_db)):
+def get_appointments_by_doctor(doctor_id: int, fast: bool = FAST_QUERY, db: Session = Depends(get_db)):
     """
     Get all appointments for a specific doctor
     """
     try:
         print(f"🚀 ENDPOINT: /appointments/doctor/{doctor_id} - Getting doctor's appointments")
         appointment_service = AppointmentService(db)
+        if fast:
+            return FastJSONResponse(appointment_service.get_appointment_rows(doctor_id=doctor_id))
         appointments = appointment_service.get_appointments_by_doctor(doctor_id)
 
         print(f"✅ ENDPOINT: Returning {len(appointments)} doctor's appointments")
@@ -207,14 +318,85 @@ def get_appointments_by_doctor(doctor_id: int, db: Session = Depends(get_db)):
             detail="Internal server error"
         )
 
+@router.get("/doctor/{doctor_id}/changes", response_model=AppointmentSyncResponse)
+def get_doctor_appointment_changes(
+    doctor_id: int,
+    since: Optional[str] = Query(None, description="next_token from the previous sync (omit for a full sync)"),
+    limit: int = Query(500, ge=1, le=2000),
+    db: Session = Depends(get_db)
+):
+    """
+    Incremental sync: appointments of a doctor created, updated or soft-deleted since the last sync
+    """
+    try:
+        print(f"🚀 ENDPOINT: /appointments/doctor/{doctor_id}/changes - Incremental sync")
+        appointment_service = AppointmentService(db)
+        result = appointment_service.get_doctor_changes(doctor_id, since, limit)
+
+        print(f"✅ ENDPOINT: Returning {len(result.changes)} changes")
+        return result
+    except InvalidSyncToken as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        print(f"❌ ENDPOINT: Error getting doctor's appointment changes: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.get("/doctor/{doctor_id}/calendar.ics")
+def get_doctor_calendar(
+    doctor_id: int,
+    request: Request,
+    response: Response,
+    days_back: int = Query(30, ge=0, le=365, description="Include appointments from N days ago"),
+    db: Session = Depends(get_db)
+):
+    """
+    iCalendar feed of a doctor's appointments, with ETag/Last-Modified conditional GET
+    """
+    try:
+        print(f"🚀 ENDPOINT: /appointments/doctor/{doctor_id}/calendar.ics - Calendar feed")
+        appointment_service = AppointmentService(db)
+        from_date = date.today() - timedelta(days=days_back)
+
+        # The feed changes when an appointment, the doctor's settings (DTEND) or a patient name (SUMMARY)
+        # changes, or when the window moves (every day)
+        count, last_updated, settings_version, patients_hash = appointment_service.get_doctor_calendar_version(doctor_id, from_date)
+        last_modified = datetime.combine(date.today(), time.min).astimezone(timezone.utc)
+        for changed_at in (last_updated, settings_version[1] if settings_version else None):
+            if changed_at and changed_at > last_modified:
+                last_modified = changed_at
+        not_modified = conditional_response(
+            request, response,
+            make_etag("calendar", doctor_id, count, last_updated, from_date, *settings_version, patients_hash),
+            # Patient names have no timestamp: Last-Modified alone cannot detect a rename
+            last_modified if not patients_hash else None
+        )
+        if not_modified:
+            print(f"✅ ENDPOINT: Calendar not modified (304)")
+            return not_modified
+
+        calendar = appointment_service.get_doctor_calendar(doctor_id, from_date)
+        print(f"✅ ENDPOINT: Returning calendar ({len(calendar)} bytes)")
+        return Response(content=calendar, media_type="text/calendar; charset=utf-8", headers=dict(response.headers))
+    except Exception as e:
+        print(f"❌ ENDPOINT: Error building doctor's calendar: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
 @legacy_router.get("/doctor/{doctor_id}", response_model=List[CitaOut])
-def get_citas_by_doctor_legacy(doctor_id: int, db: Session = Depends(get_db)):
+def get_citas_by_doctor_legacy(doctor_id: int, fast: bool = FAST_QUERY, db: Session = Depends(get_db)):
     """
     Legacy endpoint - Get all appointments for a specific doctor
     """
     try:
         print(f"🚀 ENDPOINT: /citas/doctor/{doctor_id} - Getting doctor's appointments (legacy)")
         appointment_service = AppointmentService(db)
+        if fast:
+            return FastJSONResponse(appointment_service.get_appointment_rows(doctor_id=doctor_id, legacy=True))
         appointments = appointment_service.get_appointments_by_doctor(doctor_id)
 
         # Convert to legacy format
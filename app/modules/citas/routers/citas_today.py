@@ -1,9 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from typing import AsyncIterator, List, Optional
+from datetime import date
 from pydantic import BaseModel
+import asyncio
+import json
+import os
 from app.modules.citas.services.cita_service import AppointmentService
+from app.modules.citas.services.appointment_events import today_channel
 from app.core.database import SessionLocal
+from app.core.realtime import RESYNC_EVENT, broker
+
+# Seconds without events before sending a heartbeat (keeps proxies from closing idle connections
+# and detects clients that went away)
+REALTIME_HEARTBEAT_SECONDS = float(os.getenv("REALTIME_HEARTBEAT_SECONDS", "25"))
 
 router = APIRouter(prefix="/appointments", tags=["appointments"])
 legacy_router = APIRouter(prefix="/citas", tags=["citas"])
@@ -24,15 +36,54 @@ def get_db():
     finally:
         db.close()
 
+def _load_today_snapshot(doctor_id: Optional[int]) -> List[dict]:
+    db = SessionLocal()
+    try:
+        return AppointmentService(db).get_today_appointments_with_details(doctor_id)
+    finally:
+        db.close()
+
+async def _today_events(doctor_id: Optional[int]) -> AsyncIterator[dict]:
+    """
+    Initial snapshot of today's appointments followed by incremental events.
+    The subscription is opened before loading the snapshot so no change is lost in between.
+    """
+    subscription = broker.subscribe(today_channel(doctor_id))
+    try:
+        snapshot_date = date.today()
+        appointments = await run_in_threadpool(_load_today_snapshot, doctor_id)
+        yield {"type": "snapshot", "date": snapshot_date.isoformat(), "appointments": appointments}
+
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=REALTIME_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield {"type": "heartbeat"}
+                continue
+
+            # Events were dropped (slow client) or the day changed: send a fresh snapshot
+            if event is RESYNC_EVENT or date.today() != snapshot_date:
+                snapshot_date = date.today()
+                appointments = await run_in_threadpool(_load_today_snapshot, doctor_id)
+                yield {"type": "snapshot", "date": snapshot_date.isoformat(), "appointments": appointments}
+                continue
+            if event.get("date") == snapshot_date.isoformat():
+                yield event
+    finally:
+        broker.unsubscribe(subscription)
+
 @router.get("/today", response_model=List[TodayAppointment])
-def get_today_appointments(db: Session = Depends(get_db)):
+def get_today_appointments(
+    doctor_id: Optional[int] = Query(None, description="Only this doctor's appointments"),
+    db: Session = Depends(get_db)
+):
     """
     Get today's appointments with patient details
     """
     try:
         print("🚀 ENDPOINT: /appointments/today - Getting today's appointments")
         appointment_service = AppointmentService(db)
-        appointments = appointment_service.get_today_appointments_with_details()
+        appointments = appointment_service.get_today_appointments_with_details(doctor_id)
 
         print(f"✅ ENDPOINT: Returning {len(appointments)} today's appointments")
         return appointments
@@ -43,6 +94,53 @@ def get_today_appointments(db: Session = Depends(get_db)):
             detail="Error getting today's appointments"
         )
 
+@router.websocket("/today/ws")
+async def today_appointments_websocket(websocket: WebSocket, doctor_id: Optional[int] = None):
+    """
+    Real-time feed of today's appointments (whole clinic or one doctor with ?doctor_id=).
+    Messages: snapshot, appointment.created, appointment.status_changed, appointment.deleted, heartbeat
+    """
+    await websocket.accept()
+    print(f"🔌 ENDPOINT: /appointments/today/ws - Client connected (doctor={doctor_id})")
+    events = _today_events(doctor_id)
+    try:
+        async for event in events:
+            await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"❌ ENDPOINT: Error in today's appointments websocket: {e}")
+    finally:
+        await events.aclose()
+        print(f"🔌 ENDPOINT: /appointments/today/ws - Client disconnected (doctor={doctor_id})")
+
+@router.get("/today/stream")
+async def today_appointments_stream(
+    request: Request,
+    doctor_id: Optional[int] = Query(None, description="Only this doctor's appointments")
+):
+    """
+    Same feed as /appointments/today/ws as Server-Sent Events, for clients without WebSocket
+    """
+    async def event_stream():
+        events = _today_events(doctor_id)
+        try:
+            async for event in events:
+                if await request.is_disconnected():
+                    break
+                if event["type"] == "heartbeat":
+                    yield ": heartbeat\n\n"
+                else:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @legacy_router.get("/today", response_model=List[TodayAppointment])
 def get_today_appointments_legacy(db: Session = Depends(get_db)):
     """
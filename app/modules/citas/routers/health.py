@@ -1,5 +1,12 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.orm import Session
 from datetime import datetime
+from app.core.dependencies import get_db
+from app.core.job_queue import queue_depth
+from app.core.metrics import metrics
+from app.core.outbox import outbox_backlog
 
 router = APIRouter(prefix="/health", tags=["health"])
 
@@ -23,3 +30,32 @@ def ping():
     Endpoint simple de ping/pong para verificar conectividad básica.
     """
     return {"message": "pong", "timestamp": datetime.now().isoformat()}
+
+@router.get("/ready")
+def readiness_check(db: Session = Depends(get_db)):
+    """
+    Readiness: el proceso puede atender peticiones (responde 503 si la base de datos no está disponible).
+    """
+    try:
+        db.execute(text("SELECT 1"))
+    except Exception as e:
+        print(f"❌ HEALTH: Base de datos no disponible: {e}")
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unavailable", "database": "error", "timestamp": datetime.now().isoformat()}
+        )
+    return {"status": "ready", "database": "ok", "timestamp": datetime.now().isoformat()}
+
+@router.get("/metrics")
+def get_metrics():
+    """
+    Métricas internas de este proceso (locks de reserva, cachés, etc.).
+    """
+    return {"timestamp": datetime.now().isoformat(), **metrics.snapshot()}
+
+@router.get("/jobs")
+def get_job_queue_status(db: Session = Depends(get_db)):
+    """
+    Trabajos de la cola en segundo plano por estado y eventos del outbox pendientes.
+    """
+    return {"timestamp": datetime.now().isoformat(), "jobs": queue_depth(db), "outbox": outbox_backlog(db)}
@@ -1,6 +1,7 @@
-from datetime import datetime
-from pydantic import BaseModel
-from typing import Optional
+from datetime import date, datetime
+from enum import Enum
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
 
 # Base schema for appointments
 class AppointmentBase(BaseModel):
@@ -27,10 +28,61 @@ class AppointmentOut(AppointmentBase):
     id: int
     created_at: datetime
     deleted_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True  # Pydantic V2: Allows automatic conversion from SQLAlchemy models
 
+# Incremental sync feed for doctor calendars (GET /appointments/doctor/{id}/changes)
+class AppointmentChange(AppointmentOut):
+    deleted: bool = Field(False, description="True for soft-deleted appointments (tombstones)")
+
+class AppointmentSyncResponse(BaseModel):
+    changes: List[AppointmentChange]
+    next_token: Optional[str] = Field(None, description="Opaque token to send as 'since' on the next sync")
+    has_more: bool = Field(False, description="True if more changes are available right away")
+
+# Recurrence rule for bulk creation (e.g. weekly physiotherapy)
+class RecurrenceFrequency(str, Enum):
+    DAILY = "daily"
+    WEEKLY = "weekly"
+
+class RecurrenceRule(BaseModel):
+    frequency: RecurrenceFrequency = Field(..., description="Recurrence frequency")
+    interval: int = Field(1, ge=1, le=52, description="Repeat every N days/weeks")
+    count: Optional[int] = Field(None, ge=1, le=200, description="Total number of occurrences")
+    until: Optional[date] = Field(None, description="Last date (inclusive) of the recurrence")
+
+    @model_validator(mode="after")
+    def check_limit(self):
+        if self.count is None and self.until is None:
+            raise ValueError("A recurrence rule needs either 'count' or 'until'")
+        return self
+
+# For creating several appointments at once (POST /appointments/bulk)
+class AppointmentBulkItem(AppointmentCreate):
+    recurrence: Optional[RecurrenceRule] = None
+
+class AppointmentBulkCreate(BaseModel):
+    appointments: List[AppointmentBulkItem] = Field(..., min_length=1, description="Appointments to create")
+    atomic: bool = Field(False, description="If true, nothing is created when any item fails")
+
+class AppointmentBulkItemResult(BaseModel):
+    index: int
+    occurrence: int
+    appointment_date: datetime
+    doctor_id: int
+    patient_id: int
+    success: bool
+    appointment: Optional[AppointmentOut] = None
+    error: Optional[str] = None
+
+class AppointmentBulkResponse(BaseModel):
+    total: int
+    created: int
+    failed: int
+    results: List[AppointmentBulkItemResult]
+
 # Legacy schemas for backward compatibility (if needed temporarily)
 class CitaBase(BaseModel):
     fecha_hora: datetime
@@ -0,0 +1,162 @@
+"""
+Eventos de citas: payloads del outbox y push en tiempo real de la agenda del día.
+
+AppointmentService registra appointment.created | appointment.status_changed |
+appointment.deleted en el outbox; el suscriptor push_today_events los publica, fuera de la
+petición, en los canales "today:clinic" y "today:doctor:{id}". Cada evento lleva la cita
+con el mismo formato que GET /appointments/today, así las pantallas de recepción aplican
+el cambio sin volver a consultar la agenda completa.
+"""
+import json
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.models.outbox_event import OutboxEvent
+from app.core.outbox import outbox_handler, record_events
+from app.core.realtime import broker
+from app.modules.auth.models.user import User
+from app.modules.citas.models.cita import Appointment
+from app.modules.schedules.models.doctor_settings import DoctorSettings
+
+DEFAULT_DURATION_MINUTES = 30
+APPOINTMENT_AGGREGATE = "appointment"
+
+
+def appointment_payload(appointment) -> Dict[str, Any]:
+    """Estado de la cita guardado con el evento (los suscriptores no dependen de que la fila siga existiendo)"""
+    return {
+        "id": appointment.id,
+        "doctor_id": appointment.doctor_id,
+        "patient_id": appointment.patient_id,
+        "appointment_date": appointment.appointment_date.isoformat(),
+        "reason": appointment.reason,
+        "status": appointment.status
+    }
+
+
+def record_appointment_events(db: Session, event_type: str, appointments: Iterable[Any]) -> int:
+    """Agregar un evento appointment.<event_type> por cita a la transacción actual"""
+    return record_events(db, APPOINTMENT_AGGREGATE, (
+        (appointment.id, f"appointment.{event_type}", appointment_payload(appointment))
+        for appointment in appointments
+    ))
+
+
+def today_channel(doctor_id: Optional[int] = None) -> str:
+    return "today:clinic" if doctor_id is None else f"today:doctor:{doctor_id}"
+
+
+def today_bounds(day: Optional[date] = None) -> Tuple[datetime, datetime]:
+    """Inicio (incluido) y fin (excluido) del día, para filtrar por rango y usar el índice"""
+    day = day or date.today()
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def today_appointments_query(db: Session, doctor_id: Optional[int] = None):
+    """
+    Citas de hoy con el nombre del paciente y la duración configurada del doctor,
+    en una sola consulta (incluye las borradas lógicamente; el llamador decide).
+    """
+    start, end = today_bounds()
+    query = db.query(
+        Appointment.id,
+        Appointment.doctor_id,
+        Appointment.appointment_date,
+        Appointment.reason,
+        Appointment.status,
+        Appointment.deleted_at,
+        User.firstName,
+        User.lastName,
+        func.coalesce(DoctorSettings.appointment_duration, DEFAULT_DURATION_MINUTES).label("duration")
+    ).outerjoin(
+        User, Appointment.patient_id == User.id_user
+    ).outerjoin(
+        DoctorSettings, DoctorSettings.doctor_id == Appointment.doctor_id
+    ).filter(
+        Appointment.appointment_date >= start,
+        Appointment.appointment_date < end
+    )
+    if doctor_id is not None:
+        query = query.filter(Appointment.doctor_id == doctor_id)
+    return query
+
+
+def format_today_appointment(row) -> Dict[str, Any]:
+    """Fila de today_appointments_query() -> formato de TodayAppointment"""
+    return {
+        "id": row.id,
+        "patient_name": f"{row.firstName} {row.lastName}" if row.firstName is not None else "Paciente Desconocido",
+        "appointment_date": row.appointment_date.isoformat(),
+        "reason": row.reason or "Consulta General",
+        "status": row.status,
+        "duration": f"{row.duration} min"
+    }
+
+
+def load_today_appointments(db: Session, appointment_ids: Iterable[int]) -> List[Any]:
+    """Filas de hoy de las citas indicadas (las de otros días no interesan a los suscriptores)"""
+    appointment_ids = list(appointment_ids)
+    if not appointment_ids:
+        return []
+    return today_appointments_query(db).filter(Appointment.id.in_(appointment_ids)).all()
+
+
+def publish_appointment_events(event_type: str, rows: Iterable[Any]) -> int:
+    """
+    Publicar appointment.created | appointment.status_changed | appointment.deleted
+    para filas ya confirmadas en la base de datos. Devuelve cuántos eventos se publicaron.
+    """
+    published = 0
+    for row in rows:
+        try:
+            broker.publish(
+                [today_channel(), today_channel(row.doctor_id)],
+                {
+                    "type": f"appointment.{event_type}",
+                    "doctor_id": row.doctor_id,
+                    "date": row.appointment_date.date().isoformat(),
+                    "appointment": format_today_appointment(row)
+                }
+            )
+            published += 1
+        except Exception as e:
+            # Un fallo del canal en tiempo real no debe afectar una operación ya confirmada
+            print(f"⚠️ APPOINTMENT_EVENTS: Error publicando appointment.{event_type} ({row.id}): {e}")
+    return published
+
+
+def _row_from_payload(payload: Dict[str, Any]):
+    # La cita ya no existe (borrado físico): basta con su estado al momento del evento
+    return SimpleNamespace(
+        id=payload["id"],
+        doctor_id=payload["doctor_id"],
+        appointment_date=datetime.fromisoformat(payload["appointment_date"]),
+        reason=payload.get("reason"),
+        status=payload.get("status"),
+        deleted_at=None,
+        firstName=None,
+        lastName=None,
+        duration=DEFAULT_DURATION_MINUTES
+    )
+
+
+@outbox_handler("appointment.")
+def push_today_events(db: Session, events: List[OutboxEvent]):
+    """Suscriptor del outbox: publicar en tiempo real los cambios de las citas de hoy (un query por lote)"""
+    today = date.today().isoformat()
+    todays = []
+    for outbox_event in events:
+        payload = json.loads(outbox_event.payload)
+        if payload["appointment_date"][:10] == today:
+            todays.append((outbox_event.event_type.split(".", 1)[1], payload))
+    if not todays:
+        return
+
+    rows = {row.id: row for row in load_today_appointments(db, {payload["id"] for _, payload in todays})}
+    for event_type, payload in todays:
+        publish_appointment_events(event_type, [rows.get(payload["id"]) or _row_from_payload(payload)])
@@ -0,0 +1,96 @@
+"""
+Exportación de citas en streaming (NDJSON o CSV).
+
+Las filas se leen con un cursor del lado del servidor (stream_results + yield_per)
+y se envían por bloques a medida que llegan, por lo que la memoria usada no depende
+del tamaño de la exportación. El generador abre su propia sesión porque se consume
+mientras se envía la respuesta, fuera del ciclo de vida de la dependencia get_db.
+"""
+import csv
+import io
+import os
+from datetime import date, datetime, time, timedelta
+from enum import Enum
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+
+from app.core.database import SessionLocal
+from app.core.responses import dumps
+from app.modules.citas.models.cita import Appointment
+
+EXPORT_CHUNK_SIZE = int(os.getenv("APPOINTMENT_EXPORT_CHUNK_SIZE", "2000"))
+
+EXPORT_COLUMNS = (
+    Appointment.id, Appointment.appointment_date, Appointment.doctor_id, Appointment.patient_id,
+    Appointment.status, Appointment.reason, Appointment.created_at, Appointment.updated_at
+)
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+
+def _build_query(start_date: Optional[date], end_date: Optional[date], doctor_id: Optional[int], status: Optional[str]):
+    query = select(*EXPORT_COLUMNS).where(Appointment.deleted_at.is_(None))
+    # Predicados de rango (no func.date) para poder usar índices sobre appointment_date
+    if start_date:
+        query = query.where(Appointment.appointment_date >= datetime.combine(start_date, time.min))
+    if end_date:
+        query = query.where(Appointment.appointment_date < datetime.combine(end_date + timedelta(days=1), time.min))
+    if doctor_id is not None:
+        query = query.where(Appointment.doctor_id == doctor_id)
+    if status:
+        query = query.where(Appointment.status == status)
+    return query.order_by(Appointment.appointment_date, Appointment.id)
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+def stream_appointments_export(
+    export_format: ExportFormat,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    doctor_id: Optional[int] = None,
+    status: Optional[str] = None
+) -> Iterator[bytes]:
+    """Generar la exportación por bloques de EXPORT_CHUNK_SIZE filas"""
+    query = _build_query(start_date, end_date, doctor_id, status).execution_options(
+        stream_results=True, yield_per=EXPORT_CHUNK_SIZE
+    )
+
+    if export_format == ExportFormat.CSV:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        yield buffer.getvalue().encode("utf-8")
+
+    total = 0
+    db = SessionLocal()
+    try:
+        result = db.execute(query)
+        for partition in result.mappings().partitions():
+            if export_format == ExportFormat.CSV:
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows([[_csv_value(row[field]) for field in EXPORT_FIELDS] for row in partition])
+                chunk = buffer.getvalue().encode("utf-8")
+            else:
+                chunk = b"".join(dumps(dict(row)) + b"\n" for row in partition)
+            total += len(partition)
+            yield chunk
+        print(f"✅ APPOINTMENT_EXPORT: Exported {total} appointments as {export_format.value}")
+    finally:
+        db.close()
@@ -0,0 +1,230 @@
+"""
+Particionamiento mensual de la tabla appointment por appointment_date.
+
+La conversión es opcional y se hace una vez con el script de administración:
+
+    python -m app.scripts.manage_appointment_partitions migrate
+
+Después de migrar:
+- appointment es una tabla particionada por rango (un mes por partición, appointment_pYYYYMM)
+  con una partición DEFAULT para fechas fuera de rango. La clave primaria pasa a ser
+  (id, appointment_date), porque PostgreSQL exige la columna de partición en las claves únicas.
+- Las FK que apuntaban a appointment (medical_history, appointment_reminder) se eliminan:
+  una FK solo puede referenciar una clave única completa. La integridad queda a cargo
+  de los servicios (las citas con historial no se borran físicamente).
+- La tarea periódica appointments.partitions crea con anticipación las particiones de los
+  próximos meses y, si APPOINTMENT_ARCHIVE_AFTER_MONTHS > 0, separa (DETACH) las
+  particiones antiguas y las mueve al esquema de archivo.
+
+Las consultas que filtran por rango de appointment_date (disponibilidad, agenda del día,
+reportes, exportación) solo leen las particiones del rango.
+"""
+import os
+import re
+from datetime import date, datetime, time
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.job_queue import task
+from app.modules.citas.models.cita import Appointment
+
+PARTITION_PREFIX = "appointment_p"
+DEFAULT_PARTITION = "appointment_default"
+ARCHIVE_PREFIX = "appointment_archive_"
+ARCHIVE_SCHEMA = os.getenv("APPOINTMENT_ARCHIVE_SCHEMA", "archive")
+PARTITION_MONTHS_AHEAD = int(os.getenv("APPOINTMENT_PARTITION_MONTHS_AHEAD", "6"))
+# 0 = no archivar automáticamente (las citas archivadas dejan de aparecer en la API)
+ARCHIVE_AFTER_MONTHS = int(os.getenv("APPOINTMENT_ARCHIVE_AFTER_MONTHS", "0"))
+
+_PARTITION_NAME_RE = re.compile(rf"^{PARTITION_PREFIX}(\d{{4}})(\d{{2}})$")
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    return bool(connection.scalar(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('appointment'))"
+    )))
+
+
+def list_partitions(connection: Connection) -> List[Dict]:
+    """Particiones de appointment con su mes (None para DEFAULT), filas estimadas y tamaño"""
+    rows = connection.execute(text("""
+        SELECT c.relname, c.reltuples::bigint AS estimated_rows, pg_total_relation_size(c.oid) AS total_bytes
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass('appointment')
+        ORDER BY c.relname
+    """)).all()
+    partitions = []
+    for name, estimated_rows, total_bytes in rows:
+        match = _PARTITION_NAME_RE.match(name)
+        partitions.append({
+            "name": name,
+            "month": date(int(match.group(1)), int(match.group(2)), 1) if match else None,
+            "estimated_rows": max(estimated_rows, 0),
+            "total_bytes": total_bytes
+        })
+    return partitions
+
+
+def _month_bounds(month: date):
+    return datetime.combine(month, time.min), datetime.combine(add_months(month, 1), time.min)
+
+
+def create_month_partition(connection: Connection, month: date) -> bool:
+    """
+    Crear la partición de un mes si no existe. Si la partición DEFAULT ya tiene filas de ese
+    mes, se mueven a la nueva partición antes de adjuntarla (si no, el ATTACH fallaría).
+    """
+    name = partition_name(month)
+    if connection.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}):
+        return False
+
+    start, end = _month_bounds(month)
+    bounds = {"start": start, "end": end}
+    has_default = connection.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION})
+    rows_in_default = has_default and connection.scalar(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE appointment_date >= :start AND appointment_date < :end)"
+    ), bounds)
+
+    range_sql = f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') TO ('{end.isoformat(sep=' ')}')"
+    if rows_in_default:
+        connection.execute(text(f"CREATE TABLE {name} (LIKE appointment INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        connection.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE appointment_date >= :start AND appointment_date < :end
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        """), bounds)
+        connection.execute(text(f"ALTER TABLE appointment ATTACH PARTITION {name} {range_sql}"))
+    else:
+        connection.execute(text(f"CREATE TABLE {name} PARTITION OF appointment {range_sql}"))
+    print(f"🗂️ APPOINTMENT_PARTITIONS: Partición {name} creada")
+    return True
+
+
+def ensure_future_partitions(connection: Connection, months_ahead: int = PARTITION_MONTHS_AHEAD, today: Optional[date] = None) -> List[str]:
+    """Crear las particiones desde el mes actual hasta months_ahead meses adelante"""
+    current = month_start(today or date.today())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if create_month_partition(connection, month):
+            created.append(partition_name(month))
+    return created
+
+
+def archive_partitions(connection: Connection, older_than_months: int, today: Optional[date] = None) -> List[str]:
+    """
+    Separar las particiones de meses completos anteriores a older_than_months y moverlas al
+    esquema de archivo como appointment_archive_YYYYMM. Las filas archivadas dejan de
+    aparecer en las consultas de la API (incluidos los historiales médicos asociados).
+    """
+    if older_than_months < 1:
+        raise ValueError("older_than_months debe ser al menos 1")
+
+    cutoff = add_months(month_start(today or date.today()), -older_than_months)
+    archived = []
+    connection.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+    for partition in list_partitions(connection):
+        month = partition["month"]
+        if month is None or add_months(month, 1) > cutoff:
+            continue
+        archive_name = f"{ARCHIVE_PREFIX}{month:%Y%m}"
+        connection.execute(text(f"ALTER TABLE appointment DETACH PARTITION {partition['name']}"))
+        connection.execute(text(f"ALTER TABLE {partition['name']} SET SCHEMA {ARCHIVE_SCHEMA}"))
+        connection.execute(text(f"ALTER TABLE {ARCHIVE_SCHEMA}.{partition['name']} RENAME TO {archive_name}"))
+        archived.append(f"{ARCHIVE_SCHEMA}.{archive_name}")
+        print(f"📦 APPOINTMENT_PARTITIONS: {partition['name']} archivada como {ARCHIVE_SCHEMA}.{archive_name}")
+    return archived
+
+
+def migrate_to_partitioned(connection: Connection, months_ahead: int = PARTITION_MONTHS_AHEAD) -> bool:
+    """
+    Convertir appointment en tabla particionada por mes (en la transacción de connection).
+    Bloquea la tabla mientras copia las filas: ejecutar en una ventana de mantenimiento.
+    """
+    if is_partitioned(connection):
+        print("ℹ️ APPOINTMENT_PARTITIONS: appointment ya está particionada")
+        return False
+
+    connection.execute(text("LOCK TABLE appointment IN ACCESS EXCLUSIVE MODE"))
+    sequence = connection.scalar(text("SELECT pg_get_serial_sequence('appointment', 'id')"))
+    first_date, total = connection.execute(text("SELECT min(appointment_date), count(*) FROM appointment")).one()
+
+    outgoing_fks = connection.scalars(text(
+        "SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = 'appointment'::regclass AND contype = 'f'"
+    )).all()
+    incoming_fks = connection.execute(text(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint WHERE confrelid = 'appointment'::regclass AND contype = 'f'"
+    )).all()
+    for table_name, constraint_name in incoming_fks:
+        connection.execute(text(f'ALTER TABLE {table_name} DROP CONSTRAINT "{constraint_name}"'))
+        print(f"⚠️ APPOINTMENT_PARTITIONS: FK {constraint_name} de {table_name} eliminada")
+
+    # La secuencia de ids se conserva: se desvincula de la tabla vieja antes de borrarla
+    if sequence:
+        connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+
+    connection.execute(text(
+        "CREATE TABLE appointment_partitioned (LIKE appointment INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (appointment_date)"
+    ))
+    connection.execute(text("ALTER TABLE appointment_partitioned ADD CONSTRAINT appointment_partitioned_pkey PRIMARY KEY (id, appointment_date)"))
+    connection.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF appointment_partitioned DEFAULT"))
+
+    month = month_start(first_date.date() if first_date else date.today())
+    last_month = add_months(month_start(date.today()), months_ahead)
+    while month <= last_month:
+        start, end = _month_bounds(month)
+        connection.execute(text(
+            f"CREATE TABLE {partition_name(month)} PARTITION OF appointment_partitioned "
+            f"FOR VALUES FROM ('{start.isoformat(sep=' ')}') TO ('{end.isoformat(sep=' ')}')"
+        ))
+        month = add_months(month, 1)
+
+    connection.execute(text("INSERT INTO appointment_partitioned SELECT * FROM appointment"))
+    connection.execute(text("DROP TABLE appointment"))
+    connection.execute(text("ALTER TABLE appointment_partitioned RENAME TO appointment"))
+    connection.execute(text("ALTER TABLE appointment RENAME CONSTRAINT appointment_partitioned_pkey TO appointment_pkey"))
+    for definition in outgoing_fks:
+        connection.execute(text(f"ALTER TABLE appointment ADD {definition}"))
+    if sequence:
+        connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY appointment.id"))
+
+    # Los índices del modelo se crean en la tabla padre y PostgreSQL los replica en cada partición
+    for index in Appointment.__table__.indexes:
+        index.create(connection)
+
+    print(f"✅ APPOINTMENT_PARTITIONS: appointment particionada ({total} citas copiadas)")
+    return True
+
+
+@task("appointments.partitions", priority=400, max_attempts=3, every_seconds=86400)
+def maintain_appointment_partitions(db: Session, payload: dict):
+    """Tarea periódica: particiones futuras y, si está configurado, archivo de las antiguas"""
+    connection = db.connection()
+    if not is_partitioned(connection):
+        return
+    created = ensure_future_partitions(connection)
+    archived = archive_partitions(connection, ARCHIVE_AFTER_MONTHS) if ARCHIVE_AFTER_MONTHS > 0 else []
+    db.commit()
+    if created or archived:
+        print(f"🗂️ APPOINTMENT_PARTITIONS: {len(created)} particiones creadas, {len(archived)} archivadas")
@@ -0,0 +1,105 @@
+"""
+Utilidades para el feed de calendario de los doctores: tokens de sincronización
+incremental y generación del iCalendar (RFC 5545).
+"""
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Tuple
+
+SyncPosition = Tuple[datetime, int]
+
+ICAL_PRODID = "-//Distributed Systems Project//Doctor Calendar//ES"
+ICAL_LINE_LIMIT = 75
+
+
+class InvalidSyncToken(ValueError):
+    """El token de sincronización no es válido"""
+
+
+def encode_sync_token(position: SyncPosition) -> str:
+    """Token opaco con la última posición (updated_at, id) entregada al cliente"""
+    updated_at, appointment_id = position
+    raw = json.dumps({"t": updated_at.isoformat(), "i": appointment_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> SyncPosition:
+    """Recuperar la posición (updated_at, id) de un token"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["t"]), int(data["i"])
+    except Exception:
+        raise InvalidSyncToken("Token de sincronización inválido")
+
+
+def _escape(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _fold(line: str) -> str:
+    """Plegar líneas largas a 75 octetos como exige RFC 5545"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= ICAL_LINE_LIMIT:
+        return line
+
+    parts = []
+    current = ""
+    limit = ICAL_LINE_LIMIT
+    for char in line:
+        if len((current + char).encode("utf-8")) > limit:
+            parts.append(current)
+            current = ""
+            limit = ICAL_LINE_LIMIT - 1  # las continuaciones empiezan con un espacio
+        current += char
+    parts.append(current)
+    return "\r\n ".join(parts)
+
+
+def _utc_stamp(value: Optional[datetime]) -> str:
+    value = value or datetime.now(timezone.utc)
+    if value.tzinfo:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _local_stamp(value: datetime) -> str:
+    # appointment_date se guarda sin zona horaria: se exporta como hora "flotante"
+    return value.replace(tzinfo=None).strftime("%Y%m%dT%H%M%S")
+
+
+def render_calendar(doctor_id: int, rows: Iterable, duration_minutes: int) -> str:
+    """
+    Generar el VCALENDAR de un doctor.
+
+    Cada fila debe tener id, appointment_date, reason, status, updated_at,
+    patient_first_name y patient_last_name.
+    """
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{ICAL_PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(f'Agenda doctor {doctor_id}')}",
+    ]
+    for row in rows:
+        start = row.appointment_date
+        patient_name = f"{row.patient_first_name} {row.patient_last_name}".strip()
+        lines.extend([
+            "BEGIN:VEVENT",
+            f"UID:appointment-{row.id}@distributed-systems-project",
+            f"DTSTAMP:{_utc_stamp(row.updated_at)}",
+            f"LAST-MODIFIED:{_utc_stamp(row.updated_at)}",
+            f"DTSTART:{_local_stamp(start)}",
+            f"DTEND:{_local_stamp(start + timedelta(minutes=duration_minutes))}",
+            f"SUMMARY:{_escape(f'Cita: {patient_name}')}",
+            f"STATUS:{'CANCELLED' if row.status == 'cancelled' else 'CONFIRMED'}",
+        ])
+        if row.reason:
+            lines.append(f"DESCRIPTION:{_escape(row.reason)}")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
@@ -1,11 +1,46 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
-from datetime import datetime, date
-from typing import List, Optional
+from sqlalchemy import and_, or_, func, insert, literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+from typing import List, Optional, Tuple
+import os
 from app.modules.citas.models.cita import Appointment
 from app.modules.auth.models.user import User
-from app.modules.citas.schemas.cita import AppointmentCreate, AppointmentOut
+from app.modules.auth.services.role_lookup_service import RoleLookupService
+from app.modules.citas.schemas.cita import (
+    AppointmentCreate, AppointmentOut, AppointmentBulkCreate, AppointmentBulkItem,
+    AppointmentBulkItemResult, AppointmentBulkResponse, RecurrenceFrequency,
+    AppointmentChange, AppointmentSyncResponse
+)
+from app.modules.citas.services.appointment_events import (
+    format_today_appointment, record_appointment_events, today_appointments_query, today_bounds
+)
+from app.modules.citas.services.calendar_feed import decode_sync_token, encode_sync_token, render_calendar
+from app.modules.schedules.models.doctor_settings import DoctorSettings
+from app.modules.citas.services.reminder_service import REMINDABLE_STATUSES, ReminderService
 from app.modules.schedules.services.schedule_service import ScheduleService
+from app.core.locks import booking_lock
+from app.modules.schedules.services.availability_cache import invalidate_availability
+
+# Maximum number of appointments (after expanding recurrences) accepted by a bulk request
+MAX_BULK_APPOINTMENTS = 500
+
+# Column projections for the fast list path (same keys as AppointmentOut / CitaOut)
+APPOINTMENT_ROW_COLUMNS = (
+    Appointment.appointment_date, Appointment.reason, Appointment.status,
+    Appointment.patient_id, Appointment.doctor_id, Appointment.id,
+    Appointment.created_at, Appointment.deleted_at, Appointment.updated_at
+)
+LEGACY_ROW_COLUMNS = (
+    Appointment.id.label("id_cita"), Appointment.appointment_date.label("fecha_hora"),
+    Appointment.reason.label("motivo"), Appointment.status.label("estado"),
+    Appointment.patient_id.label("id_paciente"), Appointment.doctor_id.label("id_doctor")
+)
+
+# Changes newer than this are left for the next sync, so rows from transactions that
+# started earlier but commit later (same updated_at ordering) are not skipped
+SYNC_SAFETY_LAG_SECONDS = float(os.getenv("APPOINTMENT_SYNC_SAFETY_LAG_SECONDS", "5"))
 
 class AppointmentService:
     def __init__(self, db: Session):
@@ -27,79 +62,229 @@ class AppointmentService:
         print(f"🚀 APPOINTMENT_SERVICE: Creating new appointment")
         print(f"📋 Data: doctor={appointment_data.doctor_id}, patient={appointment_data.patient_id}, date={appointment_data.appointment_date}")
 
-        # Verificar que el doctor existe y es realmente un doctor (id_role = 2)
-        doctor = self.db.query(User).join(User.user_roles).filter(
-            User.id_user == appointment_data.doctor_id,
-            User.id_status == True
-        ).first()
+        # Verificar en una sola consulta que el doctor (id_role = 2) y el paciente (id_role = 1)
+        # existen, están activos y tienen el rol correcto
+        RoleLookupService(self.db).validate_appointment_participants(
+            doctor_id=appointment_data.doctor_id,
+            patient_id=appointment_data.patient_id
+        )
 
-        if not doctor:
-            print(f"❌ APPOINTMENT_SERVICE: Doctor with ID {appointment_data.doctor_id} not found")
-            raise ValueError("Doctor not found")
+        # Verificar disponibilidad del doctor usando el ScheduleService
+        schedule_service = ScheduleService(self.db)
 
-        # Verificar que el doctor tiene rol de doctor (id_role = 2)
-        doctor_role = any(role.id_role == 2 for role in doctor.user_roles)
-        if not doctor_role:
-            print(f"❌ APPOINTMENT_SERVICE: User {appointment_data.doctor_id} is not a doctor")
-            raise ValueError("The specified user is not a doctor")
+        # Crear la configuración por defecto antes del lock: su commit liberaría el lock de la transacción
+        schedule_service.get_or_create_doctor_settings(appointment_data.doctor_id)
+
+        # Sección crítica: validación + inserción bajo el lock (doctor, fecha), segura entre procesos
+        booking_key = (appointment_data.doctor_id, appointment_data.appointment_date.replace(tzinfo=None).date())
+        with booking_lock(self.db, [booking_key]):
+
+            # Verificar que el slot esté disponible
+            is_available = schedule_service.is_slot_available(
+                doctor_id=appointment_data.doctor_id,
+                appointment_datetime=appointment_data.appointment_date
+            )
+
+            if not is_available:
+                print(f"❌ APPOINTMENT_SERVICE: Doctor is not available at {appointment_data.appointment_date}")
+                raise ValueError("El doctor no está disponible en esa fecha y hora. Por favor, consulte los horarios disponibles.")
+
+            # Verificar que no hay conflicto de horarios para el doctor (verificación adicional)
+            doctor_conflict = self.db.query(Appointment).filter(
+                Appointment.doctor_id == appointment_data.doctor_id,
+                Appointment.appointment_date == appointment_data.appointment_date,
+                Appointment.status.in_(["scheduled", "confirmed"]),
+                Appointment.deleted_at.is_(None)
+            ).first()
+
+            if doctor_conflict:
+                print(f"❌ APPOINTMENT_SERVICE: Schedule conflict for doctor at {appointment_data.appointment_date}")
+                raise ValueError("The doctor already has an appointment scheduled at that time")
+
+            # Crear la cita
+            new_appointment = Appointment(
+                patient_id=appointment_data.patient_id,
+                doctor_id=appointment_data.doctor_id,
+                appointment_date=appointment_data.appointment_date,
+                reason=appointment_data.reason,
+                status=appointment_data.status or "scheduled"
+            )
+
+            print(f"💾 APPOINTMENT_SERVICE: Saving appointment to database")
+            self.db.add(new_appointment)
+            self.db.flush()
+            # Reminders are stored in the same transaction as the appointment
+            ReminderService(self.db).schedule_reminders([(new_appointment.id, new_appointment.appointment_date)])
+            record_appointment_events(self.db, "created", [new_appointment])
+            self.db.commit()
+        invalidate_availability(*booking_key)
+        self.db.refresh(new_appointment)
 
-        # Verificar que el paciente existe y es realmente un paciente (id_role = 1)
-        patient = self.db.query(User).join(User.user_roles).filter(
-            User.id_user == appointment_data.patient_id,
-            User.id_status == True
-        ).first()
+        print(f"✅ APPOINTMENT_SERVICE: Appointment created successfully with ID {new_appointment.id}")
+        return new_appointment
 
-        if not patient:
-            print(f"❌ APPOINTMENT_SERVICE: Patient with ID {appointment_data.patient_id} not found")
-            raise ValueError("Patient not found")
+    def _expand_recurrence(self, item: AppointmentBulkItem) -> List[datetime]:
+        """
+        Expand a bulk item into the list of appointment dates defined by its recurrence rule
 
-        # Verificar que el paciente tiene rol de paciente (id_role = 1)
-        patient_role = any(role.id_role == 1 for role in patient.user_roles)
-        if not patient_role:
-            print(f"❌ APPOINTMENT_SERVICE: User {appointment_data.patient_id} is not a patient")
-            raise ValueError("The specified user is not a patient")
+        Args:
+            item (AppointmentBulkItem): Bulk item, optionally with a recurrence rule
 
-        # Verificar disponibilidad del doctor usando el ScheduleService
-        schedule_service = ScheduleService(self.db)
+        Returns:
+            List[datetime]: Appointment dates, starting with item.appointment_date
+        """
+        rule = item.recurrence
+        if rule is None:
+            return [item.appointment_date]
 
-        # Verificar que el slot esté disponible
-        is_available = schedule_service.is_slot_available(
-            doctor_id=appointment_data.doctor_id,
-            appointment_datetime=appointment_data.appointment_date
-        )
+        if rule.frequency == RecurrenceFrequency.DAILY:
+            step = timedelta(days=rule.interval)
+        else:
+            step = timedelta(weeks=rule.interval)
+
+        dates = []
+        current = item.appointment_date
+        while rule.count is None or len(dates) < rule.count:
+            if rule.until is not None and current.date() > rule.until:
+                break
+            dates.append(current)
+            if len(dates) > MAX_BULK_APPOINTMENTS:
+                break
+            current += step
+        return dates
+
+    def create_appointments_bulk(self, bulk_data: AppointmentBulkCreate) -> AppointmentBulkResponse:
+        """
+        Create many appointments in one transaction
 
-        if not is_available:
-            print(f"❌ APPOINTMENT_SERVICE: Doctor is not available at {appointment_data.appointment_date}")
-            raise ValueError("El doctor no está disponible en esa fecha y hora. Por favor, consulte los horarios disponibles.")
+        All requested slots are validated against one preloaded availability snapshot
+        per doctor, and accepted appointments are inserted with a single multi-row statement.
 
-        # Verificar que no hay conflicto de horarios para el doctor (verificación adicional)
-        doctor_conflict = self.db.query(Appointment).filter(
-            Appointment.doctor_id == appointment_data.doctor_id,
-            Appointment.appointment_date == appointment_data.appointment_date,
-            Appointment.status.in_(["scheduled", "confirmed"]),
-            Appointment.deleted_at.is_(None)
-        ).first()
+        Args:
+            bulk_data (AppointmentBulkCreate): Appointments to create (with optional recurrence)
 
-        if doctor_conflict:
-            print(f"❌ APPOINTMENT_SERVICE: Schedule conflict for doctor at {appointment_data.appointment_date}")
-            raise ValueError("The doctor already has an appointment scheduled at that time")
+        Returns:
+            AppointmentBulkResponse: Per-item results
 
-        # Crear la cita
-        new_appointment = Appointment(
-            patient_id=appointment_data.patient_id,
-            doctor_id=appointment_data.doctor_id,
-            appointment_date=appointment_data.appointment_date,
-            reason=appointment_data.reason,
-            status=appointment_data.status or "scheduled"
-        )
+        Raises:
+            ValueError: If the request expands to more than MAX_BULK_APPOINTMENTS appointments
+        """
+        print(f"🚀 APPOINTMENT_SERVICE: Creating appointments in bulk ({len(bulk_data.appointments)} items)")
 
-        print(f"💾 APPOINTMENT_SERVICE: Saving appointment to database")
-        self.db.add(new_appointment)
-        self.db.commit()
-        self.db.refresh(new_appointment)
+        # 1. Expand recurrence rules into individual requests
+        requests = []
+        for index, item in enumerate(bulk_data.appointments):
+            for occurrence, appointment_date in enumerate(self._expand_recurrence(item)):
+                requests.append((index, occurrence, item, appointment_date))
+                if len(requests) > MAX_BULK_APPOINTMENTS:
+                    raise ValueError(f"A bulk request can create at most {MAX_BULK_APPOINTMENTS} appointments")
 
-        print(f"✅ APPOINTMENT_SERVICE: Appointment created successfully with ID {new_appointment.id}")
-        return new_appointment
+        # 2. Load roles of every active doctor and patient involved in one query
+        user_ids = {item.doctor_id for _, _, item, _ in requests} | {item.patient_id for _, _, item, _ in requests}
+        roles_by_user = RoleLookupService(self.db).get_active_roles(user_ids)
+
+        # 3. Lock every (doctor, date) involved and load one availability snapshot per valid doctor
+        schedule_service = ScheduleService(self.db)
+        dates_by_doctor = defaultdict(list)
+        for _, _, item, appointment_date in requests:
+            if 2 in roles_by_user.get(item.doctor_id, set()):
+                dates_by_doctor[item.doctor_id].append(appointment_date.replace(tzinfo=None).date())
+        booking_keys = set()
+        for doctor_id, dates in dates_by_doctor.items():
+            # Default settings are created before locking: their commit would release the locks
+            schedule_service.get_or_create_doctor_settings(doctor_id)
+            booking_keys.update((doctor_id, target_date) for target_date in dates)
+
+        created = {}
+        with booking_lock(self.db, booking_keys):
+            snapshots = {
+                doctor_id: schedule_service.load_availability_snapshot(doctor_id, min(dates), max(dates))
+                for doctor_id, dates in dates_by_doctor.items()
+            }
+
+            # 4. Validate every request in memory; accepted slots are reserved in the snapshot
+            #    so that two items of the same batch cannot take the same slot
+            outcomes = []
+            for index, occurrence, item, appointment_date in requests:
+                doctor_roles = roles_by_user.get(item.doctor_id)
+                patient_roles = roles_by_user.get(item.patient_id)
+                error = None
+                if not doctor_roles:
+                    error = "Doctor not found"
+                elif 2 not in doctor_roles:
+                    error = "The specified user is not a doctor"
+                elif not patient_roles:
+                    error = "Patient not found"
+                elif 1 not in patient_roles:
+                    error = "The specified user is not a patient"
+                elif not snapshots[item.doctor_id].is_slot_available(appointment_date):
+                    error = "El doctor no está disponible en esa fecha y hora. Por favor, consulte los horarios disponibles."
+                else:
+                    snapshots[item.doctor_id].reserve(appointment_date)
+                outcomes.append((index, occurrence, item, appointment_date, error))
+
+            accepted = [outcome for outcome in outcomes if outcome[4] is None]
+            failed_count = len(outcomes) - len(accepted)
+            if bulk_data.atomic and failed_count:
+                print(f"❌ APPOINTMENT_SERVICE: Atomic bulk request rejected ({failed_count} invalid items)")
+                outcomes = [
+                    outcome if outcome[4] else outcome[:4] + ("Not created: the batch is atomic and other items failed",)
+                    for outcome in outcomes
+                ]
+                accepted = []
+
+            # 5. Insert all accepted appointments with a single multi-row statement
+            if accepted:
+                rows = [{
+                    "patient_id": item.patient_id,
+                    "doctor_id": item.doctor_id,
+                    "appointment_date": appointment_date,
+                    "reason": item.reason,
+                    "status": item.status or "scheduled"
+                } for _, _, item, appointment_date, _ in accepted]
+
+                print(f"💾 APPOINTMENT_SERVICE: Inserting {len(rows)} appointments")
+                new_appointments = self.db.scalars(
+                    insert(Appointment).returning(Appointment, sort_by_parameter_order=True),
+                    rows
+                ).all()
+                for outcome, new_appointment in zip(accepted, new_appointments):
+                    created[(outcome[0], outcome[1])] = AppointmentOut.model_validate(new_appointment)
+                ReminderService(self.db).schedule_reminders(
+                    (new_appointment.id, new_appointment.appointment_date) for new_appointment in new_appointments
+                )
+                record_appointment_events(self.db, "created", new_appointments)
+                self.db.commit()
+                for doctor_id, target_date in {
+                    (item.doctor_id, appointment_date.replace(tzinfo=None).date())
+                    for _, _, item, appointment_date, _ in accepted
+                }:
+                    invalidate_availability(doctor_id, target_date)
+            else:
+                # Nothing to insert: end the transaction to release the booking locks
+                self.db.rollback()
+
+        results = [
+            AppointmentBulkItemResult(
+                index=index,
+                occurrence=occurrence,
+                appointment_date=appointment_date,
+                doctor_id=item.doctor_id,
+                patient_id=item.patient_id,
+                success=(index, occurrence) in created,
+                appointment=created.get((index, occurrence)),
+                error=error
+            )
+            for index, occurrence, item, appointment_date, error in outcomes
+        ]
+
+        print(f"✅ APPOINTMENT_SERVICE: Bulk creation finished - created {len(created)}, failed {len(results) - len(created)}")
+        return AppointmentBulkResponse(
+            total=len(results),
+            created=len(created),
+            failed=len(results) - len(created),
+            results=results
+        )
 
     def get_all_appointments(self) -> List[Appointment]:
         """
@@ -113,6 +298,27 @@ class AppointmentService:
         print(f"✅ APPOINTMENT_SERVICE: Found {len(appointments)} appointments")
         return appointments
 
+    def get_appointment_rows(self, doctor_id: Optional[int] = None, legacy: bool = False) -> List[dict]:
+        """
+        Get appointments as plain dicts, skipping ORM hydration and pydantic validation.
+        Used by the opt-in fast path of the list endpoints.
+
+        Args:
+            doctor_id (Optional[int]): Only appointments of this doctor
+            legacy (bool): Use the legacy (CitaOut) field names
+
+        Returns:
+            List[dict]: One dict per appointment with the same keys as AppointmentOut/CitaOut
+        """
+        columns = LEGACY_ROW_COLUMNS if legacy else APPOINTMENT_ROW_COLUMNS
+        query = select(*columns).where(Appointment.deleted_at.is_(None))
+        if doctor_id is not None:
+            query = query.where(Appointment.doctor_id == doctor_id)
+
+        rows = [dict(row) for row in self.db.execute(query).mappings()]
+        print(f"✅ APPOINTMENT_SERVICE: Projected {len(rows)} appointment rows")
+        return rows
+
     def get_appointment_by_id(self, appointment_id: int) -> Optional[Appointment]:
         """
         Get an appointment by ID
@@ -194,8 +400,15 @@ class AppointmentService:
             return None
 
         appointment.status = new_status
+        if new_status in REMINDABLE_STATUSES:
+            # Una cita que vuelve a estar activa (p. ej. cancelled -> scheduled) recupera sus recordatorios futuros
+            ReminderService(self.db).schedule_reminders([(appointment.id, appointment.appointment_date)], reactivate=True)
+        else:
+            ReminderService(self.db).cancel_reminders([appointment.id])
+        record_appointment_events(self.db, "status_changed", [appointment])
         self.db.commit()
         self.db.refresh(appointment)
+        invalidate_availability(appointment.doctor_id, appointment.appointment_date.date())
 
         print(f"✅ APPOINTMENT_SERVICE: Status updated successfully")
         return appointment
@@ -221,7 +434,11 @@ class AppointmentService:
             return False
 
         appointment.deleted_at = datetime.utcnow()
+        doctor_id, target_date = appointment.doctor_id, appointment.appointment_date.date()
+        ReminderService(self.db).cancel_reminders([appointment.id])
+        record_appointment_events(self.db, "deleted", [appointment])
         self.db.commit()
+        invalidate_availability(doctor_id, target_date)
 
         print(f"✅ APPOINTMENT_SERVICE: Appointment soft deleted successfully")
         return True
@@ -243,8 +460,13 @@ class AppointmentService:
             print(f"❌ APPOINTMENT_SERVICE: Appointment {appointment_id} not found")
             return False
 
+        doctor_id, target_date = appointment.doctor_id, appointment.appointment_date.date()
+        # The event keeps the appointment's last state: the row is gone once the relay reads it
+        record_appointment_events(self.db, "deleted", [appointment])
+        ReminderService(self.db).delete_reminders([appointment.id])
         self.db.delete(appointment)
         self.db.commit()
+        invalidate_availability(doctor_id, target_date)
 
         print(f"✅ APPOINTMENT_SERVICE: Appointment hard deleted successfully")
         return True
@@ -256,9 +478,11 @@ class AppointmentService:
         Returns:
             int: Number of appointments today
         """
-        today = date.today()
+        # Range predicate instead of func.date(): uses the index and prunes to today's partition
+        start, end = today_bounds()
         count = self.db.query(func.count(Appointment.id)).filter(
-            func.date(Appointment.appointment_date) == today,
+            Appointment.appointment_date >= start,
+            Appointment.appointment_date < end,
             Appointment.deleted_at.is_(None)
         ).scalar()
         print(f"📊 APPOINTMENT_SERVICE: Found {count} appointments for today")
@@ -291,34 +515,112 @@ class AppointmentService:
         print(f"📊 APPOINTMENT_SERVICE: Found {count} pending appointments")
         return count or 0
 
-    def get_today_appointments_with_details(self) -> List[dict]:
+    def get_today_appointments_with_details(self, doctor_id: Optional[int] = None) -> List[dict]:
         """
-        Get today's appointments with patient and doctor details
+        Get today's appointments with patient details and the doctor's configured duration
+
+        Args:
+            doctor_id (Optional[int]): Only this doctor's appointments (None for the whole clinic)
 
         Returns:
             List[dict]: List of today's appointments with details
         """
-        today = date.today()
-        appointments = self.db.query(Appointment).join(
-            User, Appointment.patient_id == User.id_user, isouter=False
-        ).filter(
-            func.date(Appointment.appointment_date) == today,
+        # Single query: patient names and durations are joined instead of loaded per appointment
+        rows = today_appointments_query(self.db, doctor_id).filter(
             Appointment.deleted_at.is_(None)
-        ).all()
-
-        result = []
-        for appointment in appointments:
-            # Get patient info
-            patient = self.db.query(User).filter(User.id_user == appointment.patient_id).first()
+        ).order_by(Appointment.appointment_date, Appointment.id).all()
 
-            result.append({
-                "id": appointment.id,
-                "patient_name": f"{patient.firstName} {patient.lastName}" if patient else "Paciente Desconocido",
-                "appointment_date": appointment.appointment_date.isoformat(),
-                "reason": appointment.reason or "Consulta General",
-                "status": appointment.status,
-                "duration": "30 min"  # Por defecto, se puede calcular o almacenar en el futuro
-            })
+        result = [format_today_appointment(row) for row in rows]
 
         print(f"📊 APPOINTMENT_SERVICE: Found {len(result)} detailed appointments for today")
-        return result
\ No newline at end of file
+        return result
+
+    def get_doctor_changes(self, doctor_id: int, since_token: Optional[str] = None, limit: int = 500) -> AppointmentSyncResponse:
+        """
+        Get the appointments of a doctor changed since the last sync
+
+        Args:
+            doctor_id (int): Doctor ID
+            since_token (Optional[str]): Token returned by the previous sync (None for a full sync)
+            limit (int): Maximum number of changes per page
+
+        Returns:
+            AppointmentSyncResponse: Changes ordered by (updated_at, id), soft-deleted ones as tombstones
+        """
+        print(f"🔄 APPOINTMENT_SERVICE: Getting changes for doctor {doctor_id} since token {since_token!r}")
+
+        # Use the database clock so app/DB clock skew cannot hide changes
+        high_water = self.db.scalar(select(func.now())) - timedelta(seconds=SYNC_SAFETY_LAG_SECONDS)
+        query = self.db.query(Appointment).filter(
+            Appointment.doctor_id == doctor_id,
+            Appointment.updated_at <= high_water
+        )
+        if since_token:
+            query = query.filter(tuple_(Appointment.updated_at, Appointment.id) > tuple_(*decode_sync_token(since_token)))
+
+        appointments = query.order_by(Appointment.updated_at, Appointment.id).limit(limit + 1).all()
+        has_more = len(appointments) > limit
+        appointments = appointments[:limit]
+
+        changes = [
+            AppointmentChange.model_validate(appointment).model_copy(update={"deleted": appointment.deleted_at is not None})
+            for appointment in appointments
+        ]
+        next_token = encode_sync_token((appointments[-1].updated_at, appointments[-1].id)) if appointments else since_token
+
+        print(f"✅ APPOINTMENT_SERVICE: Found {len(changes)} changes (has_more={has_more})")
+        return AppointmentSyncResponse(changes=changes, next_token=next_token, has_more=has_more)
+
+    def get_doctor_calendar_version(self, doctor_id: int, from_date: date) -> Tuple[int, Optional[datetime], tuple, Optional[str]]:
+        """
+        Cheap version of a doctor's calendar feed starting at from_date:
+        - number of rows and last update: any create, update or (soft/hard) delete changes one of both
+        - doctor settings (appointment duration and last update): DTEND of every event
+        - hash of the patient names in the window: SUMMARY of every event (users have no updated_at)
+        """
+        count, last_updated = self.db.query(
+            func.count(Appointment.id), func.max(Appointment.updated_at)
+        ).filter(Appointment.doctor_id == doctor_id).one()
+
+        settings = self.db.query(
+            DoctorSettings.appointment_duration, DoctorSettings.updated_at
+        ).filter(DoctorSettings.doctor_id == doctor_id).first()
+
+        patient_names = func.concat(User.id_user, ":", User.firstName, " ", User.lastName)
+        patients_hash = self.db.query(
+            func.md5(func.string_agg(patient_names, aggregate_order_by(literal_column("','"), patient_names)))
+        ).select_from(Appointment).join(User, Appointment.patient_id == User.id_user).filter(
+            Appointment.doctor_id == doctor_id,
+            Appointment.deleted_at.is_(None),
+            Appointment.appointment_date >= datetime.combine(from_date, datetime.min.time())
+        ).scalar()
+        return count, last_updated, tuple(settings) if settings else (), patients_hash
+
+    def get_doctor_calendar(self, doctor_id: int, from_date: date) -> str:
+        """
+        Build the iCalendar feed of a doctor's appointments starting at from_date
+
+        Returns:
+            str: text/calendar document
+        """
+        print(f"📅 APPOINTMENT_SERVICE: Building calendar for doctor {doctor_id} from {from_date}")
+        rows = self.db.query(
+            Appointment.id,
+            Appointment.appointment_date,
+            Appointment.reason,
+            Appointment.status,
+            Appointment.updated_at,
+            User.firstName.label("patient_first_name"),
+            User.lastName.label("patient_last_name")
+        ).join(User, Appointment.patient_id == User.id_user).filter(
+            Appointment.doctor_id == doctor_id,
+            Appointment.deleted_at.is_(None),
+            Appointment.appointment_date >= datetime.combine(from_date, datetime.min.time())
+        ).order_by(Appointment.appointment_date).all()
+
+        duration = self.db.query(DoctorSettings.appointment_duration).filter(
+            DoctorSettings.doctor_id == doctor_id
+        ).scalar() or 30
+
+        print(f"✅ APPOINTMENT_SERVICE: Calendar with {len(rows)} events")
+        return render_calendar(doctor_id, rows, duration)
@@ -0,0 +1,187 @@
+"""
+Recordatorios de citas (24 h y 1 h antes).
+
+Los recordatorios se guardan como filas con su hora de vencimiento (due_at) al crear
+la cita, en la misma transacción, y se cancelan cuando la cita se cancela o se borra.
+El despachador solo lee el índice parcial de pendientes vencidos, nunca la tabla de
+citas completa, y reclama filas con FOR UPDATE SKIP LOCKED, así que varios workers
+pueden despachar en paralelo sin enviar dos veces el mismo recordatorio.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.job_queue import task
+from app.core.metrics import metrics
+from app.core.notifications import Notification, Notifier, get_notifier
+from app.modules.auth.models.user import User
+from app.modules.citas.models.appointment_reminder import AppointmentReminder
+from app.modules.citas.models.cita import Appointment
+
+REMINDER_OFFSETS = {
+    "24h": timedelta(hours=24),
+    "1h": timedelta(hours=1),
+}
+# Estados de cita que siguen necesitando recordatorio
+REMINDABLE_STATUSES = ("scheduled", "confirmed", "pending")
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "200"))
+REMINDER_MAX_ATTEMPTS = int(os.getenv("REMINDER_MAX_ATTEMPTS", "3"))
+REMINDER_MAX_BATCHES_PER_RUN = 50
+
+
+def _naive(value: datetime) -> datetime:
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+class ReminderService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def schedule_reminders(
+        self,
+        appointments: Iterable[Tuple[int, datetime]],
+        now: Optional[datetime] = None,
+        reactivate: bool = False
+    ) -> int:
+        """
+        Agregar los recordatorios de las citas (id, fecha) a la transacción actual.
+        Se omiten los que ya habrían vencido (p. ej. el de 24 h de una cita para dentro de 3 h).
+        Con reactivate=True los recordatorios cancelados de esas citas vuelven a pending
+        (cita que vuelve a un estado con recordatorio); los enviados no se tocan.
+        """
+        now = now or datetime.now()
+        rows = []
+        for appointment_id, appointment_date in appointments:
+            appointment_date = _naive(appointment_date)
+            for kind, offset in REMINDER_OFFSETS.items():
+                due_at = appointment_date - offset
+                if due_at > now:
+                    rows.append({"appointment_id": appointment_id, "kind": kind, "due_at": due_at, "status": "pending", "attempts": 0})
+
+        if rows:
+            statement = insert(AppointmentReminder).values(rows)
+            if reactivate:
+                statement = statement.on_conflict_do_update(
+                    constraint="uq_appointment_reminder_kind",
+                    set_={
+                        "status": "pending",
+                        "due_at": statement.excluded.due_at,
+                        "attempts": 0,
+                        "last_error": None
+                    },
+                    where=AppointmentReminder.status == "cancelled"
+                )
+            else:
+                statement = statement.on_conflict_do_nothing(constraint="uq_appointment_reminder_kind")
+            self.db.execute(statement)
+            metrics.increment("reminders_scheduled_total", len(rows))
+        return len(rows)
+
+    def cancel_reminders(self, appointment_ids: Iterable[int]) -> int:
+        """Cancelar los recordatorios pendientes de las citas (en la transacción actual)"""
+        appointment_ids = list(appointment_ids)
+        if not appointment_ids:
+            return 0
+        result = self.db.execute(
+            update(AppointmentReminder)
+            .where(AppointmentReminder.appointment_id.in_(appointment_ids), AppointmentReminder.status == "pending")
+            .values(status="cancelled")
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            metrics.increment("reminders_cancelled_total", result.rowcount)
+        return result.rowcount
+
+    def delete_reminders(self, appointment_ids: Iterable[int]) -> int:
+        """Borrar los recordatorios de citas que se eliminan físicamente (no hay FK en cascada con la tabla particionada)"""
+        appointment_ids = list(appointment_ids)
+        if not appointment_ids:
+            return 0
+        return self.db.execute(
+            delete(AppointmentReminder)
+            .where(AppointmentReminder.appointment_id.in_(appointment_ids))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    def dispatch_due(self, notifier: Optional[Notifier] = None, batch_size: int = REMINDER_BATCH_SIZE, now: Optional[datetime] = None) -> int:
+        """
+        Enviar un lote de recordatorios vencidos; devuelve cuántas filas se procesaron.
+        Las filas quedan bloqueadas (SKIP LOCKED para los demás workers) hasta el commit.
+        """
+        notifier = notifier or get_notifier()
+        now = now or datetime.now()
+
+        rows = self.db.execute(
+            select(
+                AppointmentReminder,
+                Appointment.appointment_date,
+                Appointment.status,
+                Appointment.deleted_at,
+                Appointment.patient_id,
+                Appointment.doctor_id,
+                User.firstName,
+                User.lastName
+            )
+            .join(Appointment, Appointment.id == AppointmentReminder.appointment_id)
+            .join(User, User.id_user == Appointment.patient_id)
+            .where(AppointmentReminder.status == "pending", AppointmentReminder.due_at <= now)
+            .order_by(AppointmentReminder.due_at)
+            .limit(batch_size)
+            .with_for_update(of=AppointmentReminder, skip_locked=True)
+        ).all()
+
+        for reminder, appointment_date, appointment_status, deleted_at, patient_id, doctor_id, first_name, last_name in rows:
+            labels = {"kind": reminder.kind}
+            if deleted_at is not None or appointment_status not in REMINDABLE_STATUSES:
+                reminder.status = "cancelled"
+                continue
+            if _naive(appointment_date) <= now:
+                # La cita ya pasó: el recordatorio ya no sirve
+                reminder.status = "expired"
+                metrics.increment("reminders_expired_total", labels=labels)
+                continue
+
+            try:
+                notifier.send(Notification(
+                    recipient_id=patient_id,
+                    subject=f"Recordatorio: tiene una cita el {_naive(appointment_date).strftime('%d/%m/%Y a las %H:%M')}",
+                    body=f"Hola {first_name} {last_name}, le recordamos su cita médica "
+                         f"({'mañana' if reminder.kind == '24h' else 'en una hora'}).",
+                    kind=f"appointment_reminder_{reminder.kind}",
+                    data={"appointment_id": reminder.appointment_id, "doctor_id": doctor_id}
+                ))
+                reminder.status = "sent"
+                reminder.sent_at = datetime.now(timezone.utc)
+                metrics.increment("reminders_sent_total", labels=labels)
+                metrics.observe("reminder_dispatch_lag_seconds", (now - reminder.due_at).total_seconds(), labels)
+            except Exception as e:
+                reminder.attempts += 1
+                reminder.last_error = str(e)
+                if reminder.attempts >= REMINDER_MAX_ATTEMPTS:
+                    reminder.status = "failed"
+                else:
+                    # Reintentar más tarde en vez de volver a tomarlo en el siguiente lote
+                    reminder.due_at = now + timedelta(minutes=5 * reminder.attempts)
+                metrics.increment("reminders_failed_total", labels=labels)
+                print(f"❌ REMINDER_SERVICE: Error enviando recordatorio {reminder.id}: {e}")
+
+        self.db.commit()
+        return len(rows)
+
+
+@task("reminders.dispatch", priority=50, max_attempts=1, every_seconds=60)
+def dispatch_reminders(db: Session, payload: dict):
+    """Tarea periódica: despachar los recordatorios vencidos por lotes"""
+    service = ReminderService(db)
+    processed = 0
+    for _ in range(REMINDER_MAX_BATCHES_PER_RUN):
+        batch = service.dispatch_due()
+        processed += batch
+        if batch < REMINDER_BATCH_SIZE:
+            break
+    if processed:
+        print(f"📨 REMINDER_SERVICE: {processed} recordatorios procesados")
@@ -1,7 +1,20 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred, query_expression
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.core.compression import CompressedText
+
+# Configuración de búsqueda en español (stemming y stopwords)
+SEARCH_CONFIG = "spanish"
+# Diagnóstico con más peso que síntomas y medicación en el ranking
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('spanish'::regconfig, coalesce(diagnosis, '')), 'A') || "
+    "setweight(to_tsvector('spanish'::regconfig, coalesce(symptoms, '')), 'B') || "
+    "setweight(to_tsvector('spanish'::regconfig, coalesce(medication, '')), 'C')"
+)
+# Columnas guardadas con CompressedText (bytea con TEXT_COMPRESSION=zstd)
+COMPRESSED_FIELDS = ("treatment", "notes")
 
 class MedicalHistory(Base):
     __tablename__ = "medical_history"
@@ -11,13 +24,29 @@ class MedicalHistory(Base):
     id_doctor = Column(Integer, ForeignKey("user.id_user"), nullable=False)
     id_appointment = Column(Integer, ForeignKey("appointment.id"), nullable=False)
     diagnosis = Column(Text, nullable=False)
-    treatment = Column(Text, nullable=False)
+    # Textos largos que no alimentan search_vector: comprimibles con TEXT_COMPRESSION=zstd
+    treatment = Column(CompressedText(), nullable=False)
     medication = Column(Text, nullable=True)
     symptoms = Column(Text, nullable=False)
-    notes = Column(Text, nullable=True)
+    notes = Column(CompressedText(), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     deleted_at = Column(DateTime(timezone=True), nullable=True)
+    # Columna generada por PostgreSQL para la búsqueda de texto; no se carga con el historial
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)))
+
+    # Vistas previas de los textos clínicos: solo se calculan si la consulta usa with_expression()
+    diagnosis_preview = query_expression()
+    treatment_preview = query_expression()
+    medication_preview = query_expression()
+    symptoms_preview = query_expression()
+    notes_preview = query_expression()
+
+    __table_args__ = (
+        Index("ix_medical_history_search", "search_vector", postgresql_using="gin",
+              postgresql_where=deleted_at.is_(None)),
+        Index("ix_medical_history_appointment_active", "id_appointment", postgresql_where=deleted_at.is_(None)),
+    )
     
     # Relaciones
     patient = relationship("User", foreign_keys=[id_patient], back_populates="medical_histories_as_patient")
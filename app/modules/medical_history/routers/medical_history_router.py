@@ -1,25 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from app.core.dependencies import get_db, verify_jwt_auth
-from app.modules.medical_history.services.medical_history_service import MedicalHistoryService
+from app.core.idempotency import IdempotencyService, get_idempotency_key
+from app.core.http_cache import PRIVATE_REVALIDATE, conditional_response, make_etag
+from app.core.responses import FastJSONResponse
+from app.modules.medical_history.services.medical_history_service import (
+    MedicalHistoryService, SUMMARY_FIELDS, parse_fields, serialize_projection
+)
+from app.modules.medical_history.services.medical_history_search import (
+    InvalidSearchCursor, MedicalHistorySearchService, SearchSort
+)
 from app.modules.medical_history.schemas.medical_history_dto import (
     MedicalHistoryCreate, 
     MedicalHistoryUpdate, 
-    MedicalHistoryResponse
+    MedicalHistoryResponse,
+    MedicalHistorySearchResponse,
+    MedicalHistoryView
 )
 
 router = APIRouter(prefix="/medical-history", tags=["medical-history"])
 
+VIEW_QUERY = Query(MedicalHistoryView.FULL, description="full (textos completos) o summary (vistas previas)")
+FIELDS_QUERY = Query(None, description="Campos a devolver separados por coma (p. ej. id_medical_history,diagnosis_preview,created_at)")
+
+def _projection_fields(view: MedicalHistoryView, fields: Optional[str]) -> Optional[List[str]]:
+    """Campos de la proyección pedida, o None para la respuesta completa. ?fields= tiene prioridad sobre view"""
+    selected = parse_fields(fields)
+    if selected is None and view == MedicalHistoryView.SUMMARY:
+        return list(SUMMARY_FIELDS)
+    return selected
+
 @router.post("/create-medical-history", response_model=MedicalHistoryResponse)
 async def create_medical_history(
     medical_data: MedicalHistoryCreate,
     current_user: dict = Depends(verify_jwt_auth),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key)
 ):
     """
-    Crear un nuevo registro de historial médico
+    Crear un nuevo registro de historial médico.
+    Los reintentos con el mismo header Idempotency-Key repiten la respuesta original.
     """
+    idempotency = IdempotencyService(
+        idempotency_key,
+        f"medical_history:create:{current_user.get('id_user')}",
+        medical_data
+    )
+    replay = idempotency.begin()
+    if replay:
+        return replay
+
     try:
         print(f"🔍 MEDICAL_HISTORY_ROUTER: Recibida petición para crear historial médico")
         print(f"👤 Usuario actual: {current_user}")
@@ -36,20 +68,27 @@ async def create_medical_history(
         service = MedicalHistoryService(db)
         medical_history = service.create_medical_history(medical_data)
         
-        return medical_history
-        
+    except HTTPException as e:
+        idempotency.complete_or_abort(e.status_code, {"detail": e.detail})
+        raise
     except ValueError as e:
+        idempotency.complete_or_abort(status.HTTP_400_BAD_REQUEST, {"detail": str(e)})
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except Exception as e:
         print(f"❌ Error creando historial médico: {e}")
+        idempotency.abort()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error interno del servidor"
         )
 
+    # El historial ya está confirmado: a partir de aquí la clave no se libera
+    idempotency.complete_committed(status.HTTP_200_OK, MedicalHistoryResponse.model_validate(medical_history))
+    return medical_history
+
 @router.get("/appointment/{appointment_id}/exists")
 async def check_medical_history_exists(
     appointment_id: int,
@@ -75,11 +114,13 @@ async def check_medical_history_exists(
 @router.get("/appointment/{appointment_id}", response_model=MedicalHistoryResponse)
 async def get_medical_history_by_appointment(
     appointment_id: int,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(verify_jwt_auth),
     db: Session = Depends(get_db)
 ):
     """
-    Obtener historial médico por ID de cita
+    Obtener historial médico por ID de cita (admite GET condicional con ETag)
     """
     try:
         service = MedicalHistoryService(db)
@@ -93,8 +134,17 @@ async def get_medical_history_by_appointment(
 
         # Verificar permisos: doctor que lo creó, paciente de la cita, o admin
         if (current_user.get("id_role") == 3 or  # Admin
-            current_user.get("id") == medical_history.id_doctor or  # Doctor que lo creó
-            current_user.get("id") == medical_history.id_patient):  # Paciente
+            current_user.get("id_user") == medical_history.id_doctor or  # Doctor que lo creó
+            current_user.get("id_user") == medical_history.id_patient):  # Paciente
+            # El ETag se evalúa después de verificar permisos para no revelar versiones
+            last_modified = medical_history.updated_at or medical_history.created_at
+            not_modified = conditional_response(
+                request, response,
+                make_etag("medical_history", medical_history.id_medical_history, last_modified),
+                last_modified, cache_control=PRIVATE_REVALIDATE
+            )
+            if not_modified:
+                return not_modified
             return medical_history
         else:
             raise HTTPException(
@@ -111,21 +161,64 @@ async def get_medical_history_by_appointment(
             detail="Error interno del servidor"
         )
 
+@router.get("/search", response_model=MedicalHistorySearchResponse)
+async def search_medical_histories(
+    q: str = Query(..., min_length=2, max_length=200, description='Texto a buscar (admite "frase", OR y -excluir)'),
+    doctor_id: Optional[int] = Query(None, description="Filtrar por doctor"),
+    patient_id: Optional[int] = Query(None, description="Filtrar por paciente"),
+    date_from: Optional[datetime] = Query(None, description="Registrados desde (incluido)"),
+    date_to: Optional[datetime] = Query(None, description="Registrados hasta (excluido)"),
+    sort: SearchSort = Query(SearchSort.RANK, description="rank (relevancia) o date (más recientes primero)"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    current_user: dict = Depends(verify_jwt_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Búsqueda de texto completo por diagnóstico, síntomas o medicación, con resaltado
+    y paginación por cursor. Los pacientes solo encuentran sus propios historiales.
+    """
+    try:
+        # Doctores y admin buscan en todos los historiales (como en /patient/{id}); los pacientes solo en los suyos
+        if current_user.get("id_role") not in (2, 3):
+            patient_id = current_user.get("id_user")
+
+        service = MedicalHistorySearchService(db)
+        return service.search(q, doctor_id, patient_id, date_from, date_to, sort, limit, cursor)
+
+    except InvalidSearchCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        print(f"❌ Error buscando historiales médicos: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
+
 @router.get("/patient/{patient_id}", response_model=List[MedicalHistoryResponse])
 async def get_medical_histories_by_patient(
     patient_id: int,
+    view: MedicalHistoryView = VIEW_QUERY,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(verify_jwt_auth),
     db: Session = Depends(get_db)
 ):
     """
-    Obtener todos los historiales médicos de un paciente
+    Obtener todos los historiales médicos de un paciente.
+    Con view=summary o ?fields= solo se leen y devuelven los campos pedidos.
     """
     try:
         # Verificar permisos: el propio paciente, un doctor, o admin
         if (current_user.get("id_role") == 3 or  # Admin
             current_user.get("id_role") == 2 or  # Doctor
-            current_user.get("id") == patient_id):  # El propio paciente
+            current_user.get("id_user") == patient_id):  # El propio paciente
             service = MedicalHistoryService(db)
+            projection = _projection_fields(view, fields)
+            if projection:
+                return FastJSONResponse(service.get_medical_histories_projection(projection, patient_id=patient_id))
             medical_histories = service.get_medical_histories_by_patient(patient_id)
             return medical_histories
         else:
@@ -136,6 +229,11 @@ async def get_medical_histories_by_patient(
             
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         print(f"❌ Error obteniendo historiales del paciente: {e}")
         raise HTTPException(
@@ -146,17 +244,23 @@ async def get_medical_histories_by_patient(
 @router.get("/doctor/{doctor_id}", response_model=List[MedicalHistoryResponse])
 async def get_medical_histories_by_doctor(
     doctor_id: int,
+    view: MedicalHistoryView = VIEW_QUERY,
+    fields: Optional[str] = FIELDS_QUERY,
     current_user: dict = Depends(verify_jwt_auth),
     db: Session = Depends(get_db)
 ):
     """
-    Obtener todos los historiales médicos creados por un doctor
+    Obtener todos los historiales médicos creados por un doctor.
+    Con view=summary o ?fields= solo se leen y devuelven los campos pedidos.
     """
     try:
         # Verificar permisos: el propio doctor o admin
         if (current_user.get("id_role") == 3 or  # Admin
-            current_user.get("id") == doctor_id):  # El propio doctor
+            current_user.get("id_user") == doctor_id):  # El propio doctor
             service = MedicalHistoryService(db)
+            projection = _projection_fields(view, fields)
+            if projection:
+                return FastJSONResponse(service.get_medical_histories_projection(projection, doctor_id=doctor_id))
             medical_histories = service.get_medical_histories_by_doctor(doctor_id)
             return medical_histories
         else:
@@ -167,6 +271,11 @@ async def get_medical_histories_by_doctor(
             
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         print(f"❌ Error obteniendo historiales del doctor: {e}")
         raise HTTPException(
@@ -196,7 +305,7 @@ async def update_medical_history(
         medical_history = service.update_medical_history(
             history_id, 
             update_data, 
-            current_user.get("id")
+            current_user.get("id_user")
         )
         
         if not medical_history:
@@ -239,7 +348,7 @@ async def delete_medical_history(
             )
 
         service = MedicalHistoryService(db)
-        success = service.delete_medical_history(history_id, current_user.get("id"))
+        success = service.delete_medical_history(history_id, current_user.get("id_user"))
         
         if not success:
             raise HTTPException(
@@ -262,3 +371,62 @@ async def delete_medical_history(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error interno del servidor"
         )
+
+@router.get("/{history_id}", response_model=MedicalHistoryResponse)
+async def get_medical_history(
+    history_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = FIELDS_QUERY,
+    current_user: dict = Depends(verify_jwt_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtener un historial médico por ID, completo o solo los campos pedidos
+    (p. ej. ?fields=notes para cargar un texto largo a demanda desde la vista resumida)
+    """
+    try:
+        selected = parse_fields(fields)
+        service = MedicalHistoryService(db)
+        medical_history = service.get_medical_history_by_id(history_id, selected)
+
+        if not medical_history:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Historial médico no encontrado"
+            )
+
+        # Verificar permisos: mismo criterio que /patient/{patient_id} (admin, cualquier doctor o el propio paciente)
+        if not (current_user.get("id_role") in (2, 3) or
+                current_user.get("id_user") == medical_history.id_patient):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tienes permisos para ver este historial médico"
+            )
+
+        if selected:
+            return FastJSONResponse(serialize_projection(medical_history, selected))
+
+        last_modified = medical_history.updated_at or medical_history.created_at
+        not_modified = conditional_response(
+            request, response,
+            make_etag("medical_history", medical_history.id_medical_history, last_modified),
+            last_modified, cache_control=PRIVATE_REVALIDATE
+        )
+        if not_modified:
+            return not_modified
+        return medical_history
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        print(f"❌ Error obteniendo historial médico {history_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
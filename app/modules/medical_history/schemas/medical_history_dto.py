@@ -1,6 +1,11 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
+from enum import Enum
+
+class MedicalHistoryView(str, Enum):
+    FULL = "full"
+    SUMMARY = "summary"
 
 class MedicalHistoryCreate(BaseModel):
     id_patient: int
@@ -35,3 +40,21 @@ class MedicalHistoryResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class MedicalHistorySearchHit(BaseModel):
+    id_medical_history: int
+    id_patient: int
+    id_doctor: int
+    id_appointment: int
+    patient_name: str
+    created_at: datetime
+    rank: float
+    # HTML seguro: texto escapado y términos encontrados entre <mark></mark>
+    diagnosis_highlight: str
+    symptoms_highlight: str
+    medication_highlight: Optional[str] = None
+
+class MedicalHistorySearchResponse(BaseModel):
+    results: List[MedicalHistorySearchHit]
+    next_cursor: Optional[str] = None
+    has_more: bool
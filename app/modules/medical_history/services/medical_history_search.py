@@ -0,0 +1,183 @@
+"""
+Búsqueda de texto completo en historiales médicos.
+
+Usa la columna generada search_vector (configuración spanish, diagnóstico con más peso
+que síntomas y medicación) y su índice GIN parcial de historiales activos. Los resultados
+se ordenan por relevancia (ts_rank_cd) o por fecha, con paginación por cursor (keyset):
+cada página continúa desde la última posición (orden, id) sin OFFSET.
+
+Los fragmentos resaltados (ts_headline) solo se calculan para las filas de la página,
+no para todas las coincidencias. ts_headline marca los términos con delimitadores centinela
+y el texto clínico se escapa como HTML antes de convertirlos en <mark></mark>.
+"""
+import base64
+import html
+import json
+import time
+from datetime import datetime
+from enum import Enum
+from typing import Optional, Tuple, Union
+
+from sqlalchemy import REAL, cast, func, literal, literal_column, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.metrics import metrics
+from app.modules.auth.models.user import User
+from app.modules.medical_history.models.medical_history import MedicalHistory, SEARCH_CONFIG
+from app.modules.medical_history.schemas.medical_history_dto import MedicalHistorySearchHit, MedicalHistorySearchResponse
+
+MAX_SEARCH_LIMIT = 100
+# Caracteres de control como delimitadores (se quitan del texto antes del resaltado) que sobreviven al escape
+HIGHLIGHT_START, HIGHLIGHT_STOP = "\x02", "\x03"
+HEADLINE_OPTIONS = (
+    f'StartSel="{HIGHLIGHT_START}", StopSel="{HIGHLIGHT_STOP}", '
+    "MaxFragments=2, MaxWords=20, MinWords=5, FragmentDelimiter= … "
+)
+
+_config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+
+
+def _headline(column, tsquery):
+    """ts_headline sobre el texto sin los caracteres centinela, para que solo marquen coincidencias"""
+    text = func.translate(column, HIGHLIGHT_START + HIGHLIGHT_STOP, "")
+    return func.ts_headline(_config, text, tsquery, HEADLINE_OPTIONS)
+
+
+def render_highlight(fragment: Optional[str]) -> Optional[str]:
+    """Escapar el fragmento como HTML y cambiar los delimitadores centinela por <mark></mark>"""
+    if fragment is None:
+        return None
+    return html.escape(fragment).replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_STOP, "</mark>")
+
+
+class SearchSort(str, Enum):
+    RANK = "rank"
+    DATE = "date"
+
+
+class InvalidSearchCursor(ValueError):
+    """El cursor de búsqueda no es válido"""
+
+
+def encode_search_cursor(sort: SearchSort, value: Union[float, datetime], history_id: int) -> str:
+    raw = json.dumps({
+        "s": sort.value,
+        "v": value.isoformat() if isinstance(value, datetime) else value,
+        "i": history_id
+    }, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str, sort: SearchSort) -> Tuple[Union[float, datetime], int]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode((cursor + "=" * (-len(cursor) % 4)).encode()))
+        if data["s"] != sort.value:
+            raise ValueError("orden distinto")
+        value = datetime.fromisoformat(data["v"]) if sort == SearchSort.DATE else float(data["v"])
+        return value, int(data["i"])
+    except Exception:
+        raise InvalidSearchCursor("Cursor de búsqueda inválido")
+
+
+class MedicalHistorySearchService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def search(
+        self,
+        text: str,
+        doctor_id: Optional[int] = None,
+        patient_id: Optional[int] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        sort: SearchSort = SearchSort.RANK,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> MedicalHistorySearchResponse:
+        """
+        Buscar historiales activos por diagnóstico, síntomas o medicación.
+        Admite la sintaxis de websearch: "frase exacta", OR, -excluir.
+
+        Raises:
+            InvalidSearchCursor: Si el cursor no corresponde a esta búsqueda
+        """
+        started = time.monotonic()
+        limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+        tsquery = func.websearch_to_tsquery(_config, text)
+        rank = func.ts_rank_cd(MedicalHistory.search_vector, tsquery)
+        sort_column = rank if sort == SearchSort.RANK else MedicalHistory.created_at
+
+        # 1. Página de ids con su orden (usa el índice GIN; no lee los textos)
+        page_query = select(
+            MedicalHistory.id_medical_history.label("id"),
+            rank.label("rank"),
+            MedicalHistory.created_at.label("created_at")
+        ).where(
+            MedicalHistory.search_vector.op("@@")(tsquery),
+            MedicalHistory.deleted_at.is_(None)
+        )
+        if doctor_id is not None:
+            page_query = page_query.where(MedicalHistory.id_doctor == doctor_id)
+        if patient_id is not None:
+            page_query = page_query.where(MedicalHistory.id_patient == patient_id)
+        if date_from is not None:
+            page_query = page_query.where(MedicalHistory.created_at >= date_from)
+        if date_to is not None:
+            page_query = page_query.where(MedicalHistory.created_at < date_to)
+        if cursor:
+            after_value, after_id = decode_search_cursor(cursor, sort)
+            if sort == SearchSort.RANK:
+                # ts_rank_cd es real: comparar como real para que los empates coincidan exactamente
+                after_value = cast(literal(after_value), REAL)
+            page_query = page_query.where(tuple_(sort_column, MedicalHistory.id_medical_history) < tuple_(after_value, after_id))
+        page = page_query.order_by(
+            sort_column.desc(), MedicalHistory.id_medical_history.desc()
+        ).limit(limit + 1).subquery()
+
+        # 2. Fragmentos resaltados y nombre del paciente solo para las filas de la página
+        rows = self.db.execute(
+            select(
+                page.c.id,
+                page.c.rank,
+                page.c.created_at,
+                MedicalHistory.id_patient,
+                MedicalHistory.id_doctor,
+                MedicalHistory.id_appointment,
+                User.firstName,
+                User.lastName,
+                _headline(MedicalHistory.diagnosis, tsquery).label("diagnosis_highlight"),
+                _headline(MedicalHistory.symptoms, tsquery).label("symptoms_highlight"),
+                _headline(MedicalHistory.medication, tsquery).label("medication_highlight")
+            )
+            .join(MedicalHistory, MedicalHistory.id_medical_history == page.c.id)
+            .join(User, User.id_user == MedicalHistory.id_patient)
+            .order_by((page.c.rank if sort == SearchSort.RANK else page.c.created_at).desc(), page.c.id.desc())
+        ).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        results = [
+            MedicalHistorySearchHit(
+                id_medical_history=row.id,
+                id_patient=row.id_patient,
+                id_doctor=row.id_doctor,
+                id_appointment=row.id_appointment,
+                patient_name=f"{row.firstName} {row.lastName}",
+                created_at=row.created_at,
+                rank=row.rank,
+                diagnosis_highlight=render_highlight(row.diagnosis_highlight),
+                symptoms_highlight=render_highlight(row.symptoms_highlight),
+                medication_highlight=render_highlight(row.medication_highlight)
+            )
+            for row in rows
+        ]
+
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            next_cursor = encode_search_cursor(sort, last.rank if sort == SearchSort.RANK else last.created_at, last.id)
+
+        elapsed = time.monotonic() - started
+        metrics.observe("medical_history_search_seconds", elapsed)
+        print(f"🔎 MEDICAL_HISTORY_SEARCH: {len(results)} resultados para {text!r} en {elapsed * 1000:.0f} ms")
+        return MedicalHistorySearchResponse(results=results, next_cursor=next_cursor, has_more=has_more)
@@ -1,11 +1,99 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.orm import Session, load_only, with_expression
+from sqlalchemy import and_, func
 from datetime import datetime
-from typing import List, Optional
-from app.modules.medical_history.models.medical_history import MedicalHistory
+from typing import Any, Dict, List, Optional, Tuple
+import os
+from app.core.compression import COMPRESSION_ENABLED
+from app.modules.medical_history.models.medical_history import MedicalHistory, COMPRESSED_FIELDS
 from app.modules.medical_history.schemas.medical_history_dto import MedicalHistoryCreate, MedicalHistoryUpdate
 from app.modules.auth.models.user import User
 from app.modules.citas.models.cita import Appointment
+from app.modules.schedules.services.availability_cache import invalidate_availability
+from app.modules.citas.services.appointment_events import record_appointment_events
+from app.core.outbox import record_event
+
+MEDICAL_HISTORY_AGGREGATE = "medical_history"
+# Caracteres de los textos clínicos en las vistas resumidas (el texto completo se pide por registro)
+PREVIEW_LENGTH = int(os.getenv("MEDICAL_HISTORY_PREVIEW_LENGTH", "200"))
+
+# Campos que se pueden pedir con ?fields=
+BASE_FIELDS = ("id_medical_history", "id_patient", "id_doctor", "id_appointment", "created_at", "updated_at", "deleted_at")
+TEXT_FIELDS = ("diagnosis", "treatment", "medication", "symptoms", "notes")
+PREVIEW_FIELDS = tuple(f"{field}_preview" for field in TEXT_FIELDS)
+SELECTABLE_FIELDS = BASE_FIELDS + TEXT_FIELDS + PREVIEW_FIELDS
+# view=summary: metadatos y vistas previas, sin los textos completos
+SUMMARY_FIELDS = BASE_FIELDS + PREVIEW_FIELDS
+
+def text_preview(value: Optional[str]) -> Tuple[Optional[str], bool]:
+    """Recortar un texto leído con PREVIEW_LENGTH + 1 caracteres; indica si había más"""
+    if value is None or len(value) <= PREVIEW_LENGTH:
+        return value, False
+    return value[:PREVIEW_LENGTH], True
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Interpretar ?fields=a,b,c (None si no se pidió una selección)
+
+    Raises:
+        ValueError: Si algún campo no existe
+    """
+    if not fields:
+        return None
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in SELECTABLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(unknown)}. Disponibles: {', '.join(SELECTABLE_FIELDS)}")
+    if "id_medical_history" not in selected:
+        selected.insert(0, "id_medical_history")
+    return list(dict.fromkeys(selected))
+
+def _preview_in_python(source: str) -> bool:
+    return COMPRESSION_ENABLED and source in COMPRESSED_FIELDS
+
+def projection_options(fields: List[str]) -> list:
+    """
+    Opciones de carga para una proyección: solo las columnas pedidas (las demás quedan
+    diferidas y con raiseload, así un acceso accidental falla en vez de hacer otra consulta)
+    y las vistas previas calculadas en SQL con left(). Las columnas comprimidas no se
+    pueden recortar en SQL: se carga el texto y la vista previa se recorta al serializar.
+    """
+    columns = [getattr(MedicalHistory, field) for field in fields if field in BASE_FIELDS or field in TEXT_FIELDS]
+    expressions = []
+    for field in fields:
+        if field in PREVIEW_FIELDS:
+            source = field[:-len("_preview")]
+            if _preview_in_python(source):
+                columns.append(getattr(MedicalHistory, source))
+            else:
+                expressions.append(with_expression(getattr(MedicalHistory, field), func.left(getattr(MedicalHistory, source), PREVIEW_LENGTH + 1)))
+    return [load_only(*columns, raiseload=True)] + expressions
+
+def serialize_projection(medical_history: MedicalHistory, fields: List[str]) -> Dict[str, Any]:
+    """Dict con los campos pedidos; truncated_fields lista los textos recortados en la vista previa"""
+    data = {}
+    truncated = []
+    for field in fields:
+        if field in PREVIEW_FIELDS and _preview_in_python(field[:-len("_preview")]):
+            value = getattr(medical_history, field[:-len("_preview")])
+        else:
+            value = getattr(medical_history, field)
+        if field in PREVIEW_FIELDS:
+            value, cut = text_preview(value)
+            if cut:
+                truncated.append(field[:-len("_preview")])
+        data[field] = value
+    if any(field in PREVIEW_FIELDS for field in fields):
+        data["truncated_fields"] = truncated
+    return data
+
+def medical_history_payload(medical_history: MedicalHistory) -> dict:
+    """Referencias del historial guardadas con el evento (sin el contenido clínico)"""
+    return {
+        "id": medical_history.id_medical_history,
+        "patient_id": medical_history.id_patient,
+        "doctor_id": medical_history.id_doctor,
+        "appointment_id": medical_history.id_appointment
+    }
 
 class MedicalHistoryService:
     def __init__(self, db: Session):
@@ -69,6 +157,12 @@ class MedicalHistoryService:
         
         # Usar update directo para asegurar que se persista
         self.db.query(Appointment).filter(Appointment.id == appointment.id).update({"status": "confirmed"})
+
+        # Eventos en la misma transacción que el historial y el cambio de estado
+        self.db.flush()
+        record_event(self.db, MEDICAL_HISTORY_AGGREGATE, new_medical_history.id_medical_history,
+                     "medical_history.created", medical_history_payload(new_medical_history))
+        record_appointment_events(self.db, "status_changed", [appointment])
         
         try:
             self.db.commit()
@@ -77,6 +171,8 @@ class MedicalHistoryService:
             # Verificar que la actualización se hizo correctamente
             updated_appointment = self.db.query(Appointment).filter(Appointment.id == appointment.id).first()
             
+            invalidate_availability(appointment.doctor_id, appointment.appointment_date.date())
+
             print(f"✅ MEDICAL_HISTORY_SERVICE: Historial médico creado con ID: {new_medical_history.id_medical_history}")
             print(f"✅ MEDICAL_HISTORY_SERVICE: Cita {appointment.id} marcada como confirmada (status: {updated_appointment.status})")
         except Exception as e:
@@ -104,6 +200,34 @@ class MedicalHistoryService:
             MedicalHistory.deleted_at.is_(None)
         ).order_by(MedicalHistory.created_at.desc()).all()
 
+    def get_medical_histories_projection(self, fields: List[str], patient_id: Optional[int] = None, doctor_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Historiales de un paciente o de un doctor con solo los campos pedidos
+        (p. ej. SUMMARY_FIELDS para la vista resumida)
+        """
+        query = self.db.query(MedicalHistory).options(*projection_options(fields)).filter(
+            MedicalHistory.deleted_at.is_(None)
+        )
+        if patient_id is not None:
+            query = query.filter(MedicalHistory.id_patient == patient_id)
+        if doctor_id is not None:
+            query = query.filter(MedicalHistory.id_doctor == doctor_id)
+        medical_histories = query.order_by(MedicalHistory.created_at.desc()).all()
+        return [serialize_projection(medical_history, fields) for medical_history in medical_histories]
+
+    def get_medical_history_by_id(self, history_id: int, fields: Optional[List[str]] = None) -> Optional[MedicalHistory]:
+        """
+        Obtener un historial activo por ID (solo los campos pedidos si se indica fields)
+        """
+        query = self.db.query(MedicalHistory)
+        if fields:
+            # id_patient e id_doctor se necesitan para verificar permisos
+            query = query.options(*projection_options(list(dict.fromkeys(fields + ["id_patient", "id_doctor"]))))
+        return query.filter(
+            MedicalHistory.id_medical_history == history_id,
+            MedicalHistory.deleted_at.is_(None)
+        ).first()
+
     def has_medical_history(self, appointment_id: int) -> bool:
         """
         Verificar si una cita ya tiene historial médico
@@ -151,6 +275,8 @@ class MedicalHistoryService:
             setattr(medical_history, field, value)
 
         medical_history.updated_at = datetime.utcnow()
+        record_event(self.db, MEDICAL_HISTORY_AGGREGATE, medical_history.id_medical_history,
+                     "medical_history.updated", {**medical_history_payload(medical_history), "fields": sorted(update_dict)})
 
         self.db.commit()
         self.db.refresh(medical_history)
@@ -173,6 +299,8 @@ class MedicalHistoryService:
             raise ValueError("No tienes permisos para eliminar este historial")
 
         medical_history.deleted_at = datetime.utcnow()
+        record_event(self.db, MEDICAL_HISTORY_AGGREGATE, medical_history.id_medical_history,
+                     "medical_history.deleted", medical_history_payload(medical_history))
         self.db.commit()
 
         return True
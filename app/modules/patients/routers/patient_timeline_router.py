@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.core.dependencies import get_db, verify_jwt_auth
+from app.modules.patients.schemas.timeline_dto import PatientTimelineResponse
+from app.modules.patients.services.timeline_service import InvalidTimelineCursor, PatientTimelineService
+
+router = APIRouter(prefix="/patients", tags=["patients"])
+
+@router.get("/{patient_id}/timeline", response_model=PatientTimelineResponse)
+def get_patient_timeline(
+    patient_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    current_user: dict = Depends(verify_jwt_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Citas del paciente con sus historiales médicos (vistas previas), más recientes primero.
+    Reemplaza las llamadas separadas a /users/{id}, /appointments/paciente/{id} y /medical-history/patient/{id}.
+    """
+    # Mismos permisos que /medical-history/patient/{id}: admin, doctores o el propio paciente
+    if current_user.get("id_role") not in (2, 3) and current_user.get("id_user") != patient_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tienes permisos para ver la historia de este paciente"
+        )
+
+    try:
+        print(f"🚀 ENDPOINT: /patients/{patient_id}/timeline - limit={limit}")
+        timeline = PatientTimelineService(db).get_timeline(patient_id, limit, cursor)
+    except InvalidTimelineCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        print(f"❌ ENDPOINT: Error obteniendo la línea de tiempo del paciente {patient_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
+
+    if timeline is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Paciente no encontrado")
+    return timeline
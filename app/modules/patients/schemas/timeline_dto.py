@@ -0,0 +1,35 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class TimelinePatient(BaseModel):
+    id_user: int
+    firstName: str
+    lastName: str
+    identification: str
+    phone: Optional[str] = None
+
+class TimelineMedicalHistory(BaseModel):
+    id_medical_history: int
+    id_doctor: int
+    created_at: datetime
+    # Vistas previas; el texto completo está en GET /medical-history/appointment/{appointment_id}
+    diagnosis_preview: str
+    symptoms_preview: str
+    medication_preview: Optional[str] = None
+    truncated: bool
+
+class TimelineEntry(BaseModel):
+    appointment_id: int
+    appointment_date: datetime
+    status: Optional[str] = None
+    reason: Optional[str] = None
+    doctor_id: int
+    doctor_name: str
+    medical_history: Optional[TimelineMedicalHistory] = None
+
+class PatientTimelineResponse(BaseModel):
+    patient: TimelinePatient
+    entries: List[TimelineEntry]
+    next_cursor: Optional[str] = None
+    has_more: bool
@@ -0,0 +1,159 @@
+"""
+Línea de tiempo del paciente: citas y sus historiales médicos en un solo flujo cronológico.
+
+Se obtiene con una sola consulta:
+
+    paciente
+      LEFT JOIN LATERAL (página de citas del paciente + doctor
+          LEFT JOIN LATERAL (historial activo de la cita, con vistas previas)) ON true
+
+Así el endpoint devuelve el paciente aunque todavía no tenga citas, y cada página lee
+solo sus filas (keyset sobre (appointment_date, id) con el índice por paciente). De los
+textos clínicos se leen solo los primeros caracteres; el texto completo se pide por registro.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import func, select, true, tuple_
+from sqlalchemy.orm import Session, aliased
+
+from app.modules.auth.models.user import User
+from app.modules.citas.models.cita import Appointment
+from app.modules.medical_history.models.medical_history import MedicalHistory
+from app.modules.medical_history.services.medical_history_service import PREVIEW_LENGTH, text_preview
+from app.modules.patients.schemas.timeline_dto import (
+    PatientTimelineResponse, TimelineEntry, TimelineMedicalHistory, TimelinePatient
+)
+
+MAX_TIMELINE_LIMIT = 100
+
+
+class InvalidTimelineCursor(ValueError):
+    """El cursor de la línea de tiempo no es válido"""
+
+
+def encode_timeline_cursor(appointment_date: datetime, appointment_id: int) -> str:
+    raw = json.dumps({"d": appointment_date.isoformat(), "i": appointment_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_timeline_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode((cursor + "=" * (-len(cursor) % 4)).encode()))
+        return datetime.fromisoformat(data["d"]), int(data["i"])
+    except Exception:
+        raise InvalidTimelineCursor("Cursor de línea de tiempo inválido")
+
+
+class PatientTimelineService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_timeline(self, patient_id: int, limit: int = 20, cursor: Optional[str] = None) -> Optional[PatientTimelineResponse]:
+        """
+        Página de la línea de tiempo (más recientes primero)
+
+        Returns:
+            Optional[PatientTimelineResponse]: None si el paciente no existe
+
+        Raises:
+            InvalidTimelineCursor: Si el cursor no es válido
+        """
+        limit = max(1, min(limit, MAX_TIMELINE_LIMIT))
+        patient = aliased(User)
+        doctor = aliased(User)
+
+        history = select(
+            MedicalHistory.id_medical_history,
+            MedicalHistory.id_doctor.label("history_doctor_id"),
+            MedicalHistory.created_at.label("history_created_at"),
+            func.left(MedicalHistory.diagnosis, PREVIEW_LENGTH + 1).label("diagnosis_preview"),
+            func.left(MedicalHistory.symptoms, PREVIEW_LENGTH + 1).label("symptoms_preview"),
+            func.left(MedicalHistory.medication, PREVIEW_LENGTH + 1).label("medication_preview")
+        ).where(
+            MedicalHistory.id_appointment == Appointment.id,
+            MedicalHistory.deleted_at.is_(None)
+        ).order_by(MedicalHistory.created_at.desc()).limit(1).lateral("history")
+
+        entries = select(
+            Appointment.id.label("appointment_id"),
+            Appointment.appointment_date,
+            Appointment.status,
+            Appointment.reason,
+            Appointment.doctor_id,
+            doctor.firstName.label("doctor_first_name"),
+            doctor.lastName.label("doctor_last_name"),
+            history
+        ).select_from(Appointment).join(
+            doctor, doctor.id_user == Appointment.doctor_id
+        ).outerjoin(history, true()).where(
+            Appointment.patient_id == patient.id_user,
+            Appointment.deleted_at.is_(None)
+        )
+        if cursor:
+            after_date, after_id = decode_timeline_cursor(cursor)
+            entries = entries.where(tuple_(Appointment.appointment_date, Appointment.id) < tuple_(after_date, after_id))
+        entries = entries.order_by(
+            Appointment.appointment_date.desc(), Appointment.id.desc()
+        ).limit(limit + 1).lateral("entries")
+
+        rows = self.db.execute(
+            select(
+                patient.id_user,
+                patient.firstName,
+                patient.lastName,
+                patient.identification,
+                patient.phone,
+                entries
+            ).select_from(patient).outerjoin(entries, true()).where(
+                patient.id_user == patient_id
+            ).order_by(entries.c.appointment_date.desc(), entries.c.appointment_id.desc())
+        ).all()
+
+        if not rows:
+            return None
+
+        first = rows[0]
+        timeline_patient = TimelinePatient(
+            id_user=first.id_user,
+            firstName=first.firstName,
+            lastName=first.lastName,
+            identification=first.identification,
+            phone=first.phone
+        )
+
+        rows = [row for row in rows if row.appointment_id is not None]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        timeline = []
+        for row in rows:
+            medical_history = None
+            if row.id_medical_history is not None:
+                diagnosis, diagnosis_cut = text_preview(row.diagnosis_preview)
+                symptoms, symptoms_cut = text_preview(row.symptoms_preview)
+                medication, medication_cut = text_preview(row.medication_preview)
+                medical_history = TimelineMedicalHistory(
+                    id_medical_history=row.id_medical_history,
+                    id_doctor=row.history_doctor_id,
+                    created_at=row.history_created_at,
+                    diagnosis_preview=diagnosis,
+                    symptoms_preview=symptoms,
+                    medication_preview=medication,
+                    truncated=diagnosis_cut or symptoms_cut or medication_cut
+                )
+            timeline.append(TimelineEntry(
+                appointment_id=row.appointment_id,
+                appointment_date=row.appointment_date,
+                status=row.status,
+                reason=row.reason,
+                doctor_id=row.doctor_id,
+                doctor_name=f"{row.doctor_first_name} {row.doctor_last_name}",
+                medical_history=medical_history
+            ))
+
+        next_cursor = encode_timeline_cursor(rows[-1].appointment_date, rows[-1].appointment_id) if has_more else None
+        print(f"📜 PATIENT_TIMELINE: {len(timeline)} entradas para el paciente {patient_id}")
+        return PatientTimelineResponse(patient=timeline_patient, entries=timeline, next_cursor=next_cursor, has_more=has_more)
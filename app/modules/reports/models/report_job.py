@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class ReportJob(Base):
+    __tablename__ = "report_job"
+
+    id = Column(Integer, primary_key=True, index=True)
+    report_type = Column(String(50), nullable=False)  # monthly_doctor
+    params = Column(Text, nullable=False)  # JSON con los parámetros del reporte
+    status = Column(String(20), nullable=False, default="pending", index=True)  # pending | running | completed | failed
+    requested_by = Column(Integer, ForeignKey("user.id_user"), nullable=True)
+    file_path = Column(String(500), nullable=True)
+    row_count = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<ReportJob(id={self.id}, type={self.report_type}, status={self.status})>"
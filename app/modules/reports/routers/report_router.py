@@ -0,0 +1,79 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from app.core.dependencies import get_db, verify_jwt_auth
+from app.modules.reports.schemas.report_dto import MonthlyDoctorReportCreate, ReportJobOut
+from app.modules.reports.services.report_service import ReportService
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def _require_admin(current_user: dict):
+    if current_user.get("id_role") != 3:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo los administradores pueden generar reportes"
+        )
+
+@router.post("/monthly-doctor", response_model=ReportJobOut, status_code=status.HTTP_202_ACCEPTED)
+def create_monthly_doctor_report(
+    report_request: MonthlyDoctorReportCreate,
+    current_user: dict = Depends(verify_jwt_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Solicitar el reporte mensual de citas y diagnósticos por doctor (.xlsx).
+    Se genera en segundo plano; consultar el estado en GET /reports/{job_id}.
+    """
+    _require_admin(current_user)
+    try:
+        print(f"🚀 ENDPOINT: POST /reports/monthly-doctor - month={report_request.month}, doctor={report_request.doctor_id}")
+        service = ReportService(db)
+        job = service.create_monthly_doctor_report(report_request, current_user.get("id_user"))
+        return service.to_out(job)
+    except Exception as e:
+        print(f"❌ ENDPOINT: Error creando reporte: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
+
+@router.get("/{job_id}", response_model=ReportJobOut)
+def get_report_status(
+    job_id: int,
+    current_user: dict = Depends(verify_jwt_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Consultar el estado de un reporte
+    """
+    _require_admin(current_user)
+    service = ReportService(db)
+    job = service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reporte no encontrado")
+    return service.to_out(job)
+
+@router.get("/{job_id}/download")
+def download_report(
+    job_id: int,
+    current_user: dict = Depends(verify_jwt_auth),
+    db: Session = Depends(get_db)
+):
+    """
+    Descargar el archivo .xlsx de un reporte terminado
+    """
+    _require_admin(current_user)
+    job = ReportService(db).get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reporte no encontrado")
+    if job.status != "completed":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"El reporte aún no está listo (estado: {job.status})")
+    if not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="El archivo del reporte ya no está disponible")
+
+    return FileResponse(job.file_path, media_type=XLSX_MEDIA_TYPE, filename=f"reporte-{job.report_type}-{job.id}.xlsx")
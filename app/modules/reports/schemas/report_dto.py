@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+class MonthlyDoctorReportCreate(BaseModel):
+    month: str = Field(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="Mes del reporte (YYYY-MM)")
+    doctor_id: Optional[int] = Field(None, description="Solo este doctor (todos si se omite)")
+
+class ReportJobOut(BaseModel):
+    id: int
+    report_type: str
+    params: str
+    status: str
+    requested_by: Optional[int] = None
+    row_count: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    download_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,161 @@
+"""
+Construcción de reportes .xlsx con openpyxl en modo write-only.
+
+Las filas se leen por bloques (yield_per) y se escriben directamente en la hoja,
+sin mantener el libro completo en memoria. El archivo se escribe primero con un
+nombre temporal y se renombra al terminar, para no servir nunca un archivo a medias.
+"""
+import os
+from datetime import date, datetime, time
+from typing import Optional, Tuple
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
+
+from app.modules.auth.models.user import User
+from app.modules.citas.models.cita import Appointment
+from app.modules.medical_history.models.medical_history import MedicalHistory
+
+REPORT_CHUNK_SIZE = int(os.getenv("REPORT_CHUNK_SIZE", "2000"))
+EXCEL_MAX_CELL_LENGTH = 32767
+SUMMARY_STATUSES = ["scheduled", "confirmed", "completed", "cancelled", "pending"]
+
+
+def month_range(month: str) -> Tuple[datetime, datetime]:
+    """Inicio (incluido) y fin (excluido) de un mes YYYY-MM"""
+    year, month_number = (int(part) for part in month.split("-"))
+    start = date(year, month_number, 1)
+    end = date(year + 1, 1, 1) if month_number == 12 else date(year, month_number + 1, 1)
+    return datetime.combine(start, time.min), datetime.combine(end, time.min)
+
+
+def _cell(value):
+    """Adaptar valores a lo que acepta Excel (sin zona horaria, sin caracteres de control)"""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.replace(tzinfo=None)
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub("", value)[:EXCEL_MAX_CELL_LENGTH]
+    return value
+
+
+def _write_rows(sheet, db: Session, query) -> int:
+    count = 0
+    for partition in db.execute(query.execution_options(yield_per=REPORT_CHUNK_SIZE)).partitions():
+        for row in partition:
+            sheet.append([_cell(value) for value in row])
+        count += len(partition)
+    return count
+
+
+def build_monthly_doctor_report(db: Session, month: str, doctor_id: Optional[int], path: str) -> int:
+    """
+    Reporte mensual por doctor: resumen por estado, detalle de citas y diagnósticos.
+
+    Returns:
+        int: Número de filas de detalle escritas (citas + diagnósticos)
+    """
+    start, end = month_range(month)
+    doctor = aliased(User)
+    patient = aliased(User)
+
+    workbook = Workbook(write_only=True)
+
+    # 1. Resumen por doctor (una consulta agregada)
+    summary = workbook.create_sheet("Resumen")
+    summary.append(["Mes", month])
+    summary.append([])
+    summary.append(["ID doctor", "Doctor", "Citas", "Pacientes únicos"]
+                   + [status.capitalize() for status in SUMMARY_STATUSES] + ["Historiales"])
+
+    histories_by_doctor = dict(db.execute(
+        select(MedicalHistory.id_doctor, func.count(MedicalHistory.id_medical_history))
+        .join(Appointment, Appointment.id == MedicalHistory.id_appointment)
+        .where(
+            MedicalHistory.deleted_at.is_(None),
+            Appointment.appointment_date >= start,
+            Appointment.appointment_date < end,
+            *([MedicalHistory.id_doctor == doctor_id] if doctor_id is not None else [])
+        )
+        .group_by(MedicalHistory.id_doctor)
+    ).all())
+
+    summary_query = select(
+        Appointment.doctor_id,
+        doctor.firstName,
+        doctor.lastName,
+        func.count(Appointment.id),
+        func.count(func.distinct(Appointment.patient_id)),
+        *[func.count(Appointment.id).filter(Appointment.status == status) for status in SUMMARY_STATUSES]
+    ).join(doctor, doctor.id_user == Appointment.doctor_id).where(
+        Appointment.deleted_at.is_(None),
+        Appointment.appointment_date >= start,
+        Appointment.appointment_date < end
+    )
+    if doctor_id is not None:
+        summary_query = summary_query.where(Appointment.doctor_id == doctor_id)
+    summary_query = summary_query.group_by(
+        Appointment.doctor_id, doctor.firstName, doctor.lastName
+    ).order_by(doctor.lastName, doctor.firstName)
+
+    for row in db.execute(summary_query):
+        doctor_row_id, first_name, last_name, total, patients, *by_status = row
+        summary.append([doctor_row_id, f"{first_name} {last_name}", total, patients]
+                       + list(by_status) + [histories_by_doctor.get(doctor_row_id, 0)])
+
+    # 2. Detalle de citas del mes
+    appointments_sheet = workbook.create_sheet("Citas")
+    appointments_sheet.append(["ID", "Fecha", "ID doctor", "Doctor", "ID paciente", "Paciente", "Estado", "Motivo"])
+    appointments_query = select(
+        Appointment.id,
+        Appointment.appointment_date,
+        Appointment.doctor_id,
+        func.concat(doctor.firstName, " ", doctor.lastName),
+        Appointment.patient_id,
+        func.concat(patient.firstName, " ", patient.lastName),
+        Appointment.status,
+        Appointment.reason
+    ).join(doctor, doctor.id_user == Appointment.doctor_id).join(
+        patient, patient.id_user == Appointment.patient_id
+    ).where(
+        Appointment.deleted_at.is_(None),
+        Appointment.appointment_date >= start,
+        Appointment.appointment_date < end
+    )
+    if doctor_id is not None:
+        appointments_query = appointments_query.where(Appointment.doctor_id == doctor_id)
+    row_count = _write_rows(appointments_sheet, db, appointments_query.order_by(Appointment.doctor_id, Appointment.appointment_date))
+
+    # 3. Diagnósticos registrados para las citas del mes
+    diagnoses_sheet = workbook.create_sheet("Diagnósticos")
+    diagnoses_sheet.append(["ID historial", "ID cita", "Fecha cita", "ID doctor", "Doctor", "ID paciente", "Paciente",
+                            "Diagnóstico", "Síntomas", "Medicación"])
+    diagnoses_query = select(
+        MedicalHistory.id_medical_history,
+        MedicalHistory.id_appointment,
+        Appointment.appointment_date,
+        MedicalHistory.id_doctor,
+        func.concat(doctor.firstName, " ", doctor.lastName),
+        MedicalHistory.id_patient,
+        func.concat(patient.firstName, " ", patient.lastName),
+        MedicalHistory.diagnosis,
+        MedicalHistory.symptoms,
+        MedicalHistory.medication
+    ).join(Appointment, Appointment.id == MedicalHistory.id_appointment).join(
+        doctor, doctor.id_user == MedicalHistory.id_doctor
+    ).join(
+        patient, patient.id_user == MedicalHistory.id_patient
+    ).where(
+        MedicalHistory.deleted_at.is_(None),
+        Appointment.appointment_date >= start,
+        Appointment.appointment_date < end
+    )
+    if doctor_id is not None:
+        diagnoses_query = diagnoses_query.where(MedicalHistory.id_doctor == doctor_id)
+    row_count += _write_rows(diagnoses_sheet, db, diagnoses_query.order_by(MedicalHistory.id_doctor, Appointment.appointment_date))
+
+    temp_path = f"{path}.tmp"
+    workbook.save(temp_path)
+    os.replace(temp_path, path)
+    return row_count
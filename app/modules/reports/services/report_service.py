@@ -0,0 +1,84 @@
+import json
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.job_queue import enqueue, task
+from app.modules.reports.models.report_job import ReportJob
+from app.modules.reports.schemas.report_dto import MonthlyDoctorReportCreate, ReportJobOut
+from app.modules.reports.services.report_builder import build_monthly_doctor_report
+
+REPORTS_DIR = os.getenv("REPORTS_DIR", os.path.join(os.getcwd(), "reports"))
+
+MONTHLY_DOCTOR_REPORT = "monthly_doctor"
+
+
+@task("reports.build", priority=300, max_attempts=1, lease_seconds=1800)
+def run_report_job(db: Session, payload: dict):
+    """Generar el archivo de un job (tarea de la cola, fuera de los workers de la API)"""
+    job_id = payload["report_job_id"]
+    job = db.query(ReportJob).filter(ReportJob.id == job_id).first()
+    # "running" también se acepta: el worker anterior pudo morir a mitad del reporte
+    if not job or job.status not in ("pending", "running"):
+        print(f"⚠️ REPORT_SERVICE: Job {job_id} no encontrado o ya procesado")
+        return
+
+    job.status = "running"
+    job.started_at = datetime.now(timezone.utc)
+    db.commit()
+    print(f"📊 REPORT_SERVICE: Generando reporte {job_id} ({job.report_type})")
+
+    try:
+        params = json.loads(job.params)
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        path = os.path.join(REPORTS_DIR, f"report-{job.id}.xlsx")
+        row_count = build_monthly_doctor_report(db, params["month"], params.get("doctor_id"), path)
+
+        job.status = "completed"
+        job.file_path = path
+        job.row_count = row_count
+        print(f"✅ REPORT_SERVICE: Reporte {job_id} generado con {row_count} filas")
+    except Exception as e:
+        db.rollback()
+        job.status = "failed"
+        job.error = str(e)
+        print(f"❌ REPORT_SERVICE: Error generando reporte {job_id}: {e}")
+
+    job.finished_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+class ReportService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_monthly_doctor_report(self, request: MonthlyDoctorReportCreate, requested_by: Optional[int]) -> ReportJob:
+        """Registrar un job de reporte mensual y encolarlo para generación en segundo plano"""
+        job = ReportJob(
+            report_type=MONTHLY_DOCTOR_REPORT,
+            params=json.dumps(request.dict(), sort_keys=True),
+            status="pending",
+            requested_by=requested_by
+        )
+        self.db.add(job)
+        self.db.flush()
+        # El trabajo de la cola se confirma junto con el job: nunca queda uno sin el otro
+        enqueue(self.db, "reports.build", {"report_job_id": job.id})
+        self.db.commit()
+        self.db.refresh(job)
+
+        print(f"✅ REPORT_SERVICE: Job {job.id} encolado")
+        return job
+
+    def get_job(self, job_id: int) -> Optional[ReportJob]:
+        """Obtener un job por ID"""
+        return self.db.query(ReportJob).filter(ReportJob.id == job_id).first()
+
+    def to_out(self, job: ReportJob) -> ReportJobOut:
+        """Estado del job con la URL de descarga cuando está listo"""
+        out = ReportJobOut.model_validate(job)
+        if job.status == "completed":
+            out.download_url = f"/reports/{job.id}/download"
+        return out
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import date
 
 from app.core.dependencies import get_db, verify_jwt_auth
+from app.core.http_cache import PUBLIC_REVALIDATE, conditional_response, make_etag
 from app.modules.schedules.services.schedule_service import ScheduleService
 from app.modules.schedules.schemas.schedule_dto import (
     DoctorScheduleCreate, DoctorScheduleOut, DoctorScheduleUpdate,
@@ -12,7 +13,7 @@ from app.modules.schedules.schemas.schedule_dto import (
 )
 from app.modules.schedules.schemas.availability_dto import (
     AvailabilityExceptionCreate, AvailabilityExceptionOut,
-    AvailableSlotsResponse
+    AvailableSlotsResponse, NextAvailableResponse
 )
 
 router = APIRouter(prefix="/schedules", tags=["schedules"])
@@ -57,15 +58,26 @@ def create_weekly_schedule(
 @router.get("/doctor/{doctor_id}", response_model=WeeklyScheduleOut)
 def get_doctor_schedule(
     doctor_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
-    Obtener horario semanal de un doctor
+    Obtener horario semanal de un doctor (admite GET condicional con ETag)
     """
     try:
         print(f"🚀 ENDPOINT: GET /schedules/doctor/{doctor_id} - Getting doctor schedule")
 
         schedule_service = ScheduleService(db)
+        count, max_id, last_modified = schedule_service.get_doctor_schedules_version(doctor_id)
+        # Solo ETag: al borrar un horario la fecha máxima puede retroceder y If-Modified-Since daría un 304 falso
+        not_modified = conditional_response(
+            request, response, make_etag("schedules", doctor_id, count, max_id, last_modified),
+            cache_control=PUBLIC_REVALIDATE
+        )
+        if not_modified:
+            return not_modified
+
         schedules = schedule_service.get_doctor_schedules(doctor_id)
 
         return WeeklyScheduleOut(
@@ -159,10 +171,12 @@ def delete_schedule(
 @router.get("/doctor/{doctor_id}/settings", response_model=DoctorSettingsOut)
 def get_doctor_settings(
     doctor_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
-    Obtener configuración de un doctor
+    Obtener configuración de un doctor (admite GET condicional con ETag)
     """
     try:
         print(f"🚀 ENDPOINT: GET /schedules/doctor/{doctor_id}/settings - Getting doctor settings")
@@ -170,6 +184,14 @@ def get_doctor_settings(
         schedule_service = ScheduleService(db)
         settings = schedule_service.get_or_create_doctor_settings(doctor_id)
 
+        last_modified = settings.updated_at or settings.created_at
+        not_modified = conditional_response(
+            request, response, make_etag("settings", settings.id, last_modified),
+            last_modified, cache_control=PUBLIC_REVALIDATE
+        )
+        if not_modified:
+            return not_modified
+
         print(f"✅ ENDPOINT: Retrieved settings for doctor {doctor_id}")
         return settings
 
@@ -341,4 +363,40 @@ def get_available_slots(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error interno del servidor"
-        )
\ No newline at end of file
+        )
+
+# ============ NEXT AVAILABLE ============
+
+@router.get("/next-available", response_model=NextAvailableResponse)
+def get_next_available_slots(
+    doctor_ids: Optional[List[int]] = Query(None, description="IDs de doctores (si se omite, todos los del rol)"),
+    role_id: int = Query(2, description="Rol de los usuarios a buscar cuando no se indican doctor_ids"),
+    start_date: Optional[date] = Query(None, description="Fecha desde la que buscar (por defecto hoy)"),
+    horizon_days: int = Query(30, ge=1, le=365, description="Días a buscar (limitado por advance_booking_days)"),
+    count: int = Query(5, ge=1, le=50, description="Número de slots a devolver"),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtener los próximos slots libres entre varios doctores, ordenados por fecha
+    """
+    try:
+        print(f"🚀 ENDPOINT: GET /schedules/next-available - doctors={doctor_ids}, role={role_id}, horizon={horizon_days}, count={count}")
+
+        schedule_service = ScheduleService(db)
+        result = schedule_service.find_next_available_slots(
+            doctor_ids=doctor_ids,
+            role_id=role_id,
+            start_date=start_date,
+            horizon_days=horizon_days,
+            count=count
+        )
+
+        print(f"✅ ENDPOINT: Found {len(result.slots)} slots across {result.searched_doctors} doctors")
+        return result
+
+    except Exception as e:
+        print(f"❌ ENDPOINT: Error searching next available slots: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
@@ -59,4 +59,14 @@ class AvailableSlotsQuery(BaseModel):
 class AvailableSlotsResponse(BaseModel):
     doctor_id: int
     date: date
-    available_slots: List[TimeSlot]
\ No newline at end of file
+    available_slots: List[TimeSlot]
+
+class NextAvailableSlot(BaseModel):
+    doctor_id: int
+    date: date
+    start_time: time
+    end_time: time
+
+class NextAvailableResponse(BaseModel):
+    searched_doctors: int
+    slots: List[NextAvailableSlot]
@@ -0,0 +1,163 @@
+"""
+Caché de disponibilidad por (doctor_id, fecha).
+
+Guarda los slots libres de un día como un bitmap sobre la grilla de slots del doctor
+(inicio de jornada, duración y paso) en lugar de la lista de TimeSlot. Se invalida
+con precisión desde ScheduleService (horarios, configuración, excepciones) y
+AppointmentService (crear, cambiar estado, borrar). La validación al reservar nunca
+usa la caché: siempre recalcula con datos frescos dentro del lock de reserva.
+
+Cada entrada lleva en su clave la generación del doctor y la del día. Quien calcula los
+slots lee la generación antes de consultar la base de datos; invalidar cambia la
+generación, así que un cálculo hecho con datos anteriores a la invalidación se guarda
+bajo una clave que ya nadie lee (no puede pisar la entrada nueva con datos viejos).
+"""
+import json
+import os
+import uuid
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+
+from app.core.cache import get_cache_backend
+from app.core.metrics import metrics
+from app.modules.schedules.schemas.availability_dto import TimeSlot
+from app.modules.schedules.services.availability_snapshot import DoctorAvailabilitySnapshot
+
+AVAILABILITY_CACHE_TTL_SECONDS = float(os.getenv("AVAILABILITY_CACHE_TTL_SECONDS", "300"))
+# Las generaciones viven más que las entradas que las usan
+GENERATION_TTL_SECONDS = AVAILABILITY_CACHE_TTL_SECONDS * 2 + 60
+
+
+def _doctor_prefix(doctor_id: int) -> str:
+    return f"availability:{doctor_id}:"
+
+
+def _day_prefix(doctor_id: int, target_date: date) -> str:
+    return f"{_doctor_prefix(doctor_id)}{target_date.isoformat()}:"
+
+
+def _cache_key(doctor_id: int, target_date: date, version: str) -> str:
+    return f"{_day_prefix(doctor_id, target_date)}{version}"
+
+
+def _generation_keys(doctor_id: int, target_date: date) -> Tuple[str, str]:
+    return f"availability_gen:{doctor_id}", f"availability_gen:{doctor_id}:{target_date.isoformat()}"
+
+
+def _new_generation() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def availability_version(doctor_id: int, target_date: date) -> str:
+    """
+    Versión vigente de la disponibilidad de un día (generación del doctor y del día).
+    Debe leerse antes de calcular los slots que se van a guardar con cache_slots().
+    """
+    backend = get_cache_backend()
+    keys = _generation_keys(doctor_id, target_date)
+    generations = backend.get_many(keys)
+    parts = []
+    for key in keys:
+        generation = generations.get(key)
+        if generation is None:
+            # Sin generación (nunca invalidada o expirada): una nueva, así no revive una entrada vieja
+            generation = _new_generation()
+            backend.set(key, generation, GENERATION_TTL_SECONDS)
+        parts.append(generation)
+    return ".".join(parts)
+
+
+def _seconds(value: time) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def _time_from_seconds(seconds: int) -> time:
+    return (datetime.min + timedelta(seconds=seconds)).time()
+
+
+def _record_lookup(hit: bool):
+    metrics.increment("availability_cache_hits_total" if hit else "availability_cache_misses_total")
+    hits = metrics.get_counter("availability_cache_hits_total")
+    misses = metrics.get_counter("availability_cache_misses_total")
+    metrics.set_gauge("availability_cache_hit_ratio", hits / (hits + misses))
+
+
+def encode_slots(snapshot: DoctorAvailabilitySnapshot, target_date: date, slots: List[TimeSlot]) -> dict:
+    """Representar los slots libres como bitmap sobre la grilla del día"""
+    work_hours = snapshot.get_work_hours(target_date)
+    if not work_hours or not slots:
+        return {"b": "0"}
+
+    work_start = _seconds(work_hours[0])
+    step = (snapshot.appointment_duration + snapshot.break_between_appointments) * 60
+    bitmap = 0
+    for slot in slots:
+        bitmap |= 1 << ((_seconds(slot.start_time) - work_start) // step)
+    return {
+        "w": work_start,
+        "d": snapshot.appointment_duration * 60,
+        "s": step,
+        "b": format(bitmap, "x"),
+    }
+
+
+def decode_slots(value: dict) -> List[TimeSlot]:
+    """Reconstruir la lista de TimeSlot desde el bitmap"""
+    bitmap = int(value["b"], 16)
+    slots = []
+    index = 0
+    while bitmap:
+        if bitmap & 1:
+            start = value["w"] + index * value["s"]
+            slots.append(TimeSlot(
+                start_time=_time_from_seconds(start),
+                end_time=_time_from_seconds(start + value["d"]),
+                is_available=True
+            ))
+        bitmap >>= 1
+        index += 1
+    return slots
+
+
+def get_cached_slots(doctor_id: int, target_date: date) -> Tuple[Optional[List[TimeSlot]], Optional[str]]:
+    """
+    Slots cacheados del día (None si no hay entrada) y la versión leída, que se pasa a
+    cache_slots() si hay que calcularlos (None si la caché no está disponible)
+    """
+    try:
+        version = availability_version(doctor_id, target_date)
+        raw = get_cache_backend().get(_cache_key(doctor_id, target_date, version))
+    except Exception as e:
+        print(f"⚠️ AVAILABILITY_CACHE: Error leyendo caché: {e}")
+        version = raw = None
+    _record_lookup(raw is not None)
+    return (decode_slots(json.loads(raw)) if raw is not None else None), version
+
+
+def cache_slots(doctor_id: int, target_date: date, version: Optional[str], snapshot: DoctorAvailabilitySnapshot, slots: List[TimeSlot]):
+    """Guardar los slots de un día calculados después de leer version (availability_version)"""
+    if version is None:
+        return
+    try:
+        get_cache_backend().set(
+            _cache_key(doctor_id, target_date, version),
+            json.dumps(encode_slots(snapshot, target_date, slots)),
+            AVAILABILITY_CACHE_TTL_SECONDS
+        )
+    except Exception as e:
+        print(f"⚠️ AVAILABILITY_CACHE: Error guardando caché: {e}")
+
+
+def invalidate_availability(doctor_id: int, target_date: Optional[date] = None):
+    """Invalidar un día concreto, o todos los días del doctor si target_date es None"""
+    backend = get_cache_backend()
+    try:
+        if target_date is None:
+            backend.set(f"availability_gen:{doctor_id}", _new_generation(), GENERATION_TTL_SECONDS)
+            backend.delete_prefix(_doctor_prefix(doctor_id))
+        else:
+            backend.set(_generation_keys(doctor_id, target_date)[1], _new_generation(), GENERATION_TTL_SECONDS)
+            backend.delete_prefix(_day_prefix(doctor_id, target_date))
+        metrics.increment("availability_cache_invalidations_total", labels={"scope": "doctor" if target_date is None else "day"})
+    except Exception as e:
+        print(f"⚠️ AVAILABILITY_CACHE: Error invalidando caché: {e}")
@@ -0,0 +1,141 @@
+from datetime import date, datetime, time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.modules.schedules.models.doctor_schedule import DoctorSchedule
+from app.modules.schedules.models.doctor_settings import DoctorSettings
+from app.modules.schedules.models.doctor_availability_exception import DoctorAvailabilityException, ExceptionType
+from app.modules.schedules.schemas.availability_dto import TimeSlot
+from app.modules.schedules.services.day_bitmap import DayBitmap, minute_of_day, time_from_minute
+
+
+def to_naive(value: datetime) -> datetime:
+    """Quitar la zona horaria para comparar fechas de forma consistente"""
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+def to_schedule_day(target_date: date) -> int:
+    """Convertir weekday de Python (0=lunes) a nuestro formato (0=domingo, 1=lunes, ..., 6=sábado)"""
+    return (target_date.weekday() + 1) % 7
+
+
+class DoctorAvailabilitySnapshot:
+    """
+    Foto en memoria de la disponibilidad de un doctor en un rango de fechas.
+
+    Se carga una sola vez (configuración, horarios, excepciones y citas) y permite
+    calcular slots y validar varias citas sin volver a consultar la base de datos.
+    Internamente cada día es un DayBitmap de minutos libres:
+    horario ∩ ¬excepciones ∩ ¬citas. Solo get_slots() construye objetos TimeSlot.
+    """
+
+    def __init__(
+        self,
+        doctor_id: int,
+        settings: DoctorSettings,
+        schedules: Iterable[DoctorSchedule],
+        exceptions: Iterable[DoctorAvailabilityException],
+        appointment_dates: Iterable[datetime],
+    ):
+        self.doctor_id = doctor_id
+        self.appointment_duration = settings.appointment_duration
+        self.break_between_appointments = settings.break_between_appointments
+
+        # Primer horario activo por día de la semana
+        self.schedules_by_day: Dict[int, DoctorSchedule] = {}
+        for schedule in schedules:
+            self.schedules_by_day.setdefault(schedule.day_of_week, schedule)
+
+        # Primera excepción por fecha
+        self.exceptions_by_date: Dict[date, DoctorAvailabilityException] = {}
+        for exception in exceptions:
+            self.exceptions_by_date.setdefault(exception.exception_date, exception)
+
+        # Minutos ocupados por citas, agrupados por fecha
+        self.occupied_by_date: Dict[date, DayBitmap] = {}
+        for appointment_date in appointment_dates:
+            self.reserve(appointment_date)
+
+    def get_work_hours(self, target_date: date) -> Optional[Tuple[time, time]]:
+        """Obtener el horario de trabajo efectivo del día (None si no trabaja o está bloqueado)"""
+        base_schedule = self.schedules_by_day.get(to_schedule_day(target_date))
+        if not base_schedule:
+            return None
+
+        day_exception = self.exceptions_by_date.get(target_date)
+        if day_exception and day_exception.exception_type == ExceptionType.BLOCKED \
+                and not (day_exception.start_time and day_exception.end_time):
+            return None
+
+        if day_exception and day_exception.exception_type == ExceptionType.CUSTOM_HOURS:
+            return (
+                day_exception.start_time or base_schedule.start_time,
+                day_exception.end_time or base_schedule.end_time,
+            )
+        return base_schedule.start_time, base_schedule.end_time
+
+    def get_day_bitmap(self, target_date: date) -> DayBitmap:
+        """Minutos libres del día: horario ∩ ¬bloqueos ∩ ¬citas"""
+        work_hours = self.get_work_hours(target_date)
+        if not work_hours:
+            return DayBitmap()
+
+        free = DayBitmap.from_range(minute_of_day(work_hours[0]), minute_of_day(work_hours[1]))
+
+        # Bloqueo parcial: excepción BLOCKED con rango horario
+        day_exception = self.exceptions_by_date.get(target_date)
+        if day_exception and day_exception.exception_type == ExceptionType.BLOCKED:
+            free = free - DayBitmap.from_range(
+                minute_of_day(day_exception.start_time), minute_of_day(day_exception.end_time)
+            )
+
+        occupied = self.occupied_by_date.get(target_date)
+        return free - occupied if occupied else free
+
+    def get_free_slot_starts(self, target_date: date) -> List[int]:
+        """Minutos de inicio de los slots libres de la grilla del día"""
+        work_hours = self.get_work_hours(target_date)
+        if not work_hours:
+            return []
+
+        return list(self.get_day_bitmap(target_date).iter_slot_starts(
+            minute_of_day(work_hours[0]),
+            minute_of_day(work_hours[1]),
+            self.appointment_duration,
+            self.appointment_duration + self.break_between_appointments
+        ))
+
+    def get_slots(self, target_date: date) -> List[TimeSlot]:
+        """Calcular los slots disponibles de una fecha en el formato de la API"""
+        return [
+            TimeSlot(
+                start_time=time_from_minute(start),
+                end_time=time_from_minute(start + self.appointment_duration),
+                is_available=True
+            )
+            for start in self.get_free_slot_starts(target_date)
+        ]
+
+    def is_slot_available(self, appointment_datetime: datetime, duration_minutes: int = None) -> bool:
+        """Verificar si la cita comienza exactamente en un slot libre con duración suficiente"""
+        if duration_minutes is None:
+            duration_minutes = self.appointment_duration
+
+        appointment_naive = to_naive(appointment_datetime)
+        if appointment_naive.second or appointment_naive.microsecond:
+            return False
+        if duration_minutes > self.appointment_duration:
+            return False
+
+        return minute_of_day(appointment_naive.time()) in self.get_free_slot_starts(appointment_naive.date())
+
+    def reserve(self, appointment_datetime: datetime):
+        """Marcar como ocupados los minutos de una cita (existente o recién aceptada)"""
+        start = to_naive(appointment_datetime)
+        start_minute = minute_of_day(start.time())
+        # Una cita que no empieza en minuto exacto ocupa también el minuto parcial final
+        end_minute = start_minute + self.appointment_duration + (1 if start.second or start.microsecond else 0)
+
+        occupied = self.occupied_by_date.get(start.date())
+        if occupied is None:
+            occupied = self.occupied_by_date[start.date()] = DayBitmap()
+        occupied.add_range(start_minute, end_minute)
@@ -0,0 +1,90 @@
+"""
+Representación compacta de un día a resolución de minuto.
+
+Cada día se guarda como un bitset de 1440 bits sobre un int de Python (bit i = minuto i).
+Las operaciones de conjunto (horario ∩ ¬excepciones ∩ ¬citas) son operaciones de bits
+sobre un solo entero, sin crear listas de rangos ni objetos por slot.
+"""
+from datetime import datetime, time, timedelta
+from typing import Iterator
+
+MINUTES_PER_DAY = 24 * 60
+FULL_DAY_MASK = (1 << MINUTES_PER_DAY) - 1
+
+
+def minute_of_day(value: time) -> int:
+    """Minuto del día (0-1439) de una hora"""
+    return value.hour * 60 + value.minute
+
+
+def time_from_minute(minute: int) -> time:
+    """Hora correspondiente a un minuto del día (1440 se convierte en 00:00)"""
+    return (datetime.min + timedelta(minutes=minute)).time()
+
+
+def range_mask(start_minute: int, end_minute: int) -> int:
+    """Máscara con los bits [start_minute, end_minute) encendidos, recortada al día"""
+    start_minute = max(start_minute, 0)
+    end_minute = min(end_minute, MINUTES_PER_DAY)
+    if end_minute <= start_minute:
+        return 0
+    return ((1 << (end_minute - start_minute)) - 1) << start_minute
+
+
+class DayBitmap:
+    """Conjunto de minutos de un día"""
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: int = 0):
+        self.bits = bits & FULL_DAY_MASK
+
+    @classmethod
+    def from_range(cls, start_minute: int, end_minute: int) -> "DayBitmap":
+        return cls(range_mask(start_minute, end_minute))
+
+    @classmethod
+    def full_day(cls) -> "DayBitmap":
+        return cls(FULL_DAY_MASK)
+
+    def __and__(self, other: "DayBitmap") -> "DayBitmap":
+        return DayBitmap(self.bits & other.bits)
+
+    def __or__(self, other: "DayBitmap") -> "DayBitmap":
+        return DayBitmap(self.bits | other.bits)
+
+    def __invert__(self) -> "DayBitmap":
+        return DayBitmap(~self.bits & FULL_DAY_MASK)
+
+    def __sub__(self, other: "DayBitmap") -> "DayBitmap":
+        return DayBitmap(self.bits & ~other.bits)
+
+    def __bool__(self) -> bool:
+        return self.bits != 0
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, DayBitmap) and self.bits == other.bits
+
+    def add_range(self, start_minute: int, end_minute: int):
+        """Encender los minutos [start_minute, end_minute) en el propio bitmap"""
+        self.bits |= range_mask(start_minute, end_minute)
+
+    def contains_range(self, start_minute: int, end_minute: int) -> bool:
+        """True si todos los minutos [start_minute, end_minute) están en el conjunto"""
+        mask = range_mask(start_minute, end_minute)
+        return mask != 0 and self.bits & mask == mask
+
+    def iter_slot_starts(self, grid_start: int, grid_end: int, duration: int, step: int) -> Iterator[int]:
+        """
+        Minutos de inicio de los slots de la grilla [grid_start, grid_end) con paso step
+        cuyos duration minutos están todos en el conjunto
+        """
+        slot_mask = (1 << duration) - 1
+        start = grid_start
+        while start + duration <= grid_end:
+            if (self.bits >> start) & slot_mask == slot_mask:
+                yield start
+            start += step
+
+    def count(self) -> int:
+        """Número de minutos en el conjunto"""
+        return bin(self.bits).count("1")
@@ -1,18 +1,37 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
+from sqlalchemy import and_, or_, func
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import date, datetime, time, timedelta
+import heapq
+import itertools
 
 from app.modules.schedules.models.doctor_schedule import DoctorSchedule
 from app.modules.schedules.models.doctor_settings import DoctorSettings
-from app.modules.schedules.models.doctor_availability_exception import DoctorAvailabilityException, ExceptionType
+from app.modules.schedules.models.doctor_availability_exception import DoctorAvailabilityException
 from app.modules.citas.models.cita import Appointment
+from app.modules.auth.models.user import User
+from app.modules.auth.models.user_role import UserRole
 from app.modules.schedules.schemas.schedule_dto import (
     DoctorScheduleCreate, DoctorScheduleUpdate, DoctorSettingsCreate, DoctorSettingsUpdate
 )
 from app.modules.schedules.schemas.availability_dto import (
-    AvailabilityExceptionCreate, TimeSlot, DayAvailability, AvailableSlotsResponse
+    AvailabilityExceptionCreate, DayAvailability, AvailableSlotsResponse,
+    NextAvailableSlot, NextAvailableResponse
 )
+from app.modules.schedules.services.availability_snapshot import DoctorAvailabilitySnapshot, to_naive
+from app.modules.schedules.services.availability_cache import (
+    availability_version, cache_slots, get_cached_slots, invalidate_availability
+)
+from app.modules.schedules.services.day_bitmap import time_from_minute
+from app.core.cache import get_cache_backend
+from app.core.job_queue import enqueue
+
+# Días que se cargan de una vez por doctor al buscar el próximo slot libre
+NEXT_AVAILABLE_WINDOW_DAYS = 7
+# Días de disponibilidad que se precalculan tras cambiar horarios o configuración
+CACHE_WARM_DAYS = 14
+# Estados de cita que no ocupan el slot en la agenda del doctor
+NON_BLOCKING_STATUSES = ("cancelled",)
 
 class ScheduleService:
     def __init__(self, db: Session):
@@ -27,7 +46,9 @@ class ScheduleService:
             **schedule.dict()
         )
         self.db.add(db_schedule)
+        self._enqueue_cache_warm(doctor_id)
         self.db.commit()
+        invalidate_availability(doctor_id)
         self.db.refresh(db_schedule)
         return db_schedule
 
@@ -45,7 +66,9 @@ class ScheduleService:
             self.db.add(db_schedule)
             db_schedules.append(db_schedule)
 
+        self._enqueue_cache_warm(doctor_id)
         self.db.commit()
+        invalidate_availability(doctor_id)
         for schedule in db_schedules:
             self.db.refresh(schedule)
         return db_schedules
@@ -57,6 +80,18 @@ class ScheduleService:
             DoctorSchedule.is_active == True
         ).order_by(DoctorSchedule.day_of_week).all()
 
+    def get_doctor_schedules_version(self, doctor_id: int) -> Tuple[int, Optional[int], Optional[datetime]]:
+        """Versión barata del horario semanal (cantidad, id máximo, última modificación) para ETags"""
+        count, max_id, last_modified = self.db.query(
+            func.count(DoctorSchedule.id),
+            func.max(DoctorSchedule.id),
+            func.max(func.coalesce(DoctorSchedule.updated_at, DoctorSchedule.created_at))
+        ).filter(
+            DoctorSchedule.doctor_id == doctor_id,
+            DoctorSchedule.is_active == True
+        ).one()
+        return count, max_id, last_modified
+
     def update_doctor_schedule(self, schedule_id: int, schedule_update: DoctorScheduleUpdate) -> Optional[DoctorSchedule]:
         """Actualizar un horario específico"""
         db_schedule = self.db.query(DoctorSchedule).filter(DoctorSchedule.id == schedule_id).first()
@@ -67,7 +102,10 @@ class ScheduleService:
         for field, value in update_data.items():
             setattr(db_schedule, field, value)
 
+        doctor_id = db_schedule.doctor_id
+        self._enqueue_cache_warm(doctor_id)
         self.db.commit()
+        invalidate_availability(doctor_id)
         self.db.refresh(db_schedule)
         return db_schedule
 
@@ -77,8 +115,11 @@ class ScheduleService:
         if not db_schedule:
             return False
 
+        doctor_id = db_schedule.doctor_id
         self.db.delete(db_schedule)
+        self._enqueue_cache_warm(doctor_id)
         self.db.commit()
+        invalidate_availability(doctor_id)
         return True
 
     # ============ DOCTOR SETTINGS ============
@@ -90,7 +131,9 @@ class ScheduleService:
             **settings.dict()
         )
         self.db.add(db_settings)
+        self._enqueue_cache_warm(doctor_id)
         self.db.commit()
+        invalidate_availability(doctor_id)
         self.db.refresh(db_settings)
         return db_settings
 
@@ -116,7 +159,9 @@ class ScheduleService:
         for field, value in update_data.items():
             setattr(db_settings, field, value)
 
+        self._enqueue_cache_warm(doctor_id)
         self.db.commit()
+        invalidate_availability(doctor_id)
         self.db.refresh(db_settings)
         return db_settings
 
@@ -130,6 +175,7 @@ class ScheduleService:
         )
         self.db.add(db_exception)
         self.db.commit()
+        invalidate_availability(doctor_id, exception.exception_date)
         self.db.refresh(db_exception)
         return db_exception
 
@@ -154,132 +200,196 @@ class ScheduleService:
         if not db_exception:
             return False
 
+        doctor_id, exception_date = db_exception.doctor_id, db_exception.exception_date
         self.db.delete(db_exception)
         self.db.commit()
+        invalidate_availability(doctor_id, exception_date)
         return True
 
     # ============ AVAILABILITY CALCULATION ============
 
-    def get_available_slots(self, doctor_id: int, target_date: date) -> AvailableSlotsResponse:
-        """Obtener slots disponibles para un doctor en una fecha específica"""
-
-        # 1. Obtener configuración del doctor
+    def load_availability_snapshot(self, doctor_id: int, start_date: date, end_date: date) -> DoctorAvailabilitySnapshot:
+        """Cargar en memoria configuración, horarios, excepciones y citas de un doctor para un rango de fechas"""
         settings = self.get_or_create_doctor_settings(doctor_id)
 
-        # 2. Verificar si el doctor trabaja ese día
-        day_of_week = target_date.weekday()  # Python: 0=lunes, 6=domingo
-        # Convertir a nuestro formato: 0=domingo, 1=lunes, ..., 6=sábado
-        day_of_week = (day_of_week + 1) % 7
-
-        # 3. Obtener horario base del día
-        base_schedule = self.db.query(DoctorSchedule).filter(
+        schedules = self.db.query(DoctorSchedule).filter(
             DoctorSchedule.doctor_id == doctor_id,
-            DoctorSchedule.day_of_week == day_of_week,
             DoctorSchedule.is_active == True
-        ).first()
+        ).order_by(DoctorSchedule.id).all()
 
-        if not base_schedule:
-            # No hay horario para este día
-            return AvailableSlotsResponse(
-                doctor_id=doctor_id,
-                date=target_date,
-                available_slots=[]
-            )
+        exceptions = self.get_doctor_exceptions(doctor_id, start_date, end_date)
 
-        # 4. Verificar excepciones para este día
-        exceptions = self.get_doctor_exceptions(doctor_id, target_date, target_date)
-        day_exception = next((e for e in exceptions if e.exception_date == target_date), None)
+        # Crear fechas de inicio y fin del rango como naive
+        range_start = datetime.combine(start_date, time.min)
+        range_end = datetime.combine(end_date + timedelta(days=1), time.min)
 
-        if day_exception and day_exception.exception_type == ExceptionType.BLOCKED:
-            # Día completamente bloqueado
-            return AvailableSlotsResponse(
-                doctor_id=doctor_id,
-                date=target_date,
-                available_slots=[]
-            )
+        appointment_dates = self._booked_appointment_dates(doctor_id, range_start, range_end)
 
-        # 5. Determinar horario de trabajo para el día
-        if day_exception and day_exception.exception_type == ExceptionType.CUSTOM_HOURS:
-            work_start = day_exception.start_time or base_schedule.start_time
-            work_end = day_exception.end_time or base_schedule.end_time
-        else:
-            work_start = base_schedule.start_time
-            work_end = base_schedule.end_time
-
-        # 6. Generar slots disponibles
-        available_slots = []
-        current_time = datetime.combine(target_date, work_start)
-        end_time = datetime.combine(target_date, work_end)
-
-        # 7. Obtener citas existentes para el día
-        # Crear fechas de inicio y fin del día como naive
-        day_start = datetime.combine(target_date, time.min)
-        day_end = datetime.combine(target_date + timedelta(days=1), time.min)
-
-        existing_appointments = self.db.query(Appointment).filter(
+        return DoctorAvailabilitySnapshot(doctor_id, settings, schedules, exceptions, appointment_dates)
+
+    def _booked_appointment_dates(self, doctor_id: int, range_start: datetime, range_end: datetime) -> List[datetime]:
+        """
+        Fechas de las citas que ocupan slot del doctor en [range_start, range_end) (usa
+        ix_appointment_doctor_date_active): ni borradas ni en NON_BLOCKING_STATUSES
+        """
+        return [row.appointment_date for row in self.db.query(Appointment.appointment_date).filter(
             Appointment.doctor_id == doctor_id,
-            Appointment.appointment_date >= day_start,
-            Appointment.appointment_date < day_end
-        ).all()
-
-        # Crear lista de rangos ocupados
-        occupied_ranges = []
-        for appointment in existing_appointments:
-            # Convertir appointment_date a naive si tiene timezone
-            start = appointment.appointment_date.replace(tzinfo=None) if appointment.appointment_date.tzinfo else appointment.appointment_date
-            end = start + timedelta(minutes=settings.appointment_duration)
-            occupied_ranges.append((start, end))
-
-        # 8. Generar slots disponibles
-        while current_time + timedelta(minutes=settings.appointment_duration) <= end_time:
-            slot_end = current_time + timedelta(minutes=settings.appointment_duration)
-
-            # Verificar si el slot está ocupado
-            is_occupied = any(
-                not (slot_end <= occupied_start or current_time >= occupied_end)
-                for occupied_start, occupied_end in occupied_ranges
-            )
+            Appointment.appointment_date >= range_start,
+            Appointment.appointment_date < range_end,
+            Appointment.deleted_at.is_(None),
+            or_(Appointment.status.is_(None), Appointment.status.notin_(NON_BLOCKING_STATUSES))
+        ).all()]
 
-            if not is_occupied:
-                available_slots.append(TimeSlot(
-                    start_time=current_time.time(),
-                    end_time=slot_end.time(),
-                    is_available=True
-                ))
+    def get_available_slots(self, doctor_id: int, target_date: date, use_cache: bool = True) -> AvailableSlotsResponse:
+        """Obtener slots disponibles para un doctor en una fecha específica"""
+        slots, version = get_cached_slots(doctor_id, target_date) if use_cache else (None, None)
 
-            # Mover al siguiente slot
-            current_time += timedelta(minutes=settings.appointment_duration + settings.break_between_appointments)
+        if slots is None:
+            # La versión se leyó antes del snapshot: si una reserva invalida mientras tanto, esto no se guarda como vigente
+            snapshot = self.load_availability_snapshot(doctor_id, target_date, target_date)
+            slots = snapshot.get_slots(target_date)
+            cache_slots(doctor_id, target_date, version, snapshot, slots)
 
         return AvailableSlotsResponse(
             doctor_id=doctor_id,
             date=target_date,
-            available_slots=available_slots
+            available_slots=slots
         )
 
+    def _enqueue_cache_warm(self, doctor_id: int):
+        """
+        Programar el precálculo de la disponibilidad del doctor (en la misma transacción del cambio).
+        Solo tiene sentido con una caché compartida: la caché en memoria del worker no la ve la API.
+        """
+        if get_cache_backend().name == "postgres":
+            enqueue(self.db, "availability.warm", {"doctor_id": doctor_id, "days": CACHE_WARM_DAYS}, delay_seconds=2)
+
+    def warm_availability_cache(self, doctor_id: int, days: int = CACHE_WARM_DAYS) -> int:
+        """Calcular y cachear los slots de los próximos días con un solo snapshot; devuelve los días cacheados"""
+        start_date = date.today()
+        end_date = start_date + timedelta(days=days - 1)
+        dates = [start_date + timedelta(days=offset) for offset in range(days)]
+        versions = {current: availability_version(doctor_id, current) for current in dates}
+        snapshot = self.load_availability_snapshot(doctor_id, start_date, end_date)
+
+        for current in dates:
+            cache_slots(doctor_id, current, versions[current], snapshot, snapshot.get_slots(current))
+        return days
+
     def is_slot_available(self, doctor_id: int, appointment_datetime: datetime, duration_minutes: int = None) -> bool:
         """Verificar si un slot específico está disponible"""
-        target_date = appointment_datetime.date()
-        target_time = appointment_datetime.time()
+        target_date = to_naive(appointment_datetime).date()
+        snapshot = self.load_availability_snapshot(doctor_id, target_date, target_date)
+        return snapshot.is_slot_available(appointment_datetime, duration_minutes)
+
+    # ============ NEXT AVAILABLE SEARCH ============
+
+    def _iter_doctor_free_slots(
+        self,
+        doctor_id: int,
+        settings: DoctorSettings,
+        schedules: List[DoctorSchedule],
+        start_date: date,
+        end_date: date,
+        not_before: datetime
+    ) -> Iterator[Tuple[datetime, int, int]]:
+        """
+        Generar en orden los slots libres de un doctor, cargando excepciones y citas
+        por ventanas de NEXT_AVAILABLE_WINDOW_DAYS días solo cuando se consumen
+        """
+        window_start = start_date
+        while window_start <= end_date:
+            window_end = min(window_start + timedelta(days=NEXT_AVAILABLE_WINDOW_DAYS - 1), end_date)
+
+            exceptions = self.get_doctor_exceptions(doctor_id, window_start, window_end)
+            appointment_dates = self._booked_appointment_dates(
+                doctor_id,
+                datetime.combine(window_start, time.min),
+                datetime.combine(window_end + timedelta(days=1), time.min)
+            )
+            snapshot = DoctorAvailabilitySnapshot(doctor_id, settings, schedules, exceptions, appointment_dates)
+
+            current = window_start
+            while current <= window_end:
+                for start_minute in snapshot.get_free_slot_starts(current):
+                    slot_start = datetime.combine(current, time_from_minute(start_minute))
+                    if slot_start >= not_before:
+                        yield slot_start, doctor_id, start_minute + settings.appointment_duration
+                current += timedelta(days=1)
+
+            window_start = window_end + timedelta(days=1)
+
+    def find_next_available_slots(
+        self,
+        doctor_ids: Optional[List[int]] = None,
+        role_id: int = 2,
+        start_date: Optional[date] = None,
+        horizon_days: int = 30,
+        count: int = 5
+    ) -> NextAvailableResponse:
+        """
+        Buscar los próximos `count` slots libres entre varios doctores.
+
+        Cada doctor produce un flujo perezoso de slots ordenados; los flujos se mezclan
+        con una cola de prioridad y la búsqueda se detiene al encontrar `count` slots,
+        sin recorrer todo el horizonte. El horizonte de cada doctor se limita a su
+        advance_booking_days.
+        """
+        now = datetime.now()
+        today = now.date()
+        start_date = max(start_date or today, today)
+
+        # 1. Resolver doctores activos (por IDs o por rol)
+        query = self.db.query(User.id_user).join(UserRole, UserRole.id_user == User.id_user).filter(
+            UserRole.id_role == role_id,
+            User.id_status == True
+        )
+        if doctor_ids:
+            query = query.filter(User.id_user.in_(doctor_ids))
+        resolved_ids = sorted({row.id_user for row in query.all()})
+
+        if not resolved_ids:
+            return NextAvailableResponse(searched_doctors=0, slots=[])
+
+        # 2. Configuración y horarios de todos los doctores en dos consultas
+        settings_by_doctor: Dict[int, DoctorSettings] = {
+            settings.doctor_id: settings
+            for settings in self.db.query(DoctorSettings).filter(DoctorSettings.doctor_id.in_(resolved_ids)).all()
+        }
+        schedules_by_doctor: Dict[int, List[DoctorSchedule]] = {}
+        for schedule in self.db.query(DoctorSchedule).filter(
+            DoctorSchedule.doctor_id.in_(resolved_ids),
+            DoctorSchedule.is_active == True
+        ).order_by(DoctorSchedule.id).all():
+            schedules_by_doctor.setdefault(schedule.doctor_id, []).append(schedule)
+
+        # 3. Un flujo perezoso por doctor con horario, acotado por su horizonte de reserva
+        streams = []
+        for doctor_id in resolved_ids:
+            schedules = schedules_by_doctor.get(doctor_id)
+            if not schedules:
+                continue
+            # Configuración por defecto en memoria para doctores sin configuración guardada
+            settings = settings_by_doctor.get(doctor_id) or DoctorSettings(
+                doctor_id=doctor_id, **DoctorSettingsCreate().dict()
+            )
+            end_date = min(
+                start_date + timedelta(days=horizon_days - 1),
+                today + timedelta(days=settings.advance_booking_days)
+            )
+            if end_date < start_date:
+                continue
+            streams.append(self._iter_doctor_free_slots(doctor_id, settings, schedules, start_date, end_date, now))
 
-        # Obtener configuración
-        settings = self.get_or_create_doctor_settings(doctor_id)
-        if duration_minutes is None:
-            duration_minutes = settings.appointment_duration
-
-        # Obtener slots disponibles para el día
-        available_response = self.get_available_slots(doctor_id, target_date)
-
-        # Verificar si el tiempo solicitado está dentro de algún slot disponible
-        for slot in available_response.available_slots:
-            # La cita debe comenzar exactamente al inicio del slot
-            if target_time == slot.start_time:
-                # Verificar que hay suficiente tiempo para la duración requerida
-                # Convertir appointment_datetime a naive (sin timezone) para comparar consistentemente
-                appointment_naive = appointment_datetime.replace(tzinfo=None) if appointment_datetime.tzinfo else appointment_datetime
-                slot_end_datetime = datetime.combine(target_date, slot.end_time)
-                required_end_datetime = appointment_naive + timedelta(minutes=duration_minutes)
-
-                if required_end_datetime <= slot_end_datetime:
-                    return True
-
-        return False
\ No newline at end of file
+        # 4. Mezcla por prioridad (fecha, doctor) y corte al llegar a `count`
+        slots = [
+            NextAvailableSlot(
+                doctor_id=doctor_id,
+                date=slot_start.date(),
+                start_time=slot_start.time(),
+                end_time=time_from_minute(end_minute)
+            )
+            for slot_start, doctor_id, end_minute in itertools.islice(heapq.merge(*streams), count)
+        ]
+
+        return NextAvailableResponse(searched_doctors=len(resolved_ids), slots=slots)
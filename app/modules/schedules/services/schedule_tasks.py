@@ -0,0 +1,12 @@
+"""Tareas en segundo plano del módulo de horarios"""
+from sqlalchemy.orm import Session
+
+from app.core.job_queue import task
+from app.modules.schedules.services.schedule_service import CACHE_WARM_DAYS, ScheduleService
+
+
+@task("availability.warm", priority=200, max_attempts=3)
+def warm_availability(db: Session, payload: dict):
+    """Precalcular la disponibilidad de un doctor tras cambiar su horario o configuración"""
+    days = ScheduleService(db).warm_availability_cache(payload["doctor_id"], payload.get("days", CACHE_WARM_DAYS))
+    print(f"🔥 SCHEDULE_TASKS: Disponibilidad del doctor {payload['doctor_id']} precalculada ({days} días)")
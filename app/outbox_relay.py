@@ -0,0 +1,49 @@
+"""
+Relay del outbox de eventos de dominio.
+
+Uso:
+    python -m app.outbox_relay
+    python -m app.outbox_relay --batch-size 500 --poll-interval 0.5
+
+Con el relay aparte, la API debe correr con OUTBOX_RELAY_IN_PROCESS=false y
+REALTIME_PG_BRIDGE=true para recibir los eventos de la agenda del día. Con varios workers,
+python -m app.server lo lanza como proceso auxiliar (OUTBOX_RELAY_SIDECAR).
+"""
+import argparse
+import os
+import signal
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Este proceso no tiene suscriptores propios: los eventos en tiempo real deben llegar a los
+# workers de la API por LISTEN/NOTIFY (antes de importar app.core.realtime, que lee la variable)
+os.environ.setdefault("REALTIME_PG_BRIDGE", "true")
+
+from app.core.database import create_tables, import_models
+from app.core.outbox import OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL_SECONDS, OutboxRelay, load_outbox_handlers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relay del outbox de eventos")
+    parser.add_argument("--batch-size", type=int, default=OUTBOX_BATCH_SIZE, help="Eventos leídos por lote")
+    parser.add_argument("--poll-interval", type=float, default=OUTBOX_POLL_INTERVAL_SECONDS, help="Segundos de espera sin eventos pendientes")
+    args = parser.parse_args()
+
+    if os.environ["REALTIME_PG_BRIDGE"].lower() != "true":
+        print("⚠️ OUTBOX_RELAY: REALTIME_PG_BRIDGE=false; los eventos de la agenda del día no llegarán a la API")
+    # Lanzado por app.server las tablas ya existen
+    import_models()
+    if os.environ.get("SCHEMA_SETUP_ON_STARTUP", "true").lower() == "true":
+        create_tables()
+    load_outbox_handlers()
+
+    relay = OutboxRelay(batch_size=args.batch_size)
+    signal.signal(signal.SIGTERM, lambda *_: relay.stop())
+    signal.signal(signal.SIGINT, lambda *_: relay.stop())
+    relay.run_forever(args.poll_interval)
+
+
+if __name__ == "__main__":
+    main()
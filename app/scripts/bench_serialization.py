@@ -0,0 +1,153 @@
+"""
+Benchmark de serialización de listados de citas.
+
+Compara, sobre N filas (10.000 por defecto), el camino actual de los endpoints
+(objetos ORM -> response_model de pydantic -> jsonable_encoder -> json) y el de la
+versión legacy (construcción de CitaOut por fila) con el camino rápido
+(dicts proyectados -> FastJSONResponse).
+
+Por defecto usa filas en memoria (no necesita base de datos); con --from-db mide
+también la consulta: hidratación ORM frente a proyección de columnas.
+
+Uso:
+    python -m app.scripts.bench_serialization --rows 10000 --repeat 5
+    python -m app.scripts.bench_serialization --from-db --doctor-id 3
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.core.responses import HAS_ORJSON, FastJSONResponse
+from app.core.database import import_models
+from app.modules.citas.models.cita import Appointment
+from app.modules.citas.schemas.cita import AppointmentOut, CitaOut
+
+STATUSES = ["scheduled", "confirmed", "completed", "pending"]
+
+
+def build_rows(count: int, seed: int) -> List[dict]:
+    """Filas sintéticas con la forma de APPOINTMENT_ROW_COLUMNS"""
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1, 8, 0)
+    rows = []
+    for index in range(1, count + 1):
+        appointment_date = base + timedelta(minutes=35 * index)
+        created_at = datetime(2024, 12, 1, tzinfo=timezone.utc) + timedelta(seconds=index)
+        rows.append({
+            "appointment_date": appointment_date,
+            "reason": rng.choice(["Control general", "Dolor de cabeza persistente", "Revisión de exámenes", None]),
+            "status": rng.choice(STATUSES),
+            "patient_id": rng.randint(100, 50_000),
+            "doctor_id": rng.randint(1, 99),
+            "id": index,
+            "created_at": created_at,
+            "deleted_at": None,
+            "updated_at": created_at,
+        })
+    return rows
+
+
+def to_legacy(row: dict) -> dict:
+    return {
+        "id_cita": row["id"], "fecha_hora": row["appointment_date"], "motivo": row["reason"],
+        "estado": row["status"], "id_paciente": row["patient_id"], "id_doctor": row["doctor_id"],
+    }
+
+
+def current_path(appointments: List[Appointment]) -> bytes:
+    # Lo que hace FastAPI 0.104 con response_model=List[AppointmentOut]
+    adapter = TypeAdapter(List[AppointmentOut])
+    validated = adapter.validate_python(appointments, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def legacy_path(appointments: List[Appointment]) -> bytes:
+    # El router legacy construye CitaOut por fila y FastAPI vuelve a validarlos
+    result = [CitaOut(
+        id_cita=appointment.id,
+        fecha_hora=appointment.appointment_date,
+        motivo=appointment.reason,
+        estado=appointment.status,
+        id_paciente=appointment.patient_id,
+        id_doctor=appointment.doctor_id
+    ) for appointment in appointments]
+    adapter = TypeAdapter(List[CitaOut])
+    validated = adapter.validate_python(result, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(rows: List[dict]) -> bytes:
+    return FastJSONResponse(rows).body
+
+
+def measure(label: str, func: Callable[[], bytes], repeat: int):
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(func())
+        timings.append(time.perf_counter() - started)
+    print(f"{label:<34} mediana {statistics.median(timings) * 1000:9.1f} ms   "
+          f"mín {min(timings) * 1000:9.1f} ms   {size / 1024:8.0f} KiB")
+
+
+def bench_in_memory(rows_count: int, repeat: int, seed: int):
+    rows = build_rows(rows_count, seed)
+    appointments = [Appointment(**row) for row in rows]
+    legacy_rows = [to_legacy(row) for row in rows]
+
+    print(f"📊 {rows_count} filas en memoria, {repeat} repeticiones (orjson: {'sí' if HAS_ORJSON else 'no'})")
+    measure("actual (ORM -> AppointmentOut)", lambda: current_path(appointments), repeat)
+    measure("legacy (ORM -> CitaOut x2)", lambda: legacy_path(appointments), repeat)
+    measure("rápido (dicts -> FastJSON)", lambda: fast_path(rows), repeat)
+    measure("rápido legacy (dicts -> FastJSON)", lambda: fast_path(legacy_rows), repeat)
+
+
+def bench_from_db(doctor_id: Optional[int], repeat: int):
+    from app.core.database import SessionLocal
+    from app.modules.citas.services.cita_service import AppointmentService
+
+    print(f"📊 Consulta + serialización desde la base de datos (doctor={doctor_id or 'todos'}), {repeat} repeticiones")
+
+    def current():
+        with SessionLocal() as db:
+            service = AppointmentService(db)
+            appointments = service.get_all_appointments() if doctor_id is None else service.get_appointments_by_doctor(doctor_id)
+            return current_path(appointments)
+
+    def fast():
+        with SessionLocal() as db:
+            return fast_path(AppointmentService(db).get_appointment_rows(doctor_id=doctor_id))
+
+    measure("actual (consulta ORM + pydantic)", current, repeat)
+    measure("rápido (proyección + FastJSON)", fast, repeat)
+
+
+def main():
+    import_models()
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de listados de citas")
+    parser.add_argument("--rows", type=int, default=10_000, help="Filas sintéticas a serializar")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por caso")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los datos sintéticos")
+    parser.add_argument("--from-db", action="store_true", help="Medir también consultando la base de datos")
+    parser.add_argument("--doctor-id", type=int, default=None, help="Doctor a consultar con --from-db")
+    args = parser.parse_args()
+
+    bench_in_memory(args.rows, args.repeat, args.seed)
+    if args.from_db:
+        bench_from_db(args.doctor_id, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark de compresión de los textos clínicos (treatment, notes).
+
+Compara, sobre N textos (20.000 por defecto), el espacio y el CPU de:
+- sin comprimir (UTF-8),
+- zstd sin diccionario a varios niveles,
+- zstd con un diccionario entrenado con otra parte de la muestra (lo que hace CompressedText).
+
+Los textos cortos son el caso típico: sin diccionario zstd apenas gana, con diccionario
+comparte el vocabulario clínico entre filas. La descompresión por texto es lo que paga
+cada lectura de la API. Para referencia, con --from-db se usa una muestra real de
+medical_history y se muestra también lo que ocupan hoy las columnas (pg_column_size,
+incluida la compresión pglz de TOAST para los valores grandes).
+
+Uso:
+    python -m app.scripts.bench_text_compression --texts 20000
+    python -m app.scripts.bench_text_compression --from-db --texts 5000
+"""
+import argparse
+import random
+import time
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.core.compression import DICTIONARY_SIZE, HEADER_SIZE, train_dictionary, zstandard
+from app.scripts.generate_synthetic_data import NOTE_SENTENCES, TREATMENT_SENTENCES
+
+LEVELS = (1, 3, 9, 19)
+
+
+def build_texts(count: int, seed: int) -> List[str]:
+    """Textos con la forma de los del generador de datos sintéticos"""
+    rng = random.Random(seed)
+    texts = []
+    for index in range(count):
+        if index % 2:
+            texts.append(" ".join(rng.choice(TREATMENT_SENTENCES) for _ in range(rng.randint(2, 6))))
+        else:
+            texts.append(" ".join(rng.choice(NOTE_SENTENCES) for _ in range(rng.randint(3, 20))))
+    return texts
+
+
+def load_texts(count: int) -> List[str]:
+    from sqlalchemy import text
+    from app.core.compression import dictionaries, decompress_text
+    from app.core.database import engine
+
+    with engine.connect() as connection:
+        dictionaries.load(connection)
+        rows = connection.execute(text(
+            "SELECT treatment, notes FROM medical_history ORDER BY random() LIMIT :limit"
+        ), {"limit": count}).all()
+    texts = []
+    for row in rows:
+        for value in row:
+            if value is not None:
+                texts.append(value if isinstance(value, str) else decompress_text(bytes(value)))
+    return texts
+
+
+def report_stored_size():
+    from sqlalchemy import text
+    from app.core.database import engine
+
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT count(*), coalesce(sum(octet_length(treatment)), 0) + coalesce(sum(octet_length(notes)), 0), "
+            "coalesce(sum(pg_column_size(treatment)), 0) + coalesce(sum(pg_column_size(notes)), 0) FROM medical_history"
+        )).one()
+    count, logical, stored = rows
+    print(f"🗄️ medical_history: {count} filas, treatment+notes {logical / 1024 / 1024:.1f} MB lógicos, "
+          f"{stored / 1024 / 1024:.1f} MB almacenados (pg_column_size)\n")
+
+
+def measure(label: str, texts: List[str], level: int, dict_data: Optional["zstandard.ZstdCompressionDict"]):
+    raw = [value.encode("utf-8") for value in texts]
+    raw_bytes = sum(len(value) for value in raw)
+    compressor = zstandard.ZstdCompressor(level=level, dict_data=dict_data, write_content_size=True)
+    decompressor = zstandard.ZstdDecompressor(dict_data=dict_data)
+
+    started = time.perf_counter()
+    compressed = [compressor.compress(value) for value in raw]
+    compress_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for value in compressed:
+        decompressor.decompress(value)
+    decompress_seconds = time.perf_counter() - started
+
+    # Igual que CompressedText: cabecera en cada valor y sin comprimir cuando no se gana espacio
+    stored = sum(HEADER_SIZE + min(len(c), len(r)) for c, r in zip(compressed, raw))
+    print(f"{label:<24}{stored / 1024:>11.0f}{stored / raw_bytes:>9.0%}"
+          f"{raw_bytes / compress_seconds / 1024 / 1024:>12.1f}{raw_bytes / decompress_seconds / 1024 / 1024:>12.1f}"
+          f"{compress_seconds / len(raw) * 1e6:>11.1f}{decompress_seconds / len(raw) * 1e6:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de compresión de textos clínicos")
+    parser.add_argument("--texts", type=int, default=20_000, help="Textos a comprimir")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los textos sintéticos")
+    parser.add_argument("--dict-size", type=int, default=DICTIONARY_SIZE, help="Tamaño del diccionario en bytes")
+    parser.add_argument("--train-ratio", type=float, default=0.2, help="Parte de la muestra usada para entrenar")
+    parser.add_argument("--from-db", action="store_true", help="Usar textos reales de medical_history")
+    args = parser.parse_args()
+
+    if zstandard is None:
+        print("❌ zstandard no está instalado (pip install zstandard)")
+        return
+
+    if args.from_db:
+        report_stored_size()
+        texts = load_texts(args.texts)
+    else:
+        texts = build_texts(args.texts, args.seed)
+    random.Random(args.seed).shuffle(texts)
+    split = max(int(len(texts) * args.train_ratio), 1)
+    training, texts = texts[:split], texts[split:]
+
+    started = time.perf_counter()
+    dict_data = zstandard.ZstdCompressionDict(train_dictionary(training, args.dict_size))
+    print(f"📚 Diccionario de {len(dict_data.as_bytes()) / 1024:.0f} KiB entrenado con {len(training)} textos "
+          f"en {time.perf_counter() - started:.1f} s")
+
+    raw_bytes = sum(len(value.encode("utf-8")) for value in texts)
+    print(f"📊 {len(texts)} textos, {raw_bytes / 1024:.0f} KiB, media {raw_bytes / len(texts):.0f} bytes\n")
+    print(f"{'Caso':<24}{'KiB':>11}{'Tasa':>9}{'Comp MB/s':>12}{'Desc MB/s':>12}{'µs comp':>11}{'µs desc':>11}")
+    print(f"{'sin comprimir':<24}{raw_bytes / 1024:>11.0f}{1:>9.0%}")
+    for level in LEVELS:
+        measure(f"zstd nivel {level}", texts, level, None)
+    for level in LEVELS:
+        measure(f"zstd+dict nivel {level}", texts, level, dict_data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Migración de los textos clínicos de medical_history (treatment, notes) a CompressedText.
+
+Orden para activar la compresión:
+    python -m app.scripts.compress_clinical_text migrate     # text -> bytea (los valores quedan como UTF-8 plano)
+    # desplegar con TEXT_COMPRESSION=zstd en todos los procesos (API, worker, relay)
+    python -m app.scripts.compress_clinical_text train --samples 5000
+    python -m app.scripts.compress_clinical_text backfill --batch-size 500 --pause 0.2
+    python -m app.scripts.compress_clinical_text status
+
+Para volver a texto plano:
+    python -m app.scripts.compress_clinical_text revert      # luego desplegar sin TEXT_COMPRESSION
+
+Entre migrate y el despliegue (o entre revert y el despliegue) los procesos con la
+configuración anterior no pueden leer esas columnas: ejecutar en una ventana de mantenimiento.
+"""
+import argparse
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import text
+
+from app.core.compression import (
+    CODEC_RAW, CODEC_ZSTD, CODEC_ZSTD_DICT, COMPRESSION_MIN_BYTES, DICTIONARY_NAME, DICTIONARY_SIZE, HEADER_SIZE, MAGIC,
+    compress_text, decompress_text, dictionaries, parse_header, train_dictionary
+)
+from app.core.database import engine, create_tables
+from app.core.models.compression_dictionary import CompressionDictionary
+from app.core.retention import vacuum_table
+from app.modules.medical_history.models.medical_history import COMPRESSED_FIELDS
+
+TABLE = "medical_history"
+ID_COLUMN = "id_medical_history"
+
+
+def column_types(connection) -> dict:
+    return dict(connection.execute(text(
+        "SELECT column_name, data_type FROM information_schema.columns "
+        "WHERE table_name = :table AND column_name = ANY(:columns)"
+    ), {"table": TABLE, "columns": list(COMPRESSED_FIELDS)}).all())
+
+
+def _as_text(value):
+    # Según el estado de la migración la columna llega como str (text) o memoryview (bytea)
+    if value is None or isinstance(value, str):
+        return value
+    return decompress_text(bytes(value))
+
+
+def migrate(args):
+    """text -> bytea sin comprimir; STORAGE EXTERNAL evita que TOAST vuelva a comprimir con pglz"""
+    with engine.begin() as connection:
+        types = column_types(connection)
+        for column in COMPRESSED_FIELDS:
+            if types.get(column) == "bytea":
+                print(f"ℹ️ {TABLE}.{column} ya es bytea")
+                continue
+            print(f"🔧 {TABLE}.{column}: text -> bytea")
+            connection.execute(text(f"ALTER TABLE {TABLE} ALTER COLUMN {column} TYPE bytea USING convert_to({column}, 'UTF8')"))
+            connection.execute(text(f"ALTER TABLE {TABLE} ALTER COLUMN {column} SET STORAGE EXTERNAL"))
+    print("✅ Columnas migradas: desplegar con TEXT_COMPRESSION=zstd y ejecutar train + backfill")
+
+
+def train(args):
+    """Entrenar un diccionario con una muestra aleatoria de textos y guardarlo como el activo"""
+    with engine.connect() as connection:
+        dictionaries.load(connection)
+        rows = connection.execute(text(
+            f"SELECT {', '.join(COMPRESSED_FIELDS)} FROM {TABLE} TABLESAMPLE SYSTEM (:percent) LIMIT :limit"
+        ), {"percent": args.sample_percent, "limit": args.samples}).all()
+    samples = [_as_text(value) for row in rows for value in row if value is not None]
+    if len(samples) < 100:
+        print(f"❌ Muestra insuficiente ({len(samples)} textos); aumentar --sample-percent")
+        return
+
+    data = train_dictionary(samples, args.dict_size)
+    with engine.begin() as connection:
+        dictionary_id = connection.scalar(
+            CompressionDictionary.__table__.insert()
+            .values(name=DICTIONARY_NAME, data=data, sample_count=len(samples))
+            .returning(CompressionDictionary.id)
+        )
+    print(f"✅ Diccionario {dictionary_id} entrenado con {len(samples)} textos ({len(data) / 1024:.1f} KB)")
+
+
+def _needs_rewrite(value, active_id, recompress: bool) -> bool:
+    if value is None:
+        return False
+    header = parse_header(value)
+    if header is None:
+        return True
+    _, codec, dictionary_id = header
+    if codec == CODEC_ZSTD_DICT and dictionary_id == active_id:
+        return False
+    if codec == CODEC_RAW:
+        # Guardado sin comprimir (corto o escrito sin zstandard instalado)
+        return recompress and len(value) - HEADER_SIZE >= COMPRESSION_MIN_BYTES
+    # Valores sin diccionario o con uno anterior: solo con --recompress
+    return recompress
+
+
+def backfill(args):
+    """Comprimir por lotes (keyset por id, FOR UPDATE) las filas sin comprimir; no toca updated_at"""
+    with engine.connect() as connection:
+        if set(column_types(connection).values()) != {"bytea"}:
+            print("❌ Las columnas siguen siendo text: ejecutar migrate primero")
+            return
+        dictionaries.load(connection)
+    active_id = dictionaries.active_id
+    if active_id is None:
+        print("⚠️ No hay diccionario entrenado: se comprime sin diccionario (ejecutar train antes para mejor tasa)")
+
+    columns = ", ".join(COMPRESSED_FIELDS)
+    assignments = ", ".join(f"{column} = :{column}" for column in COMPRESSED_FIELDS)
+    last_id = 0
+    scanned = rewritten = bytes_before = bytes_after = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(text(
+                f"SELECT {ID_COLUMN}, {columns} FROM {TABLE} WHERE {ID_COLUMN} > :last_id "
+                f"ORDER BY {ID_COLUMN} LIMIT :limit FOR UPDATE"
+            ), {"last_id": last_id, "limit": args.batch_size}).all()
+            if not rows:
+                break
+            updates = []
+            for row in rows:
+                values = {column: (bytes(value) if value is not None else None) for column, value in zip(COMPRESSED_FIELDS, row[1:])}
+                if not any(_needs_rewrite(value, active_id, args.recompress) for value in values.values()):
+                    continue
+                params = {"record_id": row[0]}
+                for column, value in values.items():
+                    params[column] = None if value is None else compress_text(decompress_text(value))
+                    bytes_before += len(value or b"")
+                    bytes_after += len(params[column] or b"")
+                updates.append(params)
+            if updates:
+                connection.execute(text(f"UPDATE {TABLE} SET {assignments} WHERE {ID_COLUMN} = :record_id"), updates)
+        scanned += len(rows)
+        rewritten += len(updates)
+        last_id = rows[-1][0]
+        print(f"🗜️ {scanned} filas revisadas, {rewritten} comprimidas (último id {last_id})")
+        if len(rows) < args.batch_size:
+            break
+        time.sleep(args.pause)
+
+    if bytes_before:
+        print(f"✅ {rewritten} filas: {bytes_before / 1024 / 1024:.1f} MB -> {bytes_after / 1024 / 1024:.1f} MB "
+              f"({bytes_after / bytes_before:.0%})")
+    if rewritten and not args.no_vacuum:
+        vacuum_table(TABLE)
+
+
+def revert(args):
+    """Descomprimir todas las filas y volver las columnas a text"""
+    with engine.connect() as connection:
+        if set(column_types(connection).values()) == {"text"}:
+            print("ℹ️ Las columnas ya son text")
+            return
+        dictionaries.load(connection)
+
+    columns = ", ".join(COMPRESSED_FIELDS)
+    assignments = ", ".join(f"{column} = :{column}" for column in COMPRESSED_FIELDS)
+    last_id = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(text(
+                f"SELECT {ID_COLUMN}, {columns} FROM {TABLE} WHERE {ID_COLUMN} > :last_id "
+                f"ORDER BY {ID_COLUMN} LIMIT :limit FOR UPDATE"
+            ), {"last_id": last_id, "limit": args.batch_size}).all()
+            if not rows:
+                break
+            updates = [
+                {"record_id": row[0], **{
+                    column: None if value is None else _as_text(value).encode("utf-8")
+                    for column, value in zip(COMPRESSED_FIELDS, row[1:])
+                }}
+                for row in rows
+            ]
+            connection.execute(text(f"UPDATE {TABLE} SET {assignments} WHERE {ID_COLUMN} = :record_id"), updates)
+        last_id = rows[-1][0]
+        print(f"📤 Descomprimidas hasta el id {last_id}")
+        if len(rows) < args.batch_size:
+            break
+        time.sleep(args.pause)
+
+    with engine.begin() as connection:
+        for column in COMPRESSED_FIELDS:
+            connection.execute(text(f"ALTER TABLE {TABLE} ALTER COLUMN {column} TYPE text USING convert_from({column}, 'UTF8')"))
+            connection.execute(text(f"ALTER TABLE {TABLE} ALTER COLUMN {column} SET STORAGE EXTENDED"))
+    print("✅ Columnas de vuelta a text: desplegar sin TEXT_COMPRESSION")
+
+
+def status(args):
+    """Tipo de las columnas, filas por códec y tamaño de la tabla (incluido TOAST)"""
+    with engine.connect() as connection:
+        types = column_types(connection)
+        print(f"{'Columna':<12}{'Tipo':<8}{'Plano':>10}{'Sin cabecera':>14}{'zstd':>10}{'zstd+dict':>11}{'Tamaño (MB)':>13}")
+        for column in COMPRESSED_FIELDS:
+            if types.get(column) == "bytea":
+                row = connection.execute(text(f"""
+                    SELECT
+                        count(*) FILTER (WHERE substring({column} from 1 for 2) = :magic AND get_byte({column}, 3) = :raw),
+                        count(*) FILTER (WHERE substring({column} from 1 for 2) IS DISTINCT FROM :magic),
+                        count(*) FILTER (WHERE substring({column} from 1 for 2) = :magic AND get_byte({column}, 3) = :zstd),
+                        count(*) FILTER (WHERE substring({column} from 1 for 2) = :magic AND get_byte({column}, 3) = :zstd_dict),
+                        coalesce(sum(pg_column_size({column})), 0)
+                    FROM {TABLE} WHERE {column} IS NOT NULL
+                """), {"magic": MAGIC, "raw": CODEC_RAW, "zstd": CODEC_ZSTD, "zstd_dict": CODEC_ZSTD_DICT}).one()
+            else:
+                total, size = connection.execute(text(
+                    f"SELECT count(*), coalesce(sum(pg_column_size({column})), 0) FROM {TABLE} WHERE {column} IS NOT NULL"
+                )).one()
+                row = (0, total, 0, 0, size)
+            print(f"{column:<12}{types.get(column, '?'):<8}{row[0]:>10}{row[1]:>14}{row[2]:>10}{row[3]:>11}{row[4] / 1024 / 1024:>13.1f}")
+
+        heap, toast, total = connection.execute(text(
+            "SELECT pg_relation_size(c.oid), coalesce(pg_total_relation_size(nullif(c.reltoastrelid, 0)), 0), "
+            "pg_total_relation_size(c.oid) FROM pg_class c WHERE c.oid = to_regclass(:table)"
+        ), {"table": TABLE}).one()
+        dictionary_count = connection.scalar(
+            text("SELECT count(*) FROM compression_dictionary WHERE name = :name"), {"name": DICTIONARY_NAME}
+        )
+    print(f"\n{TABLE}: heap {heap / 1024 / 1024:.1f} MB, TOAST {toast / 1024 / 1024:.1f} MB, total {total / 1024 / 1024:.1f} MB; "
+          f"{dictionary_count} diccionarios")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compresión de los textos clínicos de medical_history")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("status", help="Estado de la migración y tamaños")
+    commands.add_parser("migrate", help="Convertir las columnas a bytea (sin comprimir)")
+
+    train_parser = commands.add_parser("train", help="Entrenar un diccionario con una muestra de la tabla")
+    train_parser.add_argument("--samples", type=int, default=5000, help="Filas de muestra")
+    train_parser.add_argument("--sample-percent", type=float, default=10, help="Porcentaje de páginas para TABLESAMPLE")
+    train_parser.add_argument("--dict-size", type=int, default=DICTIONARY_SIZE, help="Tamaño del diccionario en bytes")
+
+    for name, help_text in (("backfill", "Comprimir las filas existentes"), ("revert", "Descomprimir y volver a text")):
+        batch_parser = commands.add_parser(name, help=help_text)
+        batch_parser.add_argument("--batch-size", type=int, default=500, help="Filas por lote")
+        batch_parser.add_argument("--pause", type=float, default=0.2, help="Segundos de pausa entre lotes")
+        if name == "backfill":
+            batch_parser.add_argument("--recompress", action="store_true",
+                                      help="Recomprimir también los valores con un diccionario anterior o sin diccionario")
+            batch_parser.add_argument("--no-vacuum", action="store_true", help="No ejecutar VACUUM al terminar")
+
+    args = parser.parse_args()
+    create_tables()
+    {"status": status, "migrate": migrate, "train": train, "backfill": backfill, "revert": revert}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""
+Generador de datos sintéticos con volúmenes realistas de una clínica.
+
+Crea usuarios (doctores, pacientes y administradores) con roles y credenciales,
+horarios semanales, configuración y excepciones de disponibilidad, años de citas
+e historiales médicos con texto largo. Los datos se cargan con COPY en bloques,
+por lo que se pueden generar millones de filas en pocos minutos.
+
+La salida es determinista a partir de la semilla: la misma semilla y los mismos
+parámetros producen exactamente los mismos datos.
+
+Uso:
+    python -m app.scripts.generate_synthetic_data --seed 42 --doctors 200 --patients 50000 --years 3
+"""
+import argparse
+import csv
+import hashlib
+import io
+import random
+import time as time_module
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, List, Sequence
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.core.database import engine, create_tables
+from app.modules.auth.models.user import User
+from app.modules.auth.models.user_role import UserRole
+from app.modules.auth.models.credentials import Credentials
+from app.modules.citas.models.cita import Appointment
+from app.modules.schedules.models.doctor_schedule import DoctorSchedule
+from app.modules.schedules.models.doctor_settings import DoctorSettings
+from app.modules.schedules.models.doctor_availability_exception import DoctorAvailabilityException, ExceptionType
+from app.modules.medical_history.models.medical_history import MedicalHistory
+
+PATIENT_ROLE = 1
+DOCTOR_ROLE = 2
+ADMIN_ROLE = 3
+
+DEFAULT_ROLES = [
+    (PATIENT_ROLE, "patient", "Paciente"),
+    (DOCTOR_ROLE, "doctor", "Doctor"),
+    (ADMIN_ROLE, "admin", "Administrador"),
+]
+
+# Contraseña por defecto de todos los usuarios generados. Se usa el formato
+# "sha256:" que acepta verify_password para no pagar bcrypt por cada fila.
+DEFAULT_PASSWORD = "password123"
+DEFAULT_PASSWORD_HASH = "sha256:" + hashlib.sha256(DEFAULT_PASSWORD.encode("utf-8")).hexdigest()
+
+FIRST_NAMES = [
+    "Ana", "Luis", "Carlos", "Maria", "Jose", "Laura", "Andres", "Sofia", "Juan", "Camila",
+    "Diego", "Valentina", "Miguel", "Daniela", "Jorge", "Paula", "Felipe", "Natalia", "Santiago", "Isabel",
+    "Ricardo", "Lucia", "Alejandro", "Carolina", "Fernando", "Gabriela", "Manuel", "Juliana", "Sergio", "Elena",
+]
+LAST_NAMES = [
+    "Garcia", "Rodriguez", "Martinez", "Lopez", "Gonzalez", "Perez", "Sanchez", "Ramirez", "Torres", "Flores",
+    "Rivera", "Gomez", "Diaz", "Reyes", "Morales", "Cruz", "Ortiz", "Gutierrez", "Chavez", "Ramos",
+    "Vargas", "Castillo", "Jimenez", "Moreno", "Romero", "Herrera", "Medina", "Aguilar", "Vega", "Castro",
+]
+
+REASONS = [
+    "Consulta general", "Control de presión arterial", "Dolor de cabeza persistente", "Chequeo anual",
+    "Seguimiento de tratamiento", "Dolor abdominal", "Revisión de exámenes", "Fisioterapia",
+    "Control de diabetes", "Tos y fiebre", "Dolor lumbar", "Renovación de fórmula médica",
+]
+DIAGNOSES = [
+    "Hipertensión arterial esencial", "Diabetes mellitus tipo 2", "Migraña sin aura", "Lumbalgia mecánica",
+    "Infección respiratoria aguda", "Gastritis crónica", "Ansiedad generalizada", "Asma bronquial",
+    "Rinitis alérgica", "Hipotiroidismo", "Dermatitis atópica", "Faringoamigdalitis",
+]
+SYMPTOMS = [
+    "cefalea", "fiebre", "tos seca", "dolor torácico", "mareo", "náuseas", "fatiga", "disnea",
+    "dolor lumbar", "prurito", "insomnio", "dolor abdominal", "congestión nasal", "palpitaciones",
+]
+MEDICATIONS = [
+    "Losartán 50 mg", "Metformina 850 mg", "Acetaminofén 500 mg", "Ibuprofeno 400 mg", "Omeprazol 20 mg",
+    "Loratadina 10 mg", "Salbutamol inhalador", "Levotiroxina 50 mcg", "Amoxicilina 500 mg", "Sertralina 50 mg",
+]
+NOTE_SENTENCES = [
+    "Paciente refiere evolución favorable desde la última consulta.",
+    "Se explican signos de alarma y se indica consultar por urgencias si empeora.",
+    "Se solicitan exámenes de laboratorio de control para la próxima cita.",
+    "Adherencia parcial al tratamiento, se refuerza la importancia de cumplir la dosis.",
+    "Signos vitales dentro de parámetros normales al momento de la valoración.",
+    "Se recomienda dieta balanceada, actividad física regular y control del peso.",
+    "Antecedentes familiares relevantes de enfermedad cardiovascular.",
+    "No presenta reacciones adversas a la medicación actual.",
+    "Se ajusta la dosis según respuesta clínica y tolerancia del paciente.",
+    "Examen físico sin hallazgos adicionales de importancia.",
+    "Se programa seguimiento en cuatro semanas para evaluar respuesta.",
+    "Paciente comprende y acepta el plan de manejo propuesto.",
+]
+TREATMENT_SENTENCES = [
+    "Reposo relativo por tres días.",
+    "Hidratación abundante y control de temperatura.",
+    "Terapia física dos veces por semana durante un mes.",
+    "Modificación de hábitos alimenticios y reducción de sal.",
+    "Control ambulatorio con medicina general.",
+    "Aplicación de compresas tibias en la zona afectada.",
+    "Ejercicios de respiración diarios.",
+]
+
+
+class SyntheticDataGenerator:
+    """Genera y carga datos sintéticos deterministas usando COPY"""
+
+    def __init__(self, seed: int, doctors: int, patients: int, admins: int, years: float,
+                 future_days: int, occupancy: float, history_ratio: float, chunk_size: int,
+                 anchor_date: date):
+        self.seed = seed
+        self.anchor_date = anchor_date
+        self.doctors = doctors
+        self.patients = patients
+        self.admins = admins
+        self.years = years
+        self.future_days = future_days
+        self.occupancy = occupancy
+        self.history_ratio = history_ratio
+        self.chunk_size = chunk_size
+        self.rng = random.Random(seed)
+        self.counts = {}
+
+    # ============ COPY HELPERS ============
+
+    def _copy_rows(self, cursor, table, columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+        """Cargar filas con COPY FROM STDIN en bloques de chunk_size"""
+        column_list = ", ".join(f'"{column}"' for column in columns)
+        statement = f'COPY "{table.name}" ({column_list}) FROM STDIN WITH (FORMAT csv)'
+
+        total = 0
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        pending = 0
+        for row in rows:
+            writer.writerow(row)
+            pending += 1
+            if pending >= self.chunk_size:
+                buffer.seek(0)
+                cursor.copy_expert(statement, buffer)
+                total += pending
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                pending = 0
+        if pending:
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+            total += pending
+
+        self.counts[table.name] = self.counts.get(table.name, 0) + total
+        print(f"💾 GENERATOR: {total} filas cargadas en {table.name}")
+        return total
+
+    def _next_id(self, cursor, table, column: str) -> int:
+        cursor.execute(f'SELECT COALESCE(MAX("{column}"), 0) + 1 FROM "{table.name}"')
+        return cursor.fetchone()[0]
+
+    def _reset_sequence(self, cursor, table, column: str):
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', '{column}'), "
+            f'COALESCE((SELECT MAX("{column}") FROM "{table.name}"), 1))'
+        )
+
+    # ============ GENERADORES DE FILAS ============
+
+    def _long_text(self, sentences: List[str], minimum: int, maximum: int) -> str:
+        count = self.rng.randint(minimum, maximum)
+        return " ".join(self.rng.choice(sentences) for _ in range(count))
+
+    def _user_rows(self, first_id: int, total: int):
+        for offset in range(total):
+            user_id = first_id + offset
+            yield (
+                user_id,
+                self.rng.choice(FIRST_NAMES),
+                f"{self.rng.choice(LAST_NAMES)} {self.rng.choice(LAST_NAMES)}",
+                str(10_000_000 + user_id),
+                f"3{self.rng.randint(0, 999_999_999):09d}",
+                "t",
+            )
+
+    def _role_and_credentials_rows(self, cursor, first_user_id: int, roles: List[int]):
+        user_role_id = self._next_id(cursor, UserRole.__table__, "id_user_role")
+        credentials_id = self._next_id(cursor, Credentials.__table__, "id_credentials")
+
+        self._copy_rows(
+            cursor, UserRole.__table__, ["id_user_role", "id_user", "id_role"],
+            ((user_role_id + offset, first_user_id + offset, role) for offset, role in enumerate(roles)),
+        )
+        self._copy_rows(
+            cursor, Credentials.__table__, ["id_credentials", "id_user", "email", "password"],
+            (
+                (credentials_id + offset, first_user_id + offset, f"user{first_user_id + offset}@clinic.test", DEFAULT_PASSWORD_HASH)
+                for offset in range(len(roles))
+            ),
+        )
+
+    def _doctor_profiles(self, doctor_ids: List[int]) -> dict:
+        """Definir horario semanal y configuración de cada doctor"""
+        profiles = {}
+        for doctor_id in doctor_ids:
+            start_hour = self.rng.choice([6, 7, 8, 9])
+            hours = self.rng.choice([6, 8, 9])
+            working_days = [1, 2, 3, 4, 5]
+            if self.rng.random() < 0.3:
+                working_days.append(6)
+            profiles[doctor_id] = {
+                "days": working_days,
+                "start": time(start_hour, 0),
+                "end": time(min(start_hour + hours, 23), 0),
+                "duration": self.rng.choice([15, 20, 30, 30, 45]),
+                "break": self.rng.choice([0, 5, 5, 10]),
+                "advance": self.rng.choice([15, 30, 60, 90]),
+            }
+        return profiles
+
+    def _appointment_rows(self, first_id: int, doctor_ids: List[int], patient_ids: List[int],
+                          profiles: dict, blocked: set, start_date: date, end_date: date,
+                          today: date, histories: list):
+        """Generar citas por doctor y día siguiendo la grilla de slots de su configuración"""
+        appointment_id = first_id
+        anchor = datetime.combine(today, time.min).replace(tzinfo=timezone.utc)
+        for doctor_id in doctor_ids:
+            profile = profiles[doctor_id]
+            step = timedelta(minutes=profile["duration"] + profile["break"])
+            duration = timedelta(minutes=profile["duration"])
+            current = start_date
+            while current <= end_date:
+                day_of_week = (current.weekday() + 1) % 7
+                if day_of_week in profile["days"] and (doctor_id, current) not in blocked:
+                    slot = datetime.combine(current, profile["start"])
+                    day_end = datetime.combine(current, profile["end"])
+                    while slot + duration <= day_end:
+                        if self.rng.random() < self.occupancy:
+                            patient_id = self.rng.choice(patient_ids)
+                            is_past = current < today
+                            deleted_at = None
+                            if is_past:
+                                status = self.rng.choices(
+                                    ["confirmed", "cancelled", "scheduled"], weights=[80, 15, 5]
+                                )[0]
+                            else:
+                                status = self.rng.choices(["scheduled", "pending"], weights=[90, 10])[0]
+                            if self.rng.random() < 0.02:
+                                deleted_at = (slot - timedelta(days=self.rng.randint(0, 10))).isoformat() + "+00:00"
+                            created_at = slot - timedelta(days=self.rng.randint(1, 30))
+                            yield (
+                                appointment_id,
+                                patient_id,
+                                doctor_id,
+                                slot.isoformat(),
+                                self.rng.choice(REASONS),
+                                status,
+                                min(created_at.replace(tzinfo=timezone.utc), anchor).isoformat(),
+                                deleted_at,
+                            )
+                            if is_past and status == "confirmed" and deleted_at is None \
+                                    and self.rng.random() < self.history_ratio:
+                                histories.append((appointment_id, patient_id, doctor_id, slot))
+                            appointment_id += 1
+                        slot += step
+                current += timedelta(days=1)
+
+    def _medical_history_rows(self, first_id: int, histories: list):
+        for offset, (appointment_id, patient_id, doctor_id, slot) in enumerate(histories):
+            timestamp = (slot + timedelta(minutes=self.rng.randint(10, 90))).isoformat() + "+00:00"
+            yield (
+                first_id + offset,
+                patient_id,
+                doctor_id,
+                appointment_id,
+                self.rng.choice(DIAGNOSES),
+                self._long_text(TREATMENT_SENTENCES, 2, 6),
+                ", ".join(self.rng.sample(MEDICATIONS, self.rng.randint(0, 3))) or None,
+                ", ".join(self.rng.sample(SYMPTOMS, self.rng.randint(1, 5))),
+                self._long_text(NOTE_SENTENCES, 3, 20),
+                timestamp,
+                timestamp,
+                None,
+            )
+
+    # ============ CARGA ============
+
+    def run(self):
+        print(f"🚀 GENERATOR: Generando datos con semilla {self.seed}")
+        started = time_module.monotonic()
+        create_tables()
+
+        raw_connection = engine.raw_connection()
+        try:
+            cursor = raw_connection.cursor()
+            for id_role, name, description in DEFAULT_ROLES:
+                cursor.execute(
+                    'INSERT INTO "role" (id_role, name, description) VALUES (%s, %s, %s) ON CONFLICT DO NOTHING',
+                    (id_role, name, description),
+                )
+
+            # Usuarios: doctores, pacientes y administradores en bloques contiguos de IDs
+            first_user_id = self._next_id(cursor, User.__table__, "id_user")
+            total_users = self.doctors + self.patients + self.admins
+            self._copy_rows(
+                cursor, User.__table__,
+                ["id_user", "firstName", "lastName", "identification", "phone", "id_status"],
+                self._user_rows(first_user_id, total_users),
+            )
+            doctor_ids = list(range(first_user_id, first_user_id + self.doctors))
+            patient_ids = list(range(first_user_id + self.doctors, first_user_id + self.doctors + self.patients))
+            roles = [DOCTOR_ROLE] * self.doctors + [PATIENT_ROLE] * self.patients + [ADMIN_ROLE] * self.admins
+            self._role_and_credentials_rows(cursor, first_user_id, roles)
+
+            # Horarios y configuración de doctores
+            profiles = self._doctor_profiles(doctor_ids)
+            schedule_id = self._next_id(cursor, DoctorSchedule.__table__, "id")
+            schedule_rows = []
+            for doctor_id in doctor_ids:
+                for day in profiles[doctor_id]["days"]:
+                    schedule_rows.append((
+                        schedule_id + len(schedule_rows), doctor_id, day,
+                        profiles[doctor_id]["start"].isoformat(), profiles[doctor_id]["end"].isoformat(), "t",
+                    ))
+            self._copy_rows(
+                cursor, DoctorSchedule.__table__,
+                ["id", "doctor_id", "day_of_week", "start_time", "end_time", "is_active"],
+                schedule_rows,
+            )
+
+            settings_id = self._next_id(cursor, DoctorSettings.__table__, "id")
+            self._copy_rows(
+                cursor, DoctorSettings.__table__,
+                ["id", "doctor_id", "appointment_duration", "break_between_appointments",
+                 "advance_booking_days", "allow_weekend_appointments"],
+                (
+                    (settings_id + offset, doctor_id, profiles[doctor_id]["duration"], profiles[doctor_id]["break"],
+                     profiles[doctor_id]["advance"], "t" if 6 in profiles[doctor_id]["days"] else "f")
+                    for offset, doctor_id in enumerate(doctor_ids)
+                ),
+            )
+
+            # Excepciones: algunos días bloqueados y con horario personalizado por año
+            today = self.anchor_date
+            start_date = today - timedelta(days=int(self.years * 365))
+            end_date = today + timedelta(days=self.future_days)
+            total_days = (end_date - start_date).days
+            exception_id = self._next_id(cursor, DoctorAvailabilityException.__table__, "id")
+            exception_rows = []
+            blocked = set()
+            for doctor_id in doctor_ids:
+                for _ in range(max(1, int(total_days / 365 * 12))):
+                    exception_date = start_date + timedelta(days=self.rng.randint(0, total_days))
+                    if self.rng.random() < 0.7:
+                        blocked.add((doctor_id, exception_date))
+                        exception_rows.append((
+                            exception_id + len(exception_rows), doctor_id, exception_date.isoformat(),
+                            None, None, ExceptionType.BLOCKED.name, "Vacaciones / permiso",
+                        ))
+                    else:
+                        exception_rows.append((
+                            exception_id + len(exception_rows), doctor_id, exception_date.isoformat(),
+                            time(10, 0).isoformat(), time(14, 0).isoformat(),
+                            ExceptionType.CUSTOM_HOURS.name, "Horario reducido",
+                        ))
+            self._copy_rows(
+                cursor, DoctorAvailabilityException.__table__,
+                ["id", "doctor_id", "exception_date", "start_time", "end_time", "exception_type", "reason"],
+                exception_rows,
+            )
+
+            # Citas e historiales médicos
+            histories = []
+            appointment_id = self._next_id(cursor, Appointment.__table__, "id")
+            self._copy_rows(
+                cursor, Appointment.__table__,
+                ["id", "patient_id", "doctor_id", "appointment_date", "reason", "status", "created_at", "deleted_at"],
+                self._appointment_rows(appointment_id, doctor_ids, patient_ids, profiles, blocked,
+                                       start_date, end_date, today, histories),
+            )
+            history_id = self._next_id(cursor, MedicalHistory.__table__, "id_medical_history")
+            self._copy_rows(
+                cursor, MedicalHistory.__table__,
+                ["id_medical_history", "id_patient", "id_doctor", "id_appointment", "diagnosis", "treatment",
+                 "medication", "symptoms", "notes", "created_at", "updated_at", "deleted_at"],
+                self._medical_history_rows(history_id, histories),
+            )
+
+            for table, column in [
+                (User.__table__, "id_user"),
+                (UserRole.__table__, "id_user_role"),
+                (Credentials.__table__, "id_credentials"),
+                (DoctorSchedule.__table__, "id"),
+                (DoctorSettings.__table__, "id"),
+                (DoctorAvailabilityException.__table__, "id"),
+                (Appointment.__table__, "id"),
+                (MedicalHistory.__table__, "id_medical_history"),
+            ]:
+                self._reset_sequence(cursor, table, column)
+
+            raw_connection.commit()
+            cursor.execute("ANALYZE")
+            raw_connection.commit()
+        except Exception as e:
+            print(f"❌ GENERATOR: Error generando datos: {e}")
+            raw_connection.rollback()
+            raise
+        finally:
+            raw_connection.close()
+
+        elapsed = time_module.monotonic() - started
+        total_rows = sum(self.counts.values())
+        print(f"✅ GENERATOR: {total_rows} filas generadas en {elapsed:.1f}s ({total_rows / max(elapsed, 0.001):.0f} filas/s)")
+        for table_name, count in self.counts.items():
+            print(f"   - {table_name}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de datos sintéticos para pruebas de rendimiento")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla para generar datos deterministas")
+    parser.add_argument("--doctors", type=int, default=50, help="Número de doctores")
+    parser.add_argument("--patients", type=int, default=5000, help="Número de pacientes")
+    parser.add_argument("--admins", type=int, default=2, help="Número de administradores")
+    parser.add_argument("--years", type=float, default=2, help="Años de historial de citas hacia atrás")
+    parser.add_argument("--future-days", type=int, default=60, help="Días de citas futuras")
+    parser.add_argument("--occupancy", type=float, default=0.6, help="Fracción de slots ocupados (0-1)")
+    parser.add_argument("--history-ratio", type=float, default=0.8, help="Fracción de citas pasadas confirmadas con historial médico")
+    parser.add_argument("--anchor-date", type=date.fromisoformat, default=date.today(),
+                        help="Fecha de referencia (YYYY-MM-DD) que separa citas pasadas y futuras; fijarla hace la salida reproducible entre días")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="Filas por cada COPY")
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(
+        seed=args.seed,
+        doctors=args.doctors,
+        patients=args.patients,
+        admins=args.admins,
+        years=args.years,
+        future_days=args.future_days,
+        occupancy=args.occupancy,
+        history_ratio=args.history_ratio,
+        chunk_size=args.chunk_size,
+        anchor_date=args.anchor_date,
+    )
+    generator.run()
+
+
+if __name__ == "__main__":
+    main()
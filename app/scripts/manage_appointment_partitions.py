@@ -0,0 +1,68 @@
+"""
+Administración del particionamiento mensual de la tabla appointment.
+
+Uso:
+    python -m app.scripts.manage_appointment_partitions status
+    python -m app.scripts.manage_appointment_partitions migrate --months-ahead 6
+    python -m app.scripts.manage_appointment_partitions ensure --months-ahead 6
+    python -m app.scripts.manage_appointment_partitions archive --older-than-months 24
+"""
+import argparse
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.core.database import engine, create_tables
+from app.modules.citas.services.appointment_partitions import (
+    PARTITION_MONTHS_AHEAD, archive_partitions, ensure_future_partitions, is_partitioned, list_partitions,
+    migrate_to_partitioned
+)
+
+
+def print_status(connection):
+    if not is_partitioned(connection):
+        print("ℹ️ appointment no está particionada (usar el comando migrate)")
+        return
+    partitions = list_partitions(connection)
+    print(f"{'Partición':<28}{'Filas (est.)':>14}{'Tamaño (MB)':>14}")
+    for partition in partitions:
+        print(f"{partition['name']:<28}{partition['estimated_rows']:>14}{partition['total_bytes'] / 1024 / 1024:>14.1f}")
+    print(f"Total: {len(partitions)} particiones")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Particionamiento mensual de appointment")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Listar particiones con filas estimadas y tamaño")
+    for name, help_text in (("migrate", "Convertir appointment en tabla particionada"),
+                            ("ensure", "Crear las particiones de los próximos meses")):
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD, help="Meses futuros a crear")
+    archive = subparsers.add_parser("archive", help="Separar y archivar las particiones antiguas")
+    archive.add_argument("--older-than-months", type=int, required=True, help="Archivar meses completos anteriores a N meses")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        with engine.connect() as connection:
+            print_status(connection)
+        return
+
+    if args.command == "migrate":
+        create_tables()
+
+    with engine.begin() as connection:
+        if args.command == "migrate":
+            migrate_to_partitioned(connection, args.months_ahead)
+        elif not is_partitioned(connection):
+            raise SystemExit("❌ appointment no está particionada (usar el comando migrate)")
+        elif args.command == "ensure":
+            created = ensure_future_partitions(connection, args.months_ahead)
+            print(f"✅ {len(created)} particiones creadas")
+        elif args.command == "archive":
+            archived = archive_partitions(connection, args.older_than_months)
+            print(f"✅ {len(archived)} particiones archivadas")
+
+
+if __name__ == "__main__":
+    main()
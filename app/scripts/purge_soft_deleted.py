@@ -0,0 +1,55 @@
+"""
+Purga manual de filas con borrado lógico cuyo periodo de gracia ya venció.
+
+Uso:
+    python -m app.scripts.purge_soft_deleted --dry-run
+    python -m app.scripts.purge_soft_deleted --batch-size 1000 --pause 0.2 --max-seconds 1800
+    python -m app.scripts.purge_soft_deleted --reindex
+"""
+import argparse
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import text
+
+from app.core.database import engine, create_tables
+from app.core.retention import (
+    POLICIES, RETENTION_BATCH_PAUSE_SECONDS, RETENTION_BATCH_SIZE, RETENTION_MAX_RUN_SECONDS, run_retention
+)
+
+
+def reindex_tables(tables):
+    """REINDEX CONCURRENTLY: compacta los índices inflados sin bloquear escrituras"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for table in tables:
+            print(f"🔧 Reindexando {table}...")
+            connection.execute(text(f"REINDEX TABLE CONCURRENTLY {table}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Purga de filas con borrado lógico")
+    parser.add_argument("--dry-run", action="store_true", help="Solo contar las filas elegibles")
+    parser.add_argument("--batch-size", type=int, default=RETENTION_BATCH_SIZE, help="Filas por lote")
+    parser.add_argument("--pause", type=float, default=RETENTION_BATCH_PAUSE_SECONDS, help="Segundos de pausa entre lotes")
+    parser.add_argument("--max-seconds", type=float, default=RETENTION_MAX_RUN_SECONDS, help="Tiempo máximo de la ejecución")
+    parser.add_argument("--no-vacuum", action="store_true", help="No ejecutar VACUUM al terminar")
+    parser.add_argument("--reindex", action="store_true", help="Reconstruir los índices de las tablas purgadas")
+    args = parser.parse_args()
+
+    create_tables()
+    reports = run_retention(args.batch_size, args.pause, args.max_seconds, args.dry_run, not args.no_vacuum)
+
+    print(f"{'Tabla':<18}{'Elegibles':>11}{'Purgadas':>10}{'Lotes':>7}{'Recuperado (KB)':>17}{'Antes (MB)':>12}{'Después (MB)':>14}")
+    for report in reports:
+        print(f"{report.table:<18}{report.eligible:>11}{report.purged:>10}{report.batches:>7}"
+              f"{report.reclaimed_bytes / 1024:>17.1f}{report.size_before / 1024 / 1024:>12.1f}{report.size_after / 1024 / 1024:>14.1f}"
+              + ("  (tiempo agotado)" if report.stopped_early else ""))
+
+    if args.reindex and not args.dry_run:
+        reindex_tables([policy.table for policy in POLICIES])
+
+
+if __name__ == "__main__":
+    main()
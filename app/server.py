@@ -0,0 +1,102 @@
+"""
+Punto de entrada del servidor HTTP.
+
+Uso:
+    python -m app.server            # producción: gunicorn + UvicornWorker (ver app/gunicorn_conf.py)
+    python -m app.server --reload   # desarrollo: un proceso de uvicorn con recarga
+
+En producción, además de gunicorn, se lanza un único proceso de la cola de trabajos
+(python -m app.worker) en el mismo contenedor: los reportes, la retención y el
+mantenimiento de particiones no corren en los workers que atienden peticiones, y el
+directorio local de reportes sigue siendo compartido. JOB_WORKER_SIDECAR=false lo
+desactiva cuando la cola corre en un servicio aparte.
+
+Con varios workers el relay del outbox tampoco corre en ellos (app/gunicorn_conf.py): se
+lanza un único python -m app.outbox_relay para conservar el orden de los eventos.
+OUTBOX_RELAY_SIDECAR=false lo desactiva cuando el relay corre en un servicio aparte.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+from typing import Optional
+
+SIDECAR_RESTART_SECONDS = 5
+
+
+class SidecarProcess:
+    """Proceso python -m <module> supervisado: se reinicia si termina inesperadamente"""
+
+    def __init__(self, module: str, label: str):
+        self.module = module
+        self.label = label
+        self._process: Optional[subprocess.Popen] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._supervise, name=f"{self.module}-supervisor", daemon=True)
+        self._thread.start()
+
+    def _supervise(self):
+        while not self._stopping.is_set():
+            self._process = subprocess.Popen([sys.executable, "-m", self.module])
+            print(f"⚙️ SERVER: {self.label} iniciado (pid {self._process.pid})")
+            code = self._process.wait()
+            if self._stopping.is_set():
+                break
+            print(f"⚠️ SERVER: {self.label} terminó con código {code}; reiniciando en {SIDECAR_RESTART_SECONDS} s")
+            self._stopping.wait(SIDECAR_RESTART_SECONDS)
+
+    def stop(self, timeout: float = 30):
+        """SIGTERM: el proceso termina el trabajo en curso antes de salir"""
+        self._stopping.set()
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP de la API")
+    parser.add_argument("--reload", action="store_true", help="Desarrollo: uvicorn con recarga automática")
+    args = parser.parse_args()
+
+    if args.reload:
+        import uvicorn
+        uvicorn.run("app.main:app", host="0.0.0.0", port=int(os.getenv("PORT", "8000")), reload=True)
+        return
+
+    # Aplica los valores por defecto del entorno (caché compartida, puente de tiempo real, relay)
+    # antes de lanzar los procesos auxiliares, que deben usar la misma configuración
+    from app import gunicorn_conf
+    from app.core.database import create_tables
+
+    create_tables()
+    os.environ["SCHEMA_SETUP_ON_STARTUP"] = "false"
+    # La cola nunca corre dentro de los workers HTTP
+    os.environ["JOB_WORKER_IN_PROCESS"] = "false"
+
+    sidecars = []
+    if os.getenv("JOB_WORKER_SIDECAR", "true").lower() == "true":
+        sidecars.append(SidecarProcess("app.worker", "Worker de la cola"))
+    relay_in_process = os.getenv("OUTBOX_RELAY_IN_PROCESS", "true").lower() == "true"
+    if not relay_in_process and os.getenv("OUTBOX_RELAY_SIDECAR", "true").lower() == "true":
+        sidecars.append(SidecarProcess("app.outbox_relay", "Relay del outbox"))
+    for sidecar in sidecars:
+        sidecar.start()
+
+    from gunicorn.app.wsgiapp import run
+    sys.argv = ["gunicorn", "--config", "python:app.gunicorn_conf", "app.main:app"]
+    try:
+        run()
+    finally:
+        for sidecar in sidecars:
+            sidecar.stop(gunicorn_conf.graceful_timeout)
+
+
+if __name__ == "__main__":
+    main()
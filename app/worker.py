@@ -0,0 +1,41 @@
+"""
+Worker de la cola de trabajos en segundo plano.
+
+Uso:
+    python -m app.worker                      # todas las tareas registradas
+    python -m app.worker --tasks reports.build --batch-size 1
+"""
+import argparse
+import os
+import signal
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.core.database import create_tables, import_models
+from app.core.job_queue import JobWorker, JOB_POLL_INTERVAL_SECONDS, load_task_modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de la cola de trabajos")
+    parser.add_argument("--tasks", nargs="*", default=None, help="Procesar solo estas tareas")
+    parser.add_argument("--batch-size", type=int, default=1, help="Trabajos reclamados por consulta")
+    parser.add_argument("--poll-interval", type=float, default=JOB_POLL_INTERVAL_SECONDS, help="Segundos de espera con la cola vacía")
+    args = parser.parse_args()
+
+    # Lanzado por app.server las tablas ya existen, pero los mappers se registran siempre
+    import_models()
+    if os.environ.get("SCHEMA_SETUP_ON_STARTUP", "true").lower() == "true":
+        create_tables()
+    load_task_modules()
+
+    worker = JobWorker(batch_size=args.batch_size, tasks=args.tasks)
+    # Terminar el trabajo en curso antes de salir
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    worker.run_forever(args.poll_interval)
+
+
+if __name__ == "__main__":
+    main()